@@ -0,0 +1,260 @@
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from ticks import ReferencePriceTick, Tick, TopOfBookTick
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+#
+# incremental analytics per tradeable entity
+#
+# each entity is given a dense slot on its first tick, every field is a preallocated array('d')
+# indexed by slot so an update is a handful of float stores; with NumPy installed the columns are
+# also readable as zero-copy ndarrays for whole-surface calculations
+#
+# times are exchange timestamps in microseconds, EWMAs decay by half every `halflife` seconds,
+# time bars of the `bar_price` close when the first tick of the next bucket arrives (or on flush)
+#
+# the last_trade_price feed carries no trade size, so volume bars count trades: count bars are
+# always built from last trade prices and close after `bar_count` trades, whatever the bar price,
+# and the rolling trade average is time weighted rather than volume weighted
+#
+
+NAN = float("nan")
+FIELDS = (
+    # top of book and derived quote fields
+    "bid", "ask", "bid_size", "ask_size", "mid", "spread", "microprice", "mid_ewma",
+    # reference and last trade price, EWMA of trade prices and of squared log returns between trades
+    "reference", "last", "trade_ewma", "volatility", "trades",
+    # exchange time of the latest update of each kind
+    "quote_us", "trade_us", "updated_us",
+)
+BAR_PRICES = ("last", "mid", "reference")
+# per slot state of the open time bar and trade count bar
+_BAR_FIELDS = ("start", "open", "high", "low", "close", "count")
+
+
+@dataclass(frozen=True, slots=True)
+class Bar:
+    entity_id: str
+    # 'time' for time bucketed bars, 'count' for bars of a fixed number of trades
+    kind: str
+    start_us: int
+    end_us: int
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int
+
+
+def _column(size: int, value: float = NAN) -> array:
+    return array("d", [value]) * size
+
+
+class Analytics:
+    """
+    Mid, spread, microprice, EWMAs and OHLC bars per entity, updated in O(1) per tick.
+
+    update() can be used as a client.tick_consumers entry, completed bars are passed to each of
+    `bar_consumers`. With `derive=False` top of book updates only store the quote and recompute()
+    derives the quote fields for every entity at once, so there are no mid bars.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        halflife: float = 60.0,
+        bar_seconds: float = 60.0,
+        bar_count: int = 100,
+        bar_price: str = "last",
+        derive: bool = True,
+    ) -> None:
+        if bar_price not in BAR_PRICES:
+            raise ValueError(f"Unknown bar price '{bar_price}', expected one of {', '.join(BAR_PRICES)}")
+        if bar_price == "mid" and not derive:
+            raise ValueError("Mid bars need derive=True, with derive=False the mid is only set by recompute()")
+        self.capacity = max(1, capacity)
+        self.halflife_us = halflife * 1e6
+        self.bar_us = int(bar_seconds * 1e6)
+        self.bar_count = bar_count
+        self.bar_price = bar_price
+        self.derive = derive
+        self.bar_consumers: List[Callable[[Bar], Any]] = []
+        self.updates = 0
+        self.slots: Dict[str, int] = {}
+        self.entity_ids: List[str] = []
+        self.columns: Dict[str, array] = {name: _column(self.capacity) for name in FIELDS}
+        self._time_bar = {name: _column(self.capacity) for name in _BAR_FIELDS}
+        self._count_bar = {name: _column(self.capacity) for name in _BAR_FIELDS}
+        for bar in (self._time_bar, self._count_bar):
+            bar["count"] = _column(self.capacity, 0.0)
+        self.columns["trades"] = _column(self.capacity, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self.slots
+
+    def slot(self, entity_id: str) -> int:
+        slot = self.slots.get(entity_id)
+        if slot is None:
+            slot = len(self.entity_ids)
+            if slot == self.capacity:
+                self._grow()
+            self.slots[entity_id] = slot
+            self.entity_ids.append(entity_id)
+        return slot
+
+    def _grow(self) -> None:
+        # doubling keeps growth amortized O(1); fails with BufferError while a NumPy view is held
+        added = self.capacity
+        for columns in (self.columns, self._time_bar, self._count_bar):
+            for name, column in columns.items():
+                column.extend(_column(added, 0.0 if name in ("trades", "count") else NAN))
+        self.capacity += added
+
+    def update(self, tick: Tick) -> None:
+        ts = tick.exchange_us
+        slot = self.slot(tick.tradeable_entity_id)
+        c = self.columns
+        if type(tick) is TopOfBookTick:
+            bid, ask = tick.buy_price_conv, tick.sell_price_conv
+            bid_size, ask_size = tick.buy_quantity_conv, tick.sell_quantity_conv
+            c["bid"][slot], c["ask"][slot], c["bid_size"][slot], c["ask_size"][slot] = bid, ask, bid_size, ask_size
+            if self.derive:
+                mid = (bid + ask) / 2
+                c["mid"][slot] = mid
+                c["spread"][slot] = ask - bid
+                sizes = bid_size + ask_size
+                c["microprice"][slot] = (bid * ask_size + ask * bid_size) / sizes if sizes else mid
+                c["mid_ewma"][slot] = self._ewma(c["mid_ewma"][slot], mid, ts - c["quote_us"][slot])
+                if self.bar_price == "mid":
+                    self._bar(slot, mid, ts)
+            c["quote_us"][slot] = ts
+        elif type(tick) is ReferencePriceTick:
+            price = tick.price_conv
+            c["reference"][slot] = price
+            if self.bar_price == "reference":
+                self._bar(slot, price, ts)
+        else:
+            price = tick.price_conv
+            previous = c["last"][slot]
+            elapsed = ts - c["trade_us"][slot]
+            if previous > 0 and price > 0:
+                log_return = math.log(price / previous)
+                variance = self._ewma(c["volatility"][slot] ** 2, log_return * log_return, elapsed)
+                c["volatility"][slot] = math.sqrt(variance)
+            c["last"][slot] = price
+            c["trade_ewma"][slot] = self._ewma(c["trade_ewma"][slot], price, elapsed)
+            c["trades"][slot] += 1
+            c["trade_us"][slot] = ts
+            if self.bar_price == "last":
+                self._bar(slot, price, ts)
+            if self.bar_count > 0:
+                count_bar = self._count_bar
+                self._add(slot, count_bar, price, ts)
+                if count_bar["count"][slot] >= self.bar_count:
+                    self._emit(slot, "count", count_bar, ts)
+        c["updated_us"][slot] = ts
+        self.updates += 1
+
+    def _ewma(self, current: float, value: float, elapsed_us: float) -> float:
+        # NaN current (first value) or elapsed (first update) starts the average at value
+        if current != current or elapsed_us != elapsed_us:
+            return value
+        decay = 2.0 ** (-max(elapsed_us, 0.0) / self.halflife_us) if self.halflife_us > 0 else 0.0
+        return decay * current + (1.0 - decay) * value
+
+    def _bar(self, slot: int, price: float, ts: int) -> None:
+        if self.bar_us > 0:
+            time_bar = self._time_bar
+            start = ts - ts % self.bar_us
+            if time_bar["count"][slot] and time_bar["start"][slot] != start:
+                self._emit(slot, "time", time_bar, int(time_bar["start"][slot]) + self.bar_us)
+            self._add(slot, time_bar, price, start)
+
+    @staticmethod
+    def _add(slot: int, bar: Dict[str, array], price: float, start: float) -> None:
+        if not bar["count"][slot]:
+            bar["start"][slot] = start
+            bar["open"][slot] = bar["high"][slot] = bar["low"][slot] = price
+        elif price > bar["high"][slot]:
+            bar["high"][slot] = price
+        elif price < bar["low"][slot]:
+            bar["low"][slot] = price
+        bar["close"][slot] = price
+        bar["count"][slot] += 1
+
+    def _emit(self, slot: int, kind: str, bar: Dict[str, array], end_us: int) -> None:
+        completed = Bar(
+            self.entity_ids[slot], kind, int(bar["start"][slot]), end_us,
+            bar["open"][slot], bar["high"][slot], bar["low"][slot], bar["close"][slot], int(bar["count"][slot]),
+        )
+        bar["count"][slot] = 0
+        for consumer in self.bar_consumers:
+            consumer(completed)
+
+    def flush(self) -> None:
+        """Emit every open bar, e.g. at shutdown."""
+        for slot in range(len(self.entity_ids)):
+            if self._time_bar["count"][slot]:
+                self._emit(slot, "time", self._time_bar, int(self._time_bar["start"][slot]) + self.bar_us)
+            if self._count_bar["count"][slot]:
+                self._emit(slot, "count", self._count_bar, int(self.columns["trade_us"][slot]))
+
+    def get(self, entity_id: str) -> Optional[Dict[str, float]]:
+        slot = self.slots.get(entity_id)
+        if slot is None:
+            return None
+        return {name: column[slot] for name, column in self.columns.items()}
+
+    def recompute(self) -> None:
+        """Derive mid, spread and microprice of every entity from the stored quotes, vectorized with NumPy."""
+        size = len(self.entity_ids)
+        c = self.columns
+        if np is not None:
+            bid, ask, bid_size, ask_size, mid, spread, microprice = (
+                np.frombuffer(c[name], dtype=np.float64)[:size]
+                for name in ("bid", "ask", "bid_size", "ask_size", "mid", "spread", "microprice"))
+            np.add(bid, ask, out=mid)
+            mid *= 0.5
+            np.subtract(ask, bid, out=spread)
+            sizes = bid_size + ask_size
+            with np.errstate(invalid="ignore", divide="ignore"):
+                weighted = (bid * ask_size + ask * bid_size) / sizes
+            np.copyto(microprice, np.where(sizes > 0, weighted, mid))
+            del bid, ask, bid_size, ask_size, mid, spread, microprice
+            return
+        for slot in range(size):
+            bid, ask, bid_size, ask_size = c["bid"][slot], c["ask"][slot], c["bid_size"][slot], c["ask_size"][slot]
+            mid = (bid + ask) / 2
+            sizes = bid_size + ask_size
+            c["mid"][slot] = mid
+            c["spread"][slot] = ask - bid
+            c["microprice"][slot] = (bid * ask_size + ask * bid_size) / sizes if sizes > 0 else mid
+
+    def select(self, fields: Sequence[str], entity_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Columns for `entity_ids` (default all, ids without a slot are skipped) as ndarrays when NumPy
+        is installed, else lists; 'entity_id' lists the ids in row order.
+        """
+        if entity_ids is None:
+            ids = list(self.entity_ids)
+        else:
+            ids = [entity_id for entity_id in entity_ids if entity_id in self.slots]
+        slots = [self.slots[entity_id] for entity_id in ids]
+        result: Dict[str, Any] = {"entity_id": ids}
+        for name in fields:
+            column = self.columns[name]
+            if np is not None:
+                result[name] = np.frombuffer(column, dtype=np.float64).take(slots)
+            else:
+                result[name] = [column[slot] for slot in slots]
+        return result
@@ -0,0 +1,58 @@
+"""
+Microbenchmark of the analytics stage, per tick update cost and whole-surface recompute.
+
+    python benchmarks/bench_analytics.py [entities]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analytics  # noqa: E402
+from analytics import Analytics  # noqa: E402
+from ticks import LastTradePriceTick, TopOfBookTick  # noqa: E402
+
+
+def quotes(entities: int) -> list:
+    return [
+        TopOfBookTick(str(1_728_314_722_000_000 + i), str(i), "0", 100_000 + i, 1500, 100_100 + i, 2000, price_decimals=2)
+        for i in range(entities)
+    ]
+
+
+def trades(entities: int) -> list:
+    return [LastTradePriceTick(str(1_728_314_722_000_000 + i), str(i), "0", 100_000 + i % 7, "t") for i in range(entities)]
+
+
+def time_updates(name: str, a: Analytics, ticks: list) -> None:
+    update = a.update
+    seconds = min(timeit.repeat(lambda: [update(t) for t in ticks], number=1, repeat=5))
+    print(f"{name:<36} {seconds / len(ticks) * 1e6:8.2f} us/tick")
+
+
+def time_recompute(name: str, a: Analytics) -> None:
+    seconds = min(timeit.repeat(a.recompute, number=1, repeat=5))
+    print(f"{name:<36} {seconds * 1e3:8.2f} ms for {len(a):,} entities")
+
+
+def main(entities: int = 28_000) -> None:
+    top_of_book, last_trades = quotes(entities), trades(entities)
+    a = Analytics(capacity=entities)
+    time_updates("top_of_book update (derived)", a, top_of_book)
+    time_updates("last_trade_price update (bars)", a, last_trades)
+    quotes_only = Analytics(capacity=entities, derive=False)
+    time_updates("top_of_book update (derive=False)", quotes_only, top_of_book)
+    if analytics.np is not None:
+        time_recompute("recompute, NumPy", quotes_only)
+    numpy, analytics.np = analytics.np, None
+    try:
+        time_recompute("recompute, pure Python", quotes_only)
+    finally:
+        analytics.np = numpy
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 28_000)
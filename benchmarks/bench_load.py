@@ -0,0 +1,171 @@
+"""
+Load benchmark running the client against the local exchange simulator.
+
+The simulator runs in a child process so the CPU and RSS figures are the client's alone.
+End to end latency is simulator send time (the frame timestamp) to tick delivery in the client.
+
+    python benchmarks/bench_load.py --rate 5000 --duration 10
+    python benchmarks/bench_load.py --rate 0 --duration 5                 # unthrottled, max throughput
+    python benchmarks/bench_load.py --rate 2000 --min-rate 1900 --max-p99-ms 50   # exits 1 on regression
+    python benchmarks/bench_load.py --rate 0 --connections 4 --processes 4        # sharded ingestion
+
+With --processes the CPU figure covers the merging parent only, not the shard processes.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import client  # noqa: E402
+from metrics import LatencyHistogram  # noqa: E402
+from sharding import SHARD_MODES, ShardedIngest  # noqa: E402
+from simulator import ExchangeSimulator, SimulatorConfig, load_entity_ids  # noqa: E402
+
+
+def serve(config: SimulatorConfig, ports: "multiprocessing.Queue") -> None:
+    async def run() -> None:
+        async with ExchangeSimulator(config) as simulator:
+            ports.put(simulator.port)
+            await asyncio.Future()
+
+    asyncio.run(run())
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # peak instead of current where /proc is unavailable, ru_maxrss is bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class LoadProbe:
+    """Tick consumer counting deliveries and recording end to end latency from the frame timestamp."""
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.messages = 0
+
+    def __call__(self, tick) -> None:
+        self.messages += 1
+        self.latency.record(max(0, time.time_ns() - int(tick.timestamp) * 1000))
+
+    def reset(self) -> None:
+        self.latency.reset()
+        self.messages = 0
+
+
+async def measure(endpoints: List[str], duration: float, warmup: float, ingest: Optional[ShardedIngest] = None) -> dict:
+    probe = LoadProbe()
+    client.tick_consumers.append(probe)
+    if ingest is not None:
+        tasks = [asyncio.create_task(ingest.run([probe]))]
+    else:
+        tasks = [asyncio.create_task(client.listen_to_endpoint(endpoint, max_retries=None)) for endpoint in endpoints]
+    try:
+        await asyncio.sleep(warmup)
+        probe.reset()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        started = time.perf_counter()
+        await asyncio.sleep(duration)
+        elapsed = time.perf_counter() - started
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        messages = probe.messages
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        client.tick_consumers.remove(probe)
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return {
+        "messages": messages,
+        "rate": messages / elapsed,
+        "cpu_percent": 100 * cpu / elapsed,
+        "rss_mb": rss_mb(),
+        "latency": probe.latency,
+    }
+
+
+def check(result: dict, args: argparse.Namespace) -> List[str]:
+    failures = []
+    if args.min_rate is not None and result["rate"] < args.min_rate:
+        failures.append(f"throughput {result['rate']:,.0f} msg/s below {args.min_rate:,.0f}")
+    p99_ms = result["latency"].percentile(99) / 1e6
+    if args.max_p99_ms is not None and p99_ms > args.max_p99_ms:
+        failures.append(f"p99 latency {p99_ms:.2f}ms above {args.max_p99_ms}ms")
+    if args.max_rss_mb is not None and result["rss_mb"] > args.max_rss_mb:
+        failures.append(f"rss {result['rss_mb']:.1f}MB above {args.max_rss_mb}MB")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Client load benchmark against the local exchange simulator")
+    parser.add_argument("--rate", type=float, default=5000.0, help="messages/sec per connection, 0 = unthrottled")
+    parser.add_argument("--connections", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=0, help="sharded ingestion over N processes, 0 = single loop")
+    parser.add_argument("--shard", choices=SHARD_MODES, default="endpoint")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--burst-size", type=int, default=0)
+    parser.add_argument("--burst-interval", type=float, default=1.0)
+    parser.add_argument("--min-rate", type=float, default=None, help="fail below this many msg/s")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="fail above this p99 end to end latency")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="fail above this resident set size")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    client.frame_logger.setLevel(logging.WARNING)
+    client.tick_logger.setLevel(logging.WARNING)
+    client.registry.reload(client.PRODUCT_CSV_FILE)
+
+    config = SimulatorConfig(
+        entity_ids=load_entity_ids(client.PRODUCT_CSV_FILE),
+        rate=args.rate,
+        burst_size=args.burst_size,
+        burst_interval=args.burst_interval,
+    )
+    ports: multiprocessing.Queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(config, ports), daemon=True)
+    server.start()
+    ingest = None
+    try:
+        port = ports.get(timeout=10)
+        simulator = ExchangeSimulator(config, port=port)
+        endpoints = [simulator.endpoint() for _ in range(args.connections)]
+        warmup = args.warmup
+        if args.processes > 0:
+            ingest = ShardedIngest(endpoints, args.processes, args.shard, client.PRODUCT_CSV_FILE).start()
+            # leave time for the shard processes to import and load reference data
+            warmup = max(warmup, 3.0)
+        result = asyncio.run(measure(endpoints, args.duration, warmup, ingest))
+    finally:
+        if ingest is not None:
+            ingest.close()
+        server.terminate()
+        server.join()
+
+    print(f"connections={args.connections} processes={args.processes} target_rate={args.rate:,.0f}/conn "
+          f"duration={args.duration}s")
+    print(f"throughput: {result['rate']:,.0f} msg/s ({result['messages']} messages)")
+    print(result["latency"].format("end_to_end", unit="ms", scale=1e6))
+    print(f"cpu: {result['cpu_percent']:.1f}%  rss: {result['rss_mb']:.1f}MB")
+    failures = check(result, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""
+Compares reading an expiry of option reference prices from the NumPy option surface with
+rebuilding it from per-instrument state in a Python loop.
+
+    python benchmarks/bench_option_chain.py [csv file]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from market_state import MarketStateStore  # noqa: E402
+from option_chain import OptionSurface  # noqa: E402
+from refdata import load_index  # noqa: E402
+from registry import InstrumentRegistry  # noqa: E402
+from ticks import ReferencePriceTick  # noqa: E402
+
+
+def main(csv_file: str = "data/tradeable_entity.csv") -> None:
+    registry = InstrumentRegistry(load_index(csv_file))
+    surface = OptionSurface(registry)
+    store = MarketStateStore(registry)
+    ticks = [
+        ReferencePriceTick("1728314722542871", i.entity_id, i.market_id, 10_000 + n, "mark", i.symbol, i.price_decimals)
+        for n, i in enumerate(registry.index) if i.kind == "option"
+    ]
+    print(f"{len(ticks):,} options in {sum(len(surface.expiries(u)) for u in surface.listed_underlyings())} chains")
+    for name, update in (("OptionSurface.update", surface.update), ("MarketStateStore.update", store.update)):
+        seconds = min(timeit.repeat(lambda: [update(t) for t in ticks], number=1, repeat=3))
+        print(f"{name:<36} {seconds / len(ticks) * 1e6:8.2f} us/tick")
+
+    underlying = max(surface.listed_underlyings(), key=lambda u: len(surface.expiries(u)))
+    expiry = surface.expiries(underlying)[0]
+
+    def from_objects():
+        options = sorted(
+            (i for i in registry.by_expiry(expiry) if i.underlying == underlying and i.kind == "option"),
+            key=lambda i: i.strike)
+        calls = [store.get(i.entity_id).reference for i in options if i.option_type == "C"]
+        puts = [store.get(i.entity_id).reference for i in options if i.option_type == "P"]
+        return calls, puts
+
+    def from_surface():
+        chain = surface.chain(underlying, expiry, ["reference"])
+        return chain.calls("reference"), chain.puts("reference")
+
+    count = 1000
+    for name, fn in ((f"{underlying} {expiry} chain, objects", from_objects),
+                     (f"{underlying} {expiry} chain, surface", from_surface),
+                     (f"{underlying} full surface copy", lambda: surface.surface(underlying))):
+        seconds = min(timeit.repeat(fn, number=count, repeat=3))
+        print(f"{name:<36} {seconds / count * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
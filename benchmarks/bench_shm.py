@@ -0,0 +1,105 @@
+"""
+Hand-off benchmark for the shared memory broadcast ring against a pickled multiprocessing.Queue.
+
+The parent publishes ticks at a fixed rate, every reader process records publish to read latency
+from the received_ns stamped by the writer.
+
+    python benchmarks/bench_shm.py [--readers 2] [--count 200000] [--rate 50000]
+
+The writer and readers busy poll, microsecond figures need a free core per process.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from metrics import LatencyHistogram  # noqa: E402
+from shm_ring import BroadcastReader, BroadcastWriter  # noqa: E402
+from ticks import TopOfBookTick  # noqa: E402
+
+TICK = TopOfBookTick("1728314722542871", "51997", "52006", 123456, 15000, 123500, 20000, "BTC-USD-PERPETUAL", 2, 4)
+
+
+def shm_reader(name: str, count: int, ready, results) -> None:
+    reader = BroadcastReader(name)
+    latency = LatencyHistogram()
+    received = 0
+    ready.put(True)
+    # busy poll, the idle sleep would dominate a microsecond hand-off
+    while received < count - reader.lost:
+        for record in reader.poll_raw():
+            latency.record(time.time_ns() - record[6])
+            received += 1
+    results.put(("shm", received, reader.lost, latency))
+    reader.close()
+
+
+def queue_reader(queue, count: int, ready, results) -> None:
+    latency = LatencyHistogram()
+    ready.put(True)
+    for _ in range(count):
+        _, received_ns = queue.get()
+        latency.record(time.time_ns() - received_ns)
+    results.put(("queue", count, 0, latency))
+
+
+def paced(count: int, rate: float):
+    interval = 1e9 / rate if rate else 0
+    started = time.perf_counter_ns()
+    for i in range(count):
+        if interval:
+            while time.perf_counter_ns() - started < i * interval:
+                pass
+        yield i
+
+
+def run(transport: str, readers: int, count: int, rate: float) -> List[tuple]:
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    if transport == "shm":
+        writer = BroadcastWriter("bench_shm_broadcast", capacity=65536)
+        processes = [context.Process(target=shm_reader, args=(writer.name, count, ready, results)) for _ in range(readers)]
+    else:
+        queues = [context.Queue() for _ in range(readers)]
+        processes = [context.Process(target=queue_reader, args=(q, count, ready, results)) for q in queues]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=30)
+    started = time.perf_counter()
+    for _ in paced(count, rate):
+        if transport == "shm":
+            writer.publish(TICK, time.time_ns())
+        else:
+            for queue in queues:
+                queue.put((TICK, time.time_ns()))
+    published = time.perf_counter() - started
+    outcomes = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    if transport == "shm":
+        writer.close()
+    print(f"{transport:<6} publish {count / published:12,.0f} ticks/s")
+    return outcomes
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Shared memory broadcast ring hand-off benchmark")
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=50_000, help="ticks/sec published, 0 = as fast as possible")
+    args = parser.parse_args(argv)
+
+    for transport in ("shm", "queue"):
+        for name, received, lost, latency in run(transport, args.readers, args.count, args.rate):
+            print(f"  reader received={received} lost={lost} " + latency.format(name))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
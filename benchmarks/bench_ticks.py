@@ -0,0 +1,94 @@
+"""
+Microbenchmark comparing dataclass_json model decoding with the compact tick records,
+and exchange timestamp parsing with datetime.strptime.
+
+    python benchmarks/bench_ticks.py [count]
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from model import TopOfBook  # noqa: E402
+from ticks import TopOfBookBatch, decode_top_of_book, exchange_time  # noqa: E402
+
+PAYLOAD = {
+    "timestamp": "1728314722542871",
+    "tradeable_entity_id": "51997",
+    "market_id": "52006",
+    "buy_price": "123456",
+    "buy_quantity": "15000",
+    "sell_price": "123500",
+    "sell_quantity": "20000",
+}
+
+
+def time_decoder(name: str, fn, count: int) -> float:
+    seconds = min(timeit.repeat(lambda: fn(PAYLOAD), number=count, repeat=3))
+    print(f"{name:<32} {seconds / count * 1e6:8.2f} us/msg  {count / seconds:12,.0f} msg/s")
+    return seconds
+
+
+def measure_memory(name: str, build, count: int) -> int:
+    tracemalloc.start()
+    held = build(count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    print(f"{name:<32} {size / count:8.1f} bytes/tick {size / 2 ** 20:10.1f} MiB total")
+    return size
+
+
+def build_models(count: int) -> list:
+    return [TopOfBook.from_dict(PAYLOAD) for _ in range(count)]
+
+
+def build_ticks(count: int) -> list:
+    return [decode_top_of_book(PAYLOAD) for _ in range(count)]
+
+
+def build_batch(count: int) -> TopOfBookBatch:
+    batch = TopOfBookBatch()
+    tick = decode_top_of_book(PAYLOAD)
+    for _ in range(count):
+        batch.append(tick)
+    return batch
+
+
+def strptime_time(timestamp: str) -> int:
+    parsed = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp()) * 1_000_000 + parsed.microsecond
+
+
+def time_parser(name: str, fn, timestamp: str, count: int) -> float:
+    seconds = min(timeit.repeat(lambda: fn(timestamp), number=count, repeat=3))
+    print(f"{name:<32} {seconds / count * 1e9:8.0f} ns/ts")
+    return seconds
+
+
+def main(count: int = 100_000) -> None:
+    print(f"decoding {count:,} top_of_book payloads")
+    model_time = time_decoder("TopOfBook.from_dict", TopOfBook.from_dict, count)
+    tick_time = time_decoder("decode_top_of_book", decode_top_of_book, count)
+    print(f"speedup {model_time / tick_time:.1f}x\n")
+
+    print(f"holding {count:,} ticks in memory")
+    model_size = measure_memory("list[TopOfBook]", build_models, count)
+    measure_memory("list[TopOfBookTick]", build_ticks, count)
+    batch_size = measure_memory("TopOfBookBatch", build_batch, count)
+    print(f"batch uses {batch_size / model_size:.1%} of the dataclass_json memory\n")
+
+    print(f"parsing {count:,} exchange timestamps")
+    slow = time_parser("datetime.strptime (ISO-8601)", strptime_time, "2024-10-07T15:25:22.542871Z", count)
+    time_parser("exchange_time (ISO-8601)", exchange_time, "2024-10-07T15:25:22.542871Z", count)
+    fast = time_parser("exchange_time (epoch us)", exchange_time, PAYLOAD["timestamp"], count)
+    print(f"speedup {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
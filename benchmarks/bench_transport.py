@@ -0,0 +1,90 @@
+"""
+Per-message transport overhead of the websocket settings, against the local exchange simulator.
+
+The simulator runs unthrottled in a child process and closes each connection after --messages
+frames; the client only receives, so the CPU time per message is the transport's own cost.
+
+    python benchmarks/bench_transport.py [--messages 200000] [--repeat 3]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import transport  # noqa: E402
+from simulator import ExchangeSimulator, SimulatorConfig  # noqa: E402
+from transport import TransportProfile, get_profile  # noqa: E402
+from websockets.asyncio.client import connect  # noqa: E402
+
+SETTINGS: Dict[str, TransportProfile] = {
+    "default": get_profile("default"),
+    "compression off": get_profile("default", compression=False),
+    "max_queue 1024": get_profile("default", max_queue=1024),
+    "max_queue 1024, rcvbuf 4MiB": get_profile("default", max_queue=1024, rcvbuf=2 ** 22),
+    "tcp_nodelay off": get_profile("default", tcp_nodelay=False),
+    "performance": get_profile("performance", uvloop=False),
+}
+if transport.uvloop is not None:
+    SETTINGS["performance + uvloop"] = get_profile("performance")
+
+
+def serve(messages: int, ports: "multiprocessing.Queue") -> None:
+    async def run() -> None:
+        async with ExchangeSimulator(SimulatorConfig(entity_ids=[str(i) for i in range(1000)], rate=0,
+                                                     total_messages=messages, seed=1)) as simulator:
+            ports.put(simulator.port)
+            await asyncio.Future()
+
+    asyncio.run(run())
+
+
+async def receive(endpoint: str, profile: TransportProfile) -> int:
+    count = 0
+    async with connect(endpoint, **profile.connect_kwargs()) as websocket:
+        async for _ in websocket:
+            count += 1
+    return count
+
+
+def measure(endpoint: str, profile: TransportProfile) -> Tuple[int, float, float]:
+    cpu = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    count = transport.run(receive(endpoint, profile), use_uvloop=profile.uvloop)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return count, wall, (after.ru_utime - cpu.ru_utime) + (after.ru_stime - cpu.ru_stime)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    server = context.Process(target=serve, args=(args.messages, ports), daemon=True)
+    server.start()
+    endpoint = f"ws://127.0.0.1:{ports.get(timeout=30)}/v1/feeds?type[]=top_of_book"
+    try:
+        print(f"receiving {args.messages:,} top_of_book frames, best of {args.repeat}")
+        print(f"{'setting':<30} {'cpu us/msg':>10} {'wall us/msg':>11} {'msg/s':>12}")
+        for name, profile in SETTINGS.items():
+            runs = [measure(endpoint, profile) for _ in range(args.repeat)]
+            count, wall, cpu = min(runs, key=lambda r: r[2])
+            print(f"{name:<30} {cpu / count * 1e6:10.2f} {wall / count * 1e6:11.2f} {count / wall:12,.0f}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,97 @@
 import asyncio
-import websockets
 import json
 import logging
 import os
 from datetime import datetime, timezone
-from model import ReferencePrice, LastTradePrice, TopOfBook
-from utility import lookup_conversion_number_by_id # type: ignore
+import threading
+import time
+from analytics import Analytics, Bar
+from conflation import Conflator
+from decoder import Frame, frame_text, get_decoder
+from logconfig import configure_sampling, parse_sampling, sampler, setup_logging
+from market_state import MarketStateStore
+from clock import ClockTracker
+from metrics import ClientMetrics, StageLatency, log_metrics, serve_metrics
+from option_chain import OptionSurface
+from pipeline import OverflowPolicy, Pipeline
+from recorder import Recorder
+from refdata import load_in_background, load_index
+from refresh import PendingTicks, RefDataRefresher
+from registry import Instrument, InstrumentRegistry
+from sharding import ShardedIngest
+from shm_ring import BroadcastWriter
+from sink import TickSink
+from subscribers import SubscriberRegistry
+from subscriptions import EntityFilter, filter_endpoints, multiplex, parse_subscription
+from supervisor import Backoff, ConnectionStats, ConnectionSupervisor
+from ticks import (
+    LastTradePriceTick,
+    ReferencePriceTick,
+    Tick,
+    TopOfBookTick,
+    decode_last_trade_price,
+    decode_reference_price,
+    decode_top_of_book,
+)
+from transport import TransportProfile, get_profile, run
 
 # in-mem store containing all tradeable products @ power.trade
 PRODUCT_CSV_FILE = "data/tradeable_entity.csv"
-ref_data: list[dict] | None = None
+REF_DATA_FILE = "data/ref_data.json"
+REFDATA_CACHE_FILE = "data/ref_data.cache"
+registry = InstrumentRegistry()
 
-from typing import Any, List
+# raw frames and decoded ticks log to their own categories so each can be disabled or sampled
+frame_logger = logging.getLogger("client.frames")
+tick_logger = logging.getLogger("client.ticks")
+top_of_book_sampler = sampler("top_of_book")
+reference_price_sampler = sampler("reference_price")
+last_trade_price_sampler = sampler("last_trade_price")
+
+# json decoder for websocket frames, fastest installed unless JSON_DECODER (orjson, msgspec, json) is set
+decoder = get_decoder()
+
+from typing import Any, Callable, Dict, List, Optional
+
+# latest top of book, reference price and last trade per entity id, queryable by strategy code
+market_state = MarketStateStore(registry)
+
+# per stage processing latency histograms, None disables measurement
+stage_latency: Optional[StageLatency] = None
+
+# message counters, exchange to local lag and per endpoint clock offset, None disables them
+metrics: Optional[ClientMetrics] = None
+
+# incremental mid, spread, microprice, EWMAs and bars per entity, None unless ANALYTICS is set
+analytics: Optional[Analytics] = None
+
+# option chains by underlying x expiry x call/put x strike as NumPy arrays, None unless OPTION_SURFACE is set
+option_surface: Optional[OptionSurface] = None
+
+# frames for which this returns False are dropped before decoding, e.g. sharding.ShardFilter
+frame_filter: Optional[Callable[[Frame], bool]] = None
+
+# websocket connection settings and event loop, see transport_from_env
+transport_profile = TransportProfile()
+
+# connection accounting per endpoint, reconnects, time disconnected and messages potentially missed
+connection_stats: Dict[str, ConnectionStats] = {}
+
+# called with every raw frame as it is received, before decoding, e.g. Recorder.record
+frame_consumers: List[Callable[[Frame, str], Any]] = []
+
+# called with every decoded and normalized tick, e.g. MarketStateStore.update, Conflator.update
+tick_consumers: List[Callable[[Tick], Any]] = [market_state.update]
+
+# user handlers per message type and/or instrument, each drained by its own task, see register_subscribers
+subscribers = SubscriberRegistry()
+
+# ticks for entity ids missing from the reference data are held here until a refresh resolves them,
+# None delivers them as 'Unknown' with (1, 1) conversion factors
+pending_ticks: Optional[PendingTicks] = None
+
+# the thread loading the reference data with REFDATA_LOAD=background, see hold_until_loaded
+refdata_loader: Optional[threading.Thread] = None
 
 def load_ref_data(file_path: str) -> List[dict[str, Any]]:
     #
@@ -24,119 +104,268 @@ def load_ref_data(file_path: str) -> List[dict[str, Any]]:
     return data
 
 def find_product_by_id(entity_id: str) -> str:
-    product = "Unknown"
-    if ref_data is None:
+    index = registry.index
+    if not index:
         logging.error("No Reference data loaded")
         return "Error"
-    for record in ref_data:
-        if str(record["id"]) == entity_id:
-            product = record["symbol"]
-            break
-    return product
+    return index.lookup(entity_id).symbol
 
-async def process_message(message: str, endpoint: str) -> None:
-    try:
-        logging.info(f"Received message: {message}")
-        data = json.loads(message)
+def find_instrument(entity_id: str) -> Instrument:
+    # single lookup returning product name and conversion factors, 'Unknown' with (1, 1) factors if not found
+    return registry.lookup(entity_id)
 
-        #
-        # process selected messages and flag any others
-        #
-        if "top_of_book" in data:
-            try:
-                tob = TopOfBook.from_dict(data["top_of_book"])
-                # 
-                # use lookup on reference data set to get product name
-                #
-                product = find_product_by_id(tob.tradeable_entity_id)
-
-                # lookup conversion factors for price, quantity based on entity Id
-                price_conversion_factor, quantity_conversion_factor = lookup_conversion_number_by_id(PRODUCT_CSV_FILE, tob.tradeable_entity_id)
-
-                # assign product to TOB object, convert from internal price, qty to regular amounts
-                tob.product = product
-                tob.buy_price_conv = float(tob.buy_price) / price_conversion_factor
-                tob.buy_quantity_conv = float(tob.buy_quantity) / quantity_conversion_factor
-                tob.sell_price_conv = float(tob.sell_price) / price_conversion_factor
-                tob.sell_quantity_conv = float(tob.sell_price) / quantity_conversion_factor
-                #
-                # add code here to process and/or store the TOB record
-                # ...
-                #
-                logging.info(
-                    f"Received Top Of Book (ask, bid) for product '{product}' -> {tob}"
-                )
-            except Exception as e:
-                logging.error(f"Error decoding message {message}: {e}")
+def handle_top_of_book(payload: Dict[str, Any]) -> TopOfBookTick:
+    tob = decode_top_of_book(payload)
+    # 
+    # use lookup on reference data set to get product name
+    #
+    instrument = find_instrument(tob.tradeable_entity_id)
 
-        elif "reference_price" in data:
-            try:
-                ref_price = ReferencePrice.from_dict(data["reference_price"])
-                # 
-                # use lookup on reference data set to get product name
-                #
-                product = find_product_by_id(ref_price.tradeable_entity_id)
-
-                # lookup conversion factors for price, quantity based on entity Id
-                price_conversion_factor, quantity_conversion_factor = lookup_conversion_number_by_id(PRODUCT_CSV_FILE, ref_price.tradeable_entity_id)
-
-                ref_price.product = product
-                ref_price.price_conv = float(ref_price.price) / price_conversion_factor
-                logging.info(f"Received Reference Price for product '{product}' -> {ref_price}") 
-                # 
-                # add code here to process and/or store the Reference Price record
-                # ...
-                # 
-            except Exception as e:
-                logging.error(f"Error decoding message {message}: {e}")
+    # assign product to TOB object, price, qty decimals convert internal amounts to regular amounts on read
+    tob.product = instrument.symbol
+    tob.price_decimals = instrument.price_decimals
+    tob.quantity_decimals = instrument.quantity_decimals
+    #
+    # add code here to process and/or store the TOB record
+    # ...
+    #
+    if tick_logger.isEnabledFor(logging.INFO) and top_of_book_sampler(tob.tradeable_entity_id):
+        tick_logger.info("Received Top Of Book (ask, bid) for product '%s' -> %s", tob.product, tob)
+    return tob
 
-        elif "last_trade_price" in data:
+def handle_reference_price(payload: Dict[str, Any]) -> ReferencePriceTick:
+    ref_price = decode_reference_price(payload)
+    # 
+    # use lookup on reference data set to get product name
+    #
+    instrument = find_instrument(ref_price.tradeable_entity_id)
+
+    ref_price.product = instrument.symbol
+    ref_price.price_decimals = instrument.price_decimals
+    if tick_logger.isEnabledFor(logging.INFO) and reference_price_sampler(ref_price.tradeable_entity_id):
+        tick_logger.info("Received Reference Price for product '%s' -> %s", ref_price.product, ref_price)
+    # 
+    # add code here to process and/or store the Reference Price record
+    # ...
+    # 
+    return ref_price
+
+def handle_last_trade_price(payload: Dict[str, Any]) -> LastTradePriceTick:
+    last_trade_price = decode_last_trade_price(payload)
+    # 
+    # use lookup on reference data set to get product name
+    #
+    instrument = find_instrument(last_trade_price.tradeable_entity_id)
+
+    last_trade_price.product = instrument.symbol
+    last_trade_price.price_decimals = instrument.price_decimals
+    if tick_logger.isEnabledFor(logging.INFO) and last_trade_price_sampler(last_trade_price.tradeable_entity_id):
+        tick_logger.info("Received Last Trade Price for product '%s' -> %s", last_trade_price.product, last_trade_price)
+    # 
+    # add code here to process and/or store the Last Trade Price record
+    # ...
+    # 
+    return last_trade_price
+
+#
+# message type -> handler, each frame is a json object keyed by its message type
+#
+MESSAGE_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Tick]] = {
+    "top_of_book": handle_top_of_book,
+    "reference_price": handle_reference_price,
+    "last_trade_price": handle_last_trade_price,
+}
+
+async def process_message(message: Frame, endpoint: str, received_ns: Optional[int] = None) -> None:
+    # received_ns is the time.monotonic_ns() the frame was read from the socket, now if not given,
+    # per stage latency is only measured when stage_latency is set, e.g. by replay or METRICS,
+    # counters, exchange lag and clock offset only when metrics is set
+    # stages are timed from received_ns, so in pipeline mode "parse" includes the time queued
+    received = received_ns if received_ns is not None else time.monotonic_ns()
+    latency = stage_latency
+    counters = metrics
+    if frame_filter is not None and not frame_filter(message):
+        return
+    if frame_logger.isEnabledFor(logging.INFO):
+        frame_logger.info("Received message: %s", frame_text(message))
+    try:
+        data = decoder.loads(message)
+    except decoder.errors as e:
+        logging.error(f"Error decoding message from {endpoint}: {e}")
+        if counters is not None:
+            counters.error(endpoint, "decode")
+        return
+    if latency is not None:
+        parsed = time.monotonic_ns()
+        latency.record("parse", parsed - received)
+
+    #
+    # process selected messages and flag any others
+    #
+    if isinstance(data, dict):
+        for message_type, payload in data.items():
+            handler = MESSAGE_HANDLERS.get(message_type)
+            if handler is None:
+                continue
             try:
-                last_trade_price = LastTradePrice.from_dict(data["last_trade_price"])
-                # 
-                # use lookup on reference data set to get product name
-                #
-                product = find_product_by_id(last_trade_price.tradeable_entity_id)
-                
-                # lookup conversion factors for price, quantity based on entity Id
-                price_conversion_factor, quantity_conversion_factor = lookup_conversion_number_by_id(PRODUCT_CSV_FILE, last_trade_price.tradeable_entity_id)
-
-                last_trade_price.product = product
-                last_trade_price.price_conv = float(last_trade_price.price) / price_conversion_factor
-                logging.info(f"Received Last Trade Price for product '{product}' -> {last_trade_price}") 
-                # 
-                # add code here to process and/or store the Last Trade Price record
-                # ...
-                # 
+                tick = handler(payload)
+                tick.received_ns = received
             except Exception as e:
-                logging.error(f"Error decoding message {message}: {e}")
-        else:
-            logging.warning(f"Unknown message type from {endpoint}: {data}")
-    except json.JSONDecodeError as e:
-        logging.error(f"Error decoding message from {endpoint}: {e}")
+                logging.error(f"Error decoding message {frame_text(message)}: {e}")
+                if counters is not None:
+                    counters.error(endpoint, "normalize")
+                return
+            if latency is not None:
+                normalized = time.monotonic_ns()
+                latency.record("normalize", normalized - parsed)
+            if counters is not None:
+                counters.count(endpoint, message_type)
+                if tick.exchange_us:
+                    counters.record_lag(message_type, counters.clocks.observe(endpoint, tick.exchange_us, received))
+            pending = pending_ticks
+            if pending is not None and not registry.lookup(tick.tradeable_entity_id).decimals_known:
+                pending.hold(tick)
+            else:
+                deliver_tick(tick)
+            if latency is not None:
+                delivered = time.monotonic_ns()
+                latency.record("deliver", delivered - normalized)
+                latency.record("process", delivered - received)
+            return
+    logging.warning(f"Unknown message type from {endpoint}: {data}")
+    if counters is not None:
+        counters.error(endpoint, "unknown_type")
 
-async def listen_to_endpoint(endpoint: str, max_retries: int = 5) -> None:
-   retries = 0
-   while retries < max_retries:
+def deliver_tick(tick: Tick) -> None:
+    for consumer in tick_consumers:
         try:
-            async with websockets.connect(endpoint, ping_interval=10, ping_timeout=20) as websocket:
-                logging.info(f"Connected to {endpoint}")
-                retries = 0
-                async for message in websocket:
-                    await process_message(message, endpoint)
-        except websockets.exceptions.ConnectionClosedError as e:
-            retries += 1
-            logging.error(f"Connection closed with error: {e}. Retry {retries}/{max_retries}")
-            await asyncio.sleep(5)
-        except websockets.exceptions.ConnectionClosedOK:
-            logging.info(f"Connection to {endpoint} closed cleanly.")
-            break
+            consumer(tick)
         except Exception as e:
-            retries += 1
-            logging.error(f"Unexpected error: {e}. Retry {retries}/{max_retries}")
-            await asyncio.sleep(5)
-   if retries >= max_retries:
-        logging.error(f"Max retries exceeded for {endpoint}. Giving up.")
+            logging.error(f"Error in tick consumer {consumer}: {e}")
+
+def hold_until_loaded(loader: threading.Thread) -> None:
+    #
+    # REFDATA_LOAD=background opens the connections before the reference data is loaded, ticks are held
+    # until the load swaps in the first index instead of being delivered as 'Unknown' with (1, 1) scaling;
+    # ticks for ids the loaded index does not resolve go to the refresh's pending ticks, or are delivered
+    # as before
+    #
+    global pending_ticks
+    refreshing = pending_ticks
+    loading = pending_ticks = PendingTicks(registry, max_per_id=10, max_ids=50_000, log_unknown=False)
+
+    def loaded() -> None:
+        global pending_ticks
+        if pending_ticks is not loading:
+            return
+        pending_ticks = refreshing
+        released = loading.release(deliver_tick)
+        unresolved = loading.drain()
+        for tick in unresolved:
+            if refreshing is not None:
+                refreshing.hold(tick)
+            else:
+                deliver_tick(tick)
+        logging.info(f"Reference data loaded, released {released} held ticks ({len(unresolved)} unresolved)")
+
+    # released once the thread ends, a failed load delivers the held ticks rather than holding them forever
+    asyncio.get_running_loop().run_in_executor(None, loader.join).add_done_callback(lambda future: loaded())
+
+def on_frame(message: Frame, endpoint: str) -> None:
+    for consumer in frame_consumers:
+        consumer(message, endpoint)
+
+def process_conflated(ticks: List[Tick]) -> None:
+    #
+    # add code here to process the latest tick of each instrument changed since the previous call
+    # ...
+    #
+    logging.info(f"Conflated updates for {len(ticks)} instruments")
+
+def register_subscribers() -> None:
+    #
+    # add code here to register handlers for the ticks you need, sync or async, e.g.
+    #   subscribers.subscribe(on_quote, "top_of_book", entity_ids={"51997"})
+    #   subscribers.subscribe(on_quotes, "top_of_book", batch=True)
+    #   subscribers.subscribe(reprice, "reference_price", conflate=True, interval=0.5, threaded=True)
+    # or decorate a handler with @subscribers.on("last_trade_price")
+    # ...
+    #
+    pass
+
+def process_bar(bar: Bar) -> None:
+    #
+    # add code here to process each completed time or trade count bar from the analytics stage
+    # ...
+    #
+    tick_logger.info("Completed %s bar for entity '%s' -> %s", bar.kind, bar.entity_id, bar)
+
+async def listen_to_endpoint(
+    endpoint: str,
+    max_retries: Optional[int] = 5,
+    pipeline: Optional[Pipeline] = None,
+    backoff: Optional[Backoff] = None,
+    standby: int = 0,
+) -> None:
+    #
+    # reconnects immediately after the first failure, then with jittered exponential backoff,
+    # max_retries None never gives up; standby > 0 keeps that many duplicate connections open
+    # and processes whichever copy of each frame arrives first
+    #
+    async def session(websocket: Any, supervisor: ConnectionSupervisor) -> None:
+        accept = supervisor.accept
+        if pipeline is not None:
+            # pipeline mode, frames are queued here and processed by the pipeline workers; frames
+            # outside the subscription are dropped before they take a queue slot, where the overflow
+            # policy could evict subscribed frames to make room for them
+            subscribed = frame_filter
+            if subscribed is not None:
+                first = accept
+
+                def accept(frame: Frame) -> bool:
+                    return first(frame) and subscribed(frame)
+
+            await pipeline.receive(websocket, endpoint, accept)
+            return
+        while True:
+            # receive frames as raw bytes, decoders parse utf-8 directly
+            message = await websocket.recv(decode=False)
+            received_ns = time.monotonic_ns()
+            if not accept(message):
+                continue
+            if frame_consumers:
+                on_frame(message, endpoint)
+            await process_message(message, endpoint, received_ns)
+
+    supervisor = ConnectionSupervisor(
+        endpoint, session, backoff=backoff, max_retries=max_retries, standby=standby, **transport_profile.connect_kwargs())
+    connection_stats[endpoint] = supervisor.stats
+    await supervisor.run()
+
+def transport_from_env() -> TransportProfile:
+    #
+    # WS_PROFILE=performance selects larger buffers, no compression, a 4 MiB socket receive buffer and uvloop,
+    # each setting can be overridden: WS_MAX_SIZE, WS_MAX_QUEUE, WS_WRITE_LIMIT, WS_RCVBUF (bytes/frames)
+    # and WS_COMPRESSION, WS_TCP_NODELAY, WS_UVLOOP (0 or 1)
+    #
+    def number(name: str) -> Optional[int]:
+        value = os.getenv(name)
+        return int(value) if value else None
+
+    def flag(name: str) -> Optional[bool]:
+        value = os.getenv(name)
+        return value == "1" if value else None
+
+    return get_profile(
+        os.getenv("WS_PROFILE"),
+        max_size=number("WS_MAX_SIZE"),
+        max_queue=number("WS_MAX_QUEUE"),
+        write_limit=number("WS_WRITE_LIMIT"),
+        rcvbuf=number("WS_RCVBUF"),
+        compression=flag("WS_COMPRESSION"),
+        tcp_nodelay=flag("WS_TCP_NODELAY"),
+        uvloop=flag("WS_UVLOOP"),
+    )
 
 async def main() -> None:
 
@@ -144,22 +373,30 @@ async def main() -> None:
     current_date = datetime.now(timezone.utc).strftime('%Y%m%d')
     log_filename = f"log/client.{current_date}.log"
 
-    # 
-    # setup basic file  logging config
-    # 
-    logging.basicConfig(
-        filename=log_filename,
+    #
+    # setup logging to file and console
+    # LOG_MODE=queue (default) hands records to a background thread for formatting and I/O, LOG_MODE=sync writes inline
+    # LOG_FORMAT=json writes json lines, LOG_RAW_FRAMES=0 disables raw frame logging
+    # LOG_SAMPLE_EVERY=N or e.g. 'top_of_book=100' logs 1 in N ticks per instrument
+    #
+    log_listener = setup_logging(
+        log_filename,
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
+        use_queue=os.getenv("LOG_MODE", "queue") == "queue",
+        json_lines=os.getenv("LOG_FORMAT", "text") == "json",
     )
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    logging.getLogger('').addHandler(console_handler)
+    if os.getenv("LOG_RAW_FRAMES", "1") == "0":
+        frame_logger.setLevel(logging.WARNING)
+    for category, every in parse_sampling(os.getenv("LOG_SAMPLE_EVERY", "")).items():
+        for name in (MESSAGE_HANDLERS if category == "*" else [category]):
+            configure_sampling(name, every=every)
     logging.info(f"Configured Logger using file '{log_filename}' level '{logging.INFO}'")
 
-    # 
+    global decoder
+    decoder = get_decoder(os.getenv("JSON_DECODER"))
+    logging.info(f"Using '{decoder.name}' json decoder")
+
+    #
     # define message types to monitor
     # see https://power-trade.github.io/api-docs-source/ws_feeds.html#_hosts for WS specifications
     #
@@ -172,19 +409,290 @@ async def main() -> None:
             "wss://api.wss.prod.power.trade/v1/feeds?type[]=reference_price",
             "wss://api.wss.prod.power.trade/v1/feeds?type[]=last_trade_price",
         ]
+
+    #
+    # endpoints on the same host are combined into one connection carrying every type[] unless WS_MULTIPLEX=0,
+    # WS_SPLIT_TYPES lists message types that keep a connection of their own, e.g. a heavy top_of_book stream
+    # multiplexing defaults to off when INGEST_PROCESSES shards by endpoint, as it needs one endpoint per process
+    #
+    shard_by_endpoint = int(os.getenv("INGEST_PROCESSES", "0")) > 1 and os.getenv("INGEST_SHARD", "endpoint") == "endpoint"
+    if os.getenv("WS_MULTIPLEX", "0" if shard_by_endpoint else "1") != "0":
+        split_types = [t.strip() for t in os.getenv("WS_SPLIT_TYPES", "").split(',') if t.strip()]
+        endpoints = multiplex(endpoints, split_types)
+
+    #
+    # optional instrument subscription, e.g. SUBSCRIBE='underlying=BTC;kind=option;expiry=..+7d;strike=50000..80000'
+    # frames for other entity ids are dropped before decoding, SUBSCRIBE_URL_PARAMS=1 also narrows the feed urls
+    # with tradeable_entity_id[] params for the ids resolved at startup
+    #
+    global frame_filter
+    subscription = parse_subscription(os.getenv("SUBSCRIBE", ""))
+    if subscription is not None:
+        url_params = os.getenv("SUBSCRIBE_URL_PARAMS", "0") == "1"
+        if url_params and refdata_loader is not None and refdata_loader.is_alive():
+            # the ids for the url params come from the reference data, wait for the background load
+            logging.info("Waiting for the reference data to load before narrowing the feed urls")
+            await asyncio.get_running_loop().run_in_executor(None, refdata_loader.join)
+        frame_filter = EntityFilter(subscription, registry)
+        logging.info(f"Subscribed to {len(frame_filter.entity_ids)} instruments matching {subscription}")
+        if url_params:
+            endpoints = filter_endpoints(endpoints, frame_filter.entity_ids)
+    logging.info(f"Connecting to {len(endpoints)} endpoints: {', '.join(endpoints)}")
+    logging.info(f"Using {transport_profile} on a {type(asyncio.get_running_loop()).__module__} event loop")
     
-    # Create a task for each WebSocket connection
-    tasks = [listen_to_endpoint(endpoint) for endpoint in endpoints]
+    #
+    # reconnects are immediate after the first failure, then back off exponentially with jitter
+    # from RECONNECT_INITIAL_MS up to RECONNECT_MAX_MS, and never give up unless RECONNECT_MAX_RETRIES is set
+    # closed connections back off too, unless they stayed up for RECONNECT_RESET_MS
+    # HOT_STANDBY=N keeps N duplicate connections per endpoint, the first copy of each frame is processed
+    #
+    backoff = Backoff(
+        initial=float(os.getenv("RECONNECT_INITIAL_MS", "250")) / 1000,
+        maximum=float(os.getenv("RECONNECT_MAX_MS", "30000")) / 1000,
+        reset_after=float(os.getenv("RECONNECT_RESET_MS", "5000")) / 1000,
+    )
+    max_retries = int(os.environ["RECONNECT_MAX_RETRIES"]) if os.getenv("RECONNECT_MAX_RETRIES") else None
+    standby = int(os.getenv("HOT_STANDBY", "0"))
+
+    #
+    # optional binary capture of raw frames, RECORD_DIR enables it
+    # RECORD_CODEC is one of zstd, lz4, zlib, none (default best installed)
+    # segments rotate after RECORD_SEGMENT_MB megabytes or RECORD_SEGMENT_SECONDS seconds
+    #
+    recorder = None
+    record_dir = os.getenv("RECORD_DIR")
+    if record_dir:
+        recorder = Recorder(
+            record_dir,
+            codec=os.getenv("RECORD_CODEC"),
+            max_segment_bytes=int(float(os.getenv("RECORD_SEGMENT_MB", "256")) * 2 ** 20),
+            max_segment_seconds=float(os.getenv("RECORD_SEGMENT_SECONDS", "3600")),
+        ).start()
+        frame_consumers.append(recorder.record)
+
+    #
+    # optional pipeline mode decoupling socket reads from message processing
+    # PIPELINE_WORKERS > 0 enables it, PIPELINE_OVERFLOW is one of block, drop-oldest, conflate
+    #
+    background_tasks: List[asyncio.Task] = []
+    pipeline = None
+    pipeline_workers = int(os.getenv("PIPELINE_WORKERS", "0"))
+    if pipeline_workers > 0:
+        pipeline = Pipeline(
+            process_message,
+            workers=pipeline_workers,
+            maxsize=int(os.getenv("PIPELINE_QUEUE_SIZE", "10000")),
+            policy=OverflowPolicy(os.getenv("PIPELINE_OVERFLOW", OverflowPolicy.BLOCK.value)),
+            on_frame=on_frame if frame_consumers else None,
+            pass_received_ns=True,
+        )
+        background_tasks.append(asyncio.create_task(pipeline.report(float(os.getenv("PIPELINE_REPORT_INTERVAL", "10")))))
+        logging.info(f"Pipeline mode with {pipeline_workers} workers per endpoint, overflow policy '{pipeline.policy.value}'")
+
+    #
+    # optional conflation, CONFLATE_INTERVAL_MS > 0 delivers only the latest tick per instrument
+    # to process_conflated on that cadence
+    #
+    conflate_interval_ms = int(os.getenv("CONFLATE_INTERVAL_MS", "0"))
+    if conflate_interval_ms > 0:
+        conflator = Conflator()
+        tick_consumers.append(conflator.update)
+        background_tasks.append(asyncio.create_task(conflator.run(process_conflated, conflate_interval_ms / 1000)))
+        logging.info(f"Conflating updates per instrument every {conflate_interval_ms}ms")
+
+    #
+    # subscribers registered in register_subscribers, SUBSCRIBER_THREADS sizes the pool for threaded handlers
+    # and SUBSCRIBER_REPORT_INTERVAL logs handler times per subscriber, slowest first, every N seconds
+    #
+    register_subscribers()
+    if subscribers:
+        subscribers.threads = int(os.getenv("SUBSCRIBER_THREADS", "4"))
+        tick_consumers.append(subscribers.publish)
+        await subscribers.start()
+        report_interval = float(os.getenv("SUBSCRIBER_REPORT_INTERVAL", "60"))
+        if report_interval > 0:
+            background_tasks.append(asyncio.create_task(subscribers.report(report_interval)))
+        logging.info(f"Delivering ticks to {len(subscribers)} subscribers")
+
+    #
+    # optional metrics, METRICS_PORT serves Prometheus text on http://METRICS_HOST:METRICS_PORT/metrics from this
+    # event loop, METRICS_LOG_INTERVAL logs a summary line every N seconds; with neither set nothing is measured
+    # the clock offset of each endpoint is the minimum exchange to local delay over CLOCK_WINDOW_SECONDS
+    #
+    global metrics, stage_latency
+    metrics_server = None
+    metrics_port = os.getenv("METRICS_PORT")
+    metrics_log_interval = float(os.getenv("METRICS_LOG_INTERVAL", "0"))
+    if metrics_port or metrics_log_interval > 0:
+        metrics = ClientMetrics(ClockTracker(window=float(os.getenv("CLOCK_WINDOW_SECONDS", "60"))))
+        stage_latency = metrics.stages
+
+        def connections() -> Dict[str, Dict[str, float]]:
+            return {endpoint: stats.as_dict() for endpoint, stats in connection_stats.items()}
+
+        if metrics_port:
+            metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+            metrics_server = await serve_metrics(lambda: metrics.render(connections()), metrics_host, int(metrics_port))
+            logging.info(f"Serving metrics on http://{metrics_host}:{metrics_port}/metrics")
+        if metrics_log_interval > 0:
+            background_tasks.append(asyncio.create_task(log_metrics(metrics, metrics_log_interval, connections)))
+
+    #
+    # optional analytics stage, ANALYTICS=1 keeps mid, spread, microprice, EWMAs (ANALYTICS_HALFLIFE_SECONDS)
+    # and OHLC bars of ANALYTICS_BAR_SECONDS and of ANALYTICS_BAR_COUNT trades per entity, readable from client.analytics
+    # ANALYTICS_BAR_PRICE selects the price the bars are built from: last (default), mid or reference
+    #
+    global analytics
+    if os.getenv("ANALYTICS", "0") == "1":
+        analytics = Analytics(
+            capacity=len(registry) or 1024,
+            halflife=float(os.getenv("ANALYTICS_HALFLIFE_SECONDS", "60")),
+            bar_seconds=float(os.getenv("ANALYTICS_BAR_SECONDS", "60")),
+            bar_count=int(os.getenv("ANALYTICS_BAR_COUNT", "100")),
+            bar_price=os.getenv("ANALYTICS_BAR_PRICE", "last"),
+        )
+        analytics.bar_consumers.append(process_bar)
+        tick_consumers.append(analytics.update)
+        logging.info(f"Analytics enabled with {analytics.capacity} preallocated slots")
+
+    #
+    # optional option chain surface (needs numpy), OPTION_SURFACE=1 writes reference prices and top of book of every
+    # option into client.option_surface, OPTION_SURFACE_UNDERLYINGS limits it to e.g. 'BTC,ETH'
+    #
+    global option_surface
+    if os.getenv("OPTION_SURFACE", "0") == "1":
+        underlyings = [u.strip() for u in os.getenv("OPTION_SURFACE_UNDERLYINGS", "").split(',') if u.strip()]
+        option_surface = OptionSurface(registry, underlyings)
+        tick_consumers.append(option_surface.update)
+
+    #
+    # optional live reference data refresh, REFDATA_REFRESH_SECONDS > 0 reloads the csv/json files when they change
+    # and REFDATA_URL (a tradeable entity summary endpoint) is fetched every REFDATA_URL_SECONDS
+    # ticks for unknown entity ids, or ids listed without decimals, are then held and trigger an immediate refresh
+    # instead of being mis-scaled
+    #
+    global pending_ticks
+    refresh_interval = float(os.getenv("REFDATA_REFRESH_SECONDS", "0"))
+    if refresh_interval > 0:
+        refresher = RefDataRefresher(
+            registry,
+            PRODUCT_CSV_FILE,
+            REF_DATA_FILE if os.path.exists(REF_DATA_FILE) else None,
+            cache_file=os.getenv("REFDATA_CACHE", REFDATA_CACHE_FILE) or None,
+            url=os.getenv("REFDATA_URL") or None,
+            interval=refresh_interval,
+            url_interval=float(os.getenv("REFDATA_URL_SECONDS", "300")),
+        )
+        pending_ticks = PendingTicks(registry, on_unknown=refresher.request_refresh)
+        refresher.on_swap.append(lambda index: pending_ticks.release(deliver_tick) if pending_ticks else None)
+        background_tasks.append(asyncio.create_task(refresher.run()))
+        logging.info(f"Refreshing reference data every {refresh_interval}s")
+    if refdata_loader is not None and refdata_loader.is_alive():
+        hold_until_loaded(refdata_loader)
+        logging.info("Holding ticks until the reference data has loaded")
+
+    #
+    # optional columnar export of ticks, SINK_PARQUET_DIR writes partitioned parquet datasets and SINK_DUCKDB
+    # appends to tables in a DuckDB file (e.g. export/ticks.duckdb), both with an instrument dimension table
+    # that is rewritten whenever the reference data is reloaded
+    # batches flush every SINK_BATCH_ROWS ticks or SINK_FLUSH_SECONDS, SINK_PARTITION lists the parquet partitions
+    #
+    tick_sink = None
+    sink_parquet_dir = os.getenv("SINK_PARQUET_DIR")
+    sink_duckdb = os.getenv("SINK_DUCKDB")
+    if sink_parquet_dir or sink_duckdb:
+        instruments = registry.index
+        tick_sink = TickSink(
+            parquet_dir=sink_parquet_dir,
+            duckdb_path=sink_duckdb,
+            instruments=instruments,
+            partition_cols=[c.strip() for c in os.getenv("SINK_PARTITION", "date,underlying").split(',') if c.strip()],
+            batch_rows=int(os.getenv("SINK_BATCH_ROWS", "50000")),
+            flush_interval=float(os.getenv("SINK_FLUSH_SECONDS", "5")),
+        ).start()
+        registry.on_swap.append(tick_sink.update_instruments)
+        if registry.index is not instruments:
+            # swapped in while the sink was created
+            tick_sink.update_instruments(registry.index)
+        tick_consumers.append(tick_sink.update)
+        logging.info(f"Exporting ticks to {', '.join(p for p in (sink_parquet_dir, sink_duckdb) if p)}")
+
+    #
+    # optional shared memory fan-out of ticks to local processes, SHM_BROADCAST names the segment
+    # readers attach to with shm_ring.BroadcastReader, SHM_BROADCAST_SLOTS sets the ring size
+    #
+    broadcast = None
+    broadcast_name = os.getenv("SHM_BROADCAST")
+    if broadcast_name:
+        broadcast = BroadcastWriter(broadcast_name, int(os.getenv("SHM_BROADCAST_SLOTS", "65536")))
+        tick_consumers.append(broadcast.publish)
+        logging.info(f"Publishing ticks to shared memory ring '{broadcast.name}'")
+
+    #
+    # optional multi-process ingestion, INGEST_PROCESSES > 0 receives and decodes in that many processes
+    # and merges their ticks here over shared memory, INGEST_SHARD is 'endpoint' (default) or 'entity'
+    # raw frame recording and pipeline mode only apply to the single process mode
+    #
+    ingest = None
+    ingest_processes = int(os.getenv("INGEST_PROCESSES", "0"))
+    if ingest_processes > 0:
+        ingest = ShardedIngest(
+            endpoints,
+            ingest_processes,
+            mode=os.getenv("INGEST_SHARD", "endpoint"),
+            csv_file=PRODUCT_CSV_FILE,
+            ref_data_file=REF_DATA_FILE if os.path.exists(REF_DATA_FILE) else None,
+            decoder_name=os.getenv("JSON_DECODER"),
+            cache_file=os.getenv("REFDATA_CACHE", REFDATA_CACHE_FILE) or None,
+            subscription=subscription,
+        ).start()
+        tasks = [ingest.run(tick_consumers)]
+    else:
+        # Create a task for each WebSocket connection
+        tasks = [
+            listen_to_endpoint(endpoint, max_retries=max_retries, pipeline=pipeline, backoff=backoff, standby=standby)
+            for endpoint in endpoints
+        ]
     
     # Run all tasks concurrently
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        if ingest is not None:
+            ingest.close()
+        if broadcast is not None:
+            broadcast.close()
+        if metrics_server is not None:
+            metrics_server.close()
+        if tick_sink is not None:
+            tick_sink.close()
+        if pipeline is not None:
+            await pipeline.close()
+        await subscribers.close()
+        if recorder is not None:
+            recorder.close()
+        if log_listener is not None:
+            log_listener.stop()
 
 if __name__ == "__main__":
     # 
     # load reference data on tradeable products 
     # enables translation from entity id ("1234") to product name ("ETH-20241003-2800C")
+    # and conversion of internal price, qty to regular amounts
+    # REFDATA_CACHE is a binary snapshot reused while the csv/json files are unchanged (empty disables it),
+    # REFDATA_LOAD=background loads on a thread so the connections open without waiting for it, ticks
+    # are held until it has loaded
     # 
-    ref_data_filename = "data/ref_data.json"
-    ref_data = load_ref_data(ref_data_filename)
-    print(f"loaded {len(ref_data)} tradeable entity records from {ref_data_filename}")
-    asyncio.run(main())
+    ref_data_file = REF_DATA_FILE if os.path.exists(REF_DATA_FILE) else None
+    cache_file = os.getenv("REFDATA_CACHE", REFDATA_CACHE_FILE) or None
+    if os.getenv("REFDATA_LOAD", "eager") == "background":
+        refdata_loader = load_in_background(registry, PRODUCT_CSV_FILE, ref_data_file, cache_file)
+        print(f"loading tradeable entity records from {PRODUCT_CSV_FILE} in the background")
+    else:
+        index = load_index(PRODUCT_CSV_FILE, ref_data_file, cache_file)
+        registry.swap(index)
+        print(f"loaded {len(index)} tradeable entity records from {PRODUCT_CSV_FILE}")
+    transport_profile = transport_from_env()
+    run(main(), use_uvloop=transport_profile.uvloop)
@@ -0,0 +1,124 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List
+
+#
+# exchange to local clock tracking per endpoint
+#
+# each tick pairs the exchange timestamp with the local monotonic receive time; the monotonic
+# time is converted to wall time with an offset sampled at start (and resampled periodically, as
+# NTP slews the wall clock) and delay = local wall receive time - exchange time
+#
+# a single delay mixes network and feed latency with the difference between the two clocks and
+# without a round trip the two cannot be separated, so the minimum delay over a sliding window is
+# taken as the clock offset (skew plus the best case latency) and what a tick's delay exceeds it
+# by is the excess lag: it is independent of skew, so a slow feed shows up as a rising excess and
+# endpoints or hosts can be compared by it
+#
+
+
+def wall_offset_ns(samples: int = 3) -> int:
+    """time.time_ns() - time.monotonic_ns(), from the narrowest of `samples` bracketed reads."""
+    best_width, offset = None, 0
+    for _ in range(samples):
+        before = time.monotonic_ns()
+        wall = time.time_ns()
+        after = time.monotonic_ns()
+        if best_width is None or after - before < best_width:
+            best_width, offset = after - before, wall - (before + after) // 2
+    return offset
+
+
+class EndpointClock:
+    """Delay statistics of one endpoint, all values in ns."""
+
+    __slots__ = ("window", "alpha", "count", "last_ns", "lag_ns", "max_ns", "_buckets")
+
+    def __init__(self, window: int = 60, alpha: float = 0.01) -> None:
+        self.window = max(1, window)
+        self.alpha = alpha
+        self.count = 0
+        self.last_ns = 0
+        # EWMA of the delay, the one-way lag as measured with the local clock
+        self.lag_ns = 0.0
+        self.max_ns = 0
+        # [second, min delay] of each second in the window, oldest first
+        self._buckets: Deque[List[int]] = deque()
+
+    def observe(self, delay_ns: int, received_ns: int) -> None:
+        second = received_ns // 1_000_000_000
+        buckets = self._buckets
+        if buckets and buckets[-1][0] == second:
+            if delay_ns < buckets[-1][1]:
+                buckets[-1][1] = delay_ns
+        else:
+            buckets.append([second, delay_ns])
+            while buckets[0][0] <= second - self.window:
+                buckets.popleft()
+        if self.count:
+            self.lag_ns += self.alpha * (delay_ns - self.lag_ns)
+            if delay_ns > self.max_ns:
+                self.max_ns = delay_ns
+        else:
+            self.lag_ns = self.max_ns = delay_ns
+        self.count += 1
+        self.last_ns = delay_ns
+
+    @property
+    def offset_ns(self) -> int:
+        """Minimum delay over the window, the exchange to local clock offset estimate."""
+        return min(bucket[1] for bucket in self._buckets) if self._buckets else 0
+
+    @property
+    def excess_ns(self) -> float:
+        """Average lag above the window minimum, independent of clock skew."""
+        return self.lag_ns - self.offset_ns if self.count else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count, "offset_ns": self.offset_ns, "lag_ns": self.lag_ns,
+            "excess_ns": self.excess_ns, "last_ns": self.last_ns, "max_ns": self.max_ns,
+        }
+
+
+class ClockTracker:
+    """
+    Running exchange to local clock offset and one-way lag per endpoint.
+
+    `window` is the number of seconds the minimum delay is taken over, `alpha` the EWMA weight of
+    each new delay and the wall clock offset is resampled every `resync` seconds.
+    """
+
+    def __init__(self, window: float = 60.0, alpha: float = 0.01, resync: float = 60.0) -> None:
+        self.window = int(window)
+        self.alpha = alpha
+        self.resync_ns = int(resync * 1e9)
+        self.clocks: Dict[str, EndpointClock] = {}
+        self._wall_offset = wall_offset_ns()
+        self._synced_ns = time.monotonic_ns()
+
+    def wall_ns(self, monotonic_ns: int) -> int:
+        """Wall clock epoch ns of a time.monotonic_ns() reading."""
+        return monotonic_ns + self._wall_offset
+
+    def observe(self, endpoint: str, exchange_us: int, received_ns: int) -> int:
+        """Record a tick with exchange time `exchange_us` received at monotonic `received_ns`, returns its delay."""
+        if received_ns - self._synced_ns > self.resync_ns:
+            self._wall_offset = wall_offset_ns()
+            self._synced_ns = received_ns
+        delay = received_ns + self._wall_offset - exchange_us * 1000
+        clock = self.clocks.get(endpoint)
+        if clock is None:
+            clock = self.clocks[endpoint] = EndpointClock(self.window, self.alpha)
+        clock.observe(delay, received_ns)
+        return delay
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {endpoint: clock.as_dict() for endpoint, clock in self.clocks.items()}
+
+    def format(self) -> str:
+        return "\n".join(
+            f"clock {endpoint}: offset={clock.offset_ns / 1e6:.3f}ms lag={clock.lag_ns / 1e6:.3f}ms "
+            f"excess={clock.excess_ns / 1e6:.3f}ms max={clock.max_ns / 1e6:.3f}ms count={clock.count}"
+            for endpoint, clock in sorted(self.clocks.items())
+        )
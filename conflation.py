@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ticks import Tick
+
+#
+# conflation keeps the latest tick per (tick type, instrument) and a set of instruments
+# changed since the last drain, consumers then handle O(changed instruments) per wakeup
+# instead of O(messages)
+#
+
+ConflationKey = Tuple[type, str]
+
+
+def conflation_key(tick: Tick) -> ConflationKey:
+    return (type(tick), tick.tradeable_entity_id)
+
+
+class Conflator:
+    """Latest-value slot per instrument plus a dirty set drained by consumers on their own cadence."""
+
+    def __init__(self, key: Callable[[Tick], Hashable] = conflation_key) -> None:
+        self._key = key
+        self._latest: Dict[Hashable, Tick] = {}
+        # dict used as an insertion ordered set of dirty keys, mapped to the latest tick
+        self._dirty: Dict[Hashable, Tick] = {}
+        self._updated = asyncio.Event()
+        self.updates = 0
+        self.conflated = 0
+        self.drained = 0
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def update(self, tick: Tick) -> None:
+        key = self._key(tick)
+        self._latest[key] = tick
+        self.updates += 1
+        if key in self._dirty:
+            self.conflated += 1
+        self._dirty[key] = tick
+        self._updated.set()
+
+    def latest(self, key: Hashable) -> Optional[Tick]:
+        return self._latest.get(key)
+
+    def drain(self) -> List[Tick]:
+        """Return the latest tick of every instrument changed since the previous drain."""
+        dirty, self._dirty = self._dirty, {}
+        self._updated.clear()
+        self.drained += len(dirty)
+        return list(dirty.values())
+
+    async def wait(self) -> List[Tick]:
+        """Wait until at least one instrument changed, then drain."""
+        await self._updated.wait()
+        return self.drain()
+
+    async def run(self, consumer: Callable[[List[Tick]], Any], interval: float) -> None:
+        """Deliver changed instruments to `consumer` every `interval` seconds, sync or async consumers."""
+        while True:
+            await asyncio.sleep(interval)
+            ticks = self.drain()
+            if not ticks:
+                continue
+            try:
+                result = consumer(ticks)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logging.error(f"Error in conflated consumer: {e}")
@@ -0,0 +1,108 @@
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+#
+# pluggable json decoding for websocket frames
+#
+# orjson or msgspec are used when installed, both parse utf-8 bytes directly so frames
+# received with recv(decode=False) never go through an intermediate str.
+# the stdlib json module is the fallback and accepts bytes as well.
+#
+
+Frame = Union[str, bytes, bytearray, memoryview]
+
+
+@dataclass(frozen=True)
+class JsonDecoder:
+    name: str
+    loads: Callable[[Frame], Any]
+    errors: Tuple[type, ...]
+
+
+def _orjson_decoder() -> JsonDecoder:
+    import orjson
+
+    return JsonDecoder("orjson", orjson.loads, (orjson.JSONDecodeError,))
+
+
+def _msgspec_decoder() -> JsonDecoder:
+    import msgspec
+
+    return JsonDecoder("msgspec", msgspec.json.Decoder().decode, (msgspec.DecodeError,))
+
+
+def _json_decoder() -> JsonDecoder:
+    return JsonDecoder("json", json.loads, (json.JSONDecodeError, UnicodeDecodeError))
+
+
+# in order of preference when no decoder is requested
+DECODER_FACTORIES: Dict[str, Callable[[], JsonDecoder]] = {
+    "orjson": _orjson_decoder,
+    "msgspec": _msgspec_decoder,
+    "json": _json_decoder,
+}
+
+
+def available_decoders() -> List[str]:
+    names = []
+    for name, factory in DECODER_FACTORIES.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_decoder(name: Optional[str] = None) -> JsonDecoder:
+    """Return the named decoder, or the fastest installed one if no name is given."""
+    if name:
+        if name not in DECODER_FACTORIES:
+            raise ValueError(f"Unknown json decoder '{name}', expected one of {list(DECODER_FACTORIES)}")
+        try:
+            return DECODER_FACTORIES[name]()
+        except ImportError:
+            logging.warning(f"JSON decoder '{name}' is not installed, falling back to stdlib json")
+            return _json_decoder()
+    for factory in DECODER_FACTORIES.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return _json_decoder()
+
+
+#
+# cheap field extraction from a raw frame without a full json parse,
+# used to route, conflate or filter frames before they are decoded
+#
+_ENTITY_ID_STR = re.compile(r'"tradeable_entity_id"\s*:\s*"?(\d+)')
+_ENTITY_ID_BYTES = re.compile(rb'"tradeable_entity_id"\s*:\s*"?(\d+)')
+_MESSAGE_TYPE_STR = re.compile(r'^\s*\{\s*"(\w+)"')
+_MESSAGE_TYPE_BYTES = re.compile(rb'^\s*\{\s*"(\w+)"')
+
+
+def peek_entity_id(frame: Frame) -> Optional[str]:
+    if isinstance(frame, str):
+        match = _ENTITY_ID_STR.search(frame)
+        return match.group(1) if match else None
+    match = _ENTITY_ID_BYTES.search(frame)
+    return match.group(1).decode() if match else None
+
+
+def peek_message_type(frame: Frame) -> Optional[str]:
+    if isinstance(frame, str):
+        match = _MESSAGE_TYPE_STR.match(frame)
+        return match.group(1) if match else None
+    match = _MESSAGE_TYPE_BYTES.match(frame)
+    return match.group(1).decode() if match else None
+
+
+def frame_text(frame: Frame) -> str:
+    """Frame as text for logging, raw bytes frames would otherwise log as b'...'."""
+    if isinstance(frame, str):
+        return frame
+    return bytes(frame).decode("utf-8", "replace")
@@ -0,0 +1,101 @@
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, List, Sequence, Union
+
+#
+# prices and quantities on the power.trade feeds are integers scaled by the number of
+# decimals configured per tradeable entity (see data/tradeable_entity.csv).
+# values are kept as (mantissa, exponent) pairs and only turned into float/Decimal on request,
+# value = mantissa / 10 ** exponent
+#
+
+# cached powers of ten, covers every decimals value used by tradeable entities
+POW10: List[int] = [10 ** n for n in range(32)]
+
+
+def pow10(exponent: int) -> int:
+    return POW10[exponent] if 0 <= exponent < 32 else 10 ** exponent
+
+
+def parse_mantissa(raw: Union[str, int]) -> int:
+    """Parse a raw feed value ("6500000", "10.0") into its integer mantissa."""
+    if type(raw) is int:
+        return raw
+    try:
+        return int(raw)
+    except ValueError:
+        try:
+            value = Decimal(raw)
+        except InvalidOperation:
+            raise ValueError(f"Raw value '{raw}' is not a number") from None
+        if not value.is_finite() or value != value.to_integral_value():
+            raise ValueError(f"Raw value '{raw}' is not an integer number of units")
+        return int(value)
+
+
+def to_float(mantissa: int, exponent: int) -> float:
+    # int / int true division is correctly rounded, unlike float(str) / 10 ** n
+    return mantissa / pow10(exponent)
+
+
+def to_decimal(mantissa: int, exponent: int) -> Decimal:
+    return Decimal(mantissa).scaleb(-exponent)
+
+
+class FixedPoint:
+    """Exact decimal value held as an integer mantissa and a base-10 exponent."""
+
+    __slots__ = ("mantissa", "exponent")
+
+    def __init__(self, mantissa: int, exponent: int) -> None:
+        self.mantissa = mantissa
+        self.exponent = exponent
+
+    @classmethod
+    def from_raw(cls, raw: Union[str, int], exponent: int) -> "FixedPoint":
+        return cls(parse_mantissa(raw), exponent)
+
+    def rescale(self, exponent: int) -> "FixedPoint":
+        if exponent < self.exponent:
+            raise ValueError(f"Cannot rescale from exponent {self.exponent} to {exponent} without losing precision")
+        return FixedPoint(self.mantissa * pow10(exponent - self.exponent), exponent)
+
+    def __float__(self) -> float:
+        return to_float(self.mantissa, self.exponent)
+
+    def to_decimal(self) -> Decimal:
+        return to_decimal(self.mantissa, self.exponent)
+
+    def __add__(self, other: "FixedPoint") -> "FixedPoint":
+        exponent = max(self.exponent, other.exponent)
+        return FixedPoint(self.rescale(exponent).mantissa + other.rescale(exponent).mantissa, exponent)
+
+    def __sub__(self, other: "FixedPoint") -> "FixedPoint":
+        exponent = max(self.exponent, other.exponent)
+        return FixedPoint(self.rescale(exponent).mantissa - other.rescale(exponent).mantissa, exponent)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FixedPoint):
+            return NotImplemented
+        exponent = max(self.exponent, other.exponent)
+        return self.rescale(exponent).mantissa == other.rescale(exponent).mantissa
+
+    def __hash__(self) -> int:
+        return hash(self.to_decimal())
+
+    def __repr__(self) -> str:
+        return f"FixedPoint({self.to_decimal()})"
+
+
+def convert_batch(mantissas: Sequence[int], exponents: Union[int, Sequence[int]]) -> List[float]:
+    """Convert many scaled integers at once, with a single exponent or one per value."""
+    if isinstance(exponents, int):
+        divisor = pow10(exponents)
+        return [m / divisor for m in mantissas]
+    if len(mantissas) != len(exponents):
+        raise ValueError(f"Got {len(mantissas)} mantissas but {len(exponents)} exponents")
+    return [m / pow10(e) for m, e in zip(mantissas, exponents)]
+
+
+def sum_scaled(mantissas: Iterable[int], exponent: int) -> FixedPoint:
+    """Aggregate values sharing an exponent without any float rounding."""
+    return FixedPoint(sum(mantissas), exponent)
@@ -0,0 +1,151 @@
+import json
+import logging
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Union
+
+#
+# logging setup for the client
+#
+# in queue mode the event loop only appends log records to an in-memory queue, a background
+# QueueListener thread formats them and does the file and console I/O.
+# per category samplers let the message path skip building log records altogether
+#
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the stock handler formats msg % args in the calling thread, here only exception text is
+        # rendered eagerly since the traceback is not safe to keep. log args must not be mutated after logging
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One json object per line with timestamp, level, logger, message and any `extra` fields."""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self.RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class Sampler:
+    """
+    Decides whether a per instrument log line is emitted, checked before a record is built.
+
+    every=N keeps 1 in N calls per key, max_per_second caps the lines per key per second.
+    """
+
+    __slots__ = ("every", "max_per_second", "_counts", "_windows")
+
+    def __init__(self, every: int = 1, max_per_second: Optional[float] = None) -> None:
+        self.every = max(1, every)
+        self.max_per_second = max_per_second
+        self._counts: Dict[str, int] = {}
+        self._windows: Dict[str, List[float]] = {}
+
+    @property
+    def unsampled(self) -> bool:
+        return self.every == 1 and self.max_per_second is None
+
+    def __call__(self, key: str) -> bool:
+        if self.every > 1:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if count % self.every:
+                return False
+        if self.max_per_second is not None:
+            now = time.monotonic()
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                self._windows[key] = [now, 1]
+                return True
+            if window[1] >= self.max_per_second:
+                return False
+            window[1] += 1
+        return True
+
+
+_samplers: Dict[str, Sampler] = {}
+
+
+def sampler(category: str) -> Sampler:
+    """Sampler for a log category (e.g. 'top_of_book'), unsampled unless configured."""
+    s = _samplers.get(category)
+    if s is None:
+        s = _samplers[category] = Sampler()
+    return s
+
+
+def configure_sampling(category: str, every: int = 1, max_per_second: Optional[float] = None) -> Sampler:
+    s = sampler(category)
+    s.every = max(1, every)
+    s.max_per_second = max_per_second
+    return s
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    # 'top_of_book=100,reference_price=10' or a single number applied to '*'
+    spec = spec.strip()
+    if not spec:
+        return {}
+    if "=" not in spec:
+        return {"*": int(spec)}
+    result = {}
+    for item in spec.split(","):
+        category, _, every = item.partition("=")
+        result[category.strip()] = int(every)
+    return result
+
+
+def setup_logging(
+    log_filename: str,
+    level: int = logging.INFO,
+    use_queue: bool = True,
+    json_lines: bool = False,
+    console: bool = True,
+) -> Optional[QueueListener]:
+    """Configure root logging to file and console, returns the started listener in queue mode."""
+    formatter: logging.Formatter = JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+    handlers: List[logging.Handler] = [logging.FileHandler(log_filename)]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger('')
+    root.setLevel(level)
+    if not use_queue:
+        for handler in handlers:
+            root.addHandler(handler)
+        return None
+
+    log_queue: "queue.SimpleQueue[Union[logging.LogRecord, None]]" = queue.SimpleQueue()
+    root.addHandler(LazyQueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
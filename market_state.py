@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from registry import InstrumentRegistry
+from ticks import LastTradePriceTick, ReferencePriceTick, Tick, TopOfBookTick
+
+#
+# live market state per tradeable entity
+#
+# each entity maps to an immutable MarketState, an update builds a new state and replaces
+# the dict entry in a single assignment. readers never take a lock and always see a complete
+# state; snapshot() copies the dict so later updates do not change what the caller holds
+#
+
+_TICK_TYPES = (TopOfBookTick, ReferencePriceTick, LastTradePriceTick)
+
+
+@dataclass(frozen=True, slots=True)
+class MarketState:
+    entity_id: str
+    top_of_book: Optional[TopOfBookTick] = None
+    reference_price: Optional[ReferencePriceTick] = None
+    last_trade: Optional[LastTradePriceTick] = None
+    # local time.monotonic_ns() receive time of the latest tick of each type, the tick's received_ns by default
+    top_of_book_received_ns: int = 0
+    reference_price_received_ns: int = 0
+    last_trade_received_ns: int = 0
+
+    @property
+    def bid(self) -> Optional[float]:
+        return self.top_of_book.buy_price_conv if self.top_of_book else None
+
+    @property
+    def bid_size(self) -> Optional[float]:
+        return self.top_of_book.buy_quantity_conv if self.top_of_book else None
+
+    @property
+    def ask(self) -> Optional[float]:
+        return self.top_of_book.sell_price_conv if self.top_of_book else None
+
+    @property
+    def ask_size(self) -> Optional[float]:
+        return self.top_of_book.sell_quantity_conv if self.top_of_book else None
+
+    @property
+    def reference(self) -> Optional[float]:
+        return self.reference_price.price_conv if self.reference_price else None
+
+    @property
+    def last(self) -> Optional[float]:
+        return self.last_trade.price_conv if self.last_trade else None
+
+    @property
+    def received_ns(self) -> int:
+        return max(self.top_of_book_received_ns, self.reference_price_received_ns, self.last_trade_received_ns)
+
+
+class MarketStateStore:
+    """Latest top of book, reference price and last trade per entity id, queried via the instrument registry."""
+
+    def __init__(self, registry: Optional[InstrumentRegistry] = None) -> None:
+        self._registry = registry if registry is not None else InstrumentRegistry()
+        self._states: Dict[str, MarketState] = {}
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._states
+
+    def update(self, tick: Tick, received_ns: Optional[int] = None) -> MarketState:
+        if type(tick) not in _TICK_TYPES:
+            raise TypeError(f"Unsupported tick type {type(tick).__name__}")
+        if received_ns is None:
+            received_ns = tick.received_ns
+        entity_id = tick.tradeable_entity_id
+        s = self._states.get(entity_id) or MarketState(entity_id)
+        if type(tick) is TopOfBookTick:
+            state = MarketState(entity_id, tick, s.reference_price, s.last_trade,
+                                received_ns, s.reference_price_received_ns, s.last_trade_received_ns)
+        elif type(tick) is ReferencePriceTick:
+            state = MarketState(entity_id, s.top_of_book, tick, s.last_trade,
+                                s.top_of_book_received_ns, received_ns, s.last_trade_received_ns)
+        else:
+            state = MarketState(entity_id, s.top_of_book, s.reference_price, tick,
+                                s.top_of_book_received_ns, s.reference_price_received_ns, received_ns)
+        self._states[entity_id] = state
+        self.updates += 1
+        return state
+
+    def get(self, entity_id: str) -> Optional[MarketState]:
+        return self._states.get(entity_id)
+
+    def by_symbol(self, symbol: str) -> Optional[MarketState]:
+        instrument = self._registry.by_symbol(symbol)
+        return self._states.get(instrument.entity_id) if instrument else None
+
+    def by_underlying(self, underlying: str) -> List[MarketState]:
+        return self._collect(i.entity_id for i in self._registry.by_underlying(underlying))
+
+    def by_expiry(self, expiry: date, underlying: Optional[str] = None) -> List[MarketState]:
+        instruments = self._registry.by_expiry(expiry)
+        if underlying is not None:
+            instruments = tuple(i for i in instruments if i.underlying == underlying)
+        return self._collect(i.entity_id for i in instruments)
+
+    def _collect(self, entity_ids: Iterable[str]) -> List[MarketState]:
+        states = self._states
+        return [state for state in map(states.get, entity_ids) if state is not None]
+
+    def snapshot(self) -> Dict[str, MarketState]:
+        # dict copy runs without releasing the GIL, so it is consistent even while a writer updates
+        return self._states.copy()
+
+    def clear(self) -> None:
+        self._states = {}
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from clock import ClockTracker
+
+#
+# low overhead latency histograms
+#
+# values (ns) are bucketed log-linearly like HdrHistogram: exact below 2 ** SUB_BITS, above that
+# each power of two is split into 2 ** (SUB_BITS - 1) buckets, i.e. < 1% relative error
+#
+# negative values (e.g. an exchange lag below zero when the clocks disagree) are recorded as 0
+# and counted in `negative`, so they neither vanish into the lowest bucket nor skew the mean
+#
+
+SUB_BITS = 8
+_HALF = 1 << (SUB_BITS - 1)
+_EXACT = 1 << SUB_BITS
+
+
+def bucket_index(value: int) -> int:
+    if value < _EXACT:
+        if value < 0:
+            raise ValueError(f"negative value {value} has no bucket")
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return shift * _HALF + (value >> shift)
+
+
+def bucket_bounds(index: int) -> tuple:
+    """Lowest and highest value counted in a bucket."""
+    if index < _EXACT:
+        return index, index
+    shift = (index >> (SUB_BITS - 1)) - 1
+    low = (index - shift * _HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "negative", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        # values below 0, recorded as 0
+        self.negative = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            self.negative += 1
+            value = 0
+        index = bucket_index(value)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def record_many(self, values: Iterable[int]) -> None:
+        for value in values:
+            self.record(value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.negative += other.negative
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+
+    def reset(self) -> None:
+        self.counts = {}
+        self.count = self.negative = self.total = self.max = 0
+        self.min = None
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> int:
+        """Value at or below which `percent` of the recorded values fall, within bucket precision."""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "negative": self.negative,
+            "mean": self.mean,
+            "min": self.min or 0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+    def format(self, name: str, unit: str = "us", scale: float = 1e3) -> str:
+        s = self.summary()
+        line = (
+            f"{name}: count={s['count']} mean={s['mean'] / scale:.1f}{unit} p50={s['p50'] / scale:.1f}{unit} "
+            f"p99={s['p99'] / scale:.1f}{unit} p999={s['p999'] / scale:.1f}{unit} max={s['max'] / scale:.1f}{unit}"
+        )
+        return f"{line} negative={s['negative']}" if s["negative"] else line
+
+
+class StageLatency:
+    """Histograms per processing stage, e.g. parse, normalize, deliver."""
+
+    def __init__(self, stages: Iterable[str] = ()) -> None:
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in stages}
+
+    def record(self, stage: str, value: int) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(value)
+
+    def __getitem__(self, stage: str) -> LatencyHistogram:
+        return self.histograms[stage]
+
+    def format(self) -> str:
+        return "\n".join(h.format(stage) for stage, h in self.histograms.items())
+
+
+#
+# client metrics surface: counters per endpoint and message type, stage latency and exchange to local lag
+# histograms and the clock offset and lag of each endpoint, rendered as Prometheus text or a one line summary
+#
+STAGES = ("parse", "normalize", "deliver", "process")
+QUANTILES = (50.0, 99.0, 99.9)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _summary(lines: List[str], name: str, histogram: LatencyHistogram, **labels: str) -> None:
+    for percent in QUANTILES:
+        lines.append(f"{name}{_labels(**labels, quantile=str(percent / 100))} {histogram.percentile(percent) / 1e9:.9f}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.total / 1e9:.9f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+class ClientMetrics:
+    """Counters and histograms updated on the message path when metrics are enabled."""
+
+    def __init__(self, clocks: Optional[ClockTracker] = None) -> None:
+        self.stages = StageLatency(STAGES)
+        self.messages: Dict[Tuple[str, str], int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        # exchange timestamp to local receive, per message type
+        self.lag: Dict[str, LatencyHistogram] = {}
+        self.clocks = clocks if clocks is not None else ClockTracker()
+        self._last_total = 0
+        self._last_report = time.monotonic()
+
+    def count(self, endpoint: str, message_type: str) -> None:
+        key = (endpoint, message_type)
+        self.messages[key] = self.messages.get(key, 0) + 1
+
+    def error(self, endpoint: str, kind: str) -> None:
+        key = (endpoint, kind)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_lag(self, message_type: str, lag_ns: int) -> None:
+        histogram = self.lag.get(message_type)
+        if histogram is None:
+            histogram = self.lag[message_type] = LatencyHistogram()
+        histogram.record(lag_ns)
+
+    def render(self, connections: Optional[Mapping[str, Mapping[str, float]]] = None) -> str:
+        """Prometheus text exposition format, `connections` maps endpoint to ConnectionStats.as_dict()."""
+        lines = ["# TYPE powertrade_messages_total counter"]
+        for (endpoint, message_type), count in sorted(self.messages.items()):
+            lines.append(f"powertrade_messages_total{_labels(endpoint=endpoint, type=message_type)} {count}")
+        lines.append("# TYPE powertrade_errors_total counter")
+        for (endpoint, kind), count in sorted(self.errors.items()):
+            lines.append(f"powertrade_errors_total{_labels(endpoint=endpoint, kind=kind)} {count}")
+        lines.append("# TYPE powertrade_stage_latency_seconds summary")
+        for stage, histogram in self.stages.histograms.items():
+            _summary(lines, "powertrade_stage_latency_seconds", histogram, stage=stage)
+        lines.append("# TYPE powertrade_exchange_lag_seconds summary")
+        for message_type, histogram in sorted(self.lag.items()):
+            _summary(lines, "powertrade_exchange_lag_seconds", histogram, type=message_type)
+        # values below zero, recorded as 0 in the summaries above
+        lines.append("# TYPE powertrade_negative_latency_total counter")
+        for stage, histogram in self.stages.histograms.items():
+            labels = _labels(metric="stage_latency", stage=stage)
+            lines.append(f"powertrade_negative_latency_total{labels} {histogram.negative}")
+        for message_type, histogram in sorted(self.lag.items()):
+            labels = _labels(metric="exchange_lag", type=message_type)
+            lines.append(f"powertrade_negative_latency_total{labels} {histogram.negative}")
+        for name, attribute in (
+            ("powertrade_clock_offset_seconds", "offset_ns"),
+            ("powertrade_one_way_lag_seconds", "lag_ns"),
+            ("powertrade_excess_lag_seconds", "excess_ns"),
+        ):
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_labels(endpoint=e)} {getattr(clock, attribute) / 1e9:.9f}"
+                         for e, clock in sorted(self.clocks.clocks.items()))
+        if connections:
+            for name, key, kind in (
+                ("powertrade_connects_total", "connects", "counter"),
+                ("powertrade_reconnects_total", "reconnects", "counter"),
+                ("powertrade_connections_live", "live", "gauge"),
+                ("powertrade_duplicates_total", "duplicates", "counter"),
+                ("powertrade_missed_messages_estimate", "missed_estimate", "gauge"),
+            ):
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_labels(endpoint=e)} {stats[key]}" for e, stats in connections.items())
+            lines.append("# TYPE powertrade_disconnected_seconds_total counter")
+            lines.extend(f"powertrade_disconnected_seconds_total{_labels(endpoint=e)} {stats['disconnected_ms'] / 1e3:.3f}"
+                         for e, stats in connections.items())
+        return "\n".join(lines) + "\n"
+
+    def summary_line(self, connections: Optional[Mapping[str, Mapping[str, float]]] = None) -> str:
+        now = time.monotonic()
+        total = sum(self.messages.values())
+        rate = (total - self._last_total) / (now - self._last_report) if now > self._last_report else 0.0
+        self._last_total, self._last_report = total, now
+        by_type: Dict[str, int] = {}
+        for (_, message_type), count in self.messages.items():
+            by_type[message_type] = by_type.get(message_type, 0) + count
+        parts = [f"messages={total} ({rate:,.0f}/s)"]
+        parts.extend(f"{t}={c}" for t, c in sorted(by_type.items()))
+        process = self.stages.histograms["process"]
+        if process.count:
+            parts.append(f"process_p99={process.percentile(99) / 1e3:.1f}us")
+        for message_type, histogram in sorted(self.lag.items()):
+            parts.append(f"{message_type}_lag_p99={histogram.percentile(99) / 1e6:.1f}ms")
+        if self.clocks.clocks:
+            parts.append(f"excess_lag_max={max(c.excess_ns for c in self.clocks.clocks.values()) / 1e6:.1f}ms")
+        if self.errors:
+            parts.append(f"errors={sum(self.errors.values())}")
+        if connections:
+            parts.append(f"reconnects={sum(s['reconnects'] for s in connections.values())}")
+        return "Metrics: " + " ".join(parts)
+
+
+async def log_metrics(
+    metrics: ClientMetrics,
+    interval: float,
+    connections: Optional[Callable[[], Mapping[str, Mapping[str, float]]]] = None,
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        logging.info(metrics.summary_line(connections() if connections else None))
+
+
+async def serve_metrics(render: Callable[[], str], host: str = "127.0.0.1", port: int = 9100) -> asyncio.AbstractServer:
+    """Minimal HTTP server on the running event loop answering GET /metrics with `render()`."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            method, _, rest = request.partition(b" ")
+            path = rest.split(b" ", 1)[0].split(b"?", 1)[0]
+            if method == b"GET" and path == b"/metrics":
+                status, body = "200 OK", render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,185 @@
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from registry import Instrument, InstrumentIndex, InstrumentRegistry
+from ticks import ReferencePriceTick, Tick, TopOfBookTick
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+#
+# option chains as NumPy arrays, grouped by underlying x expiry x call/put x strike
+#
+# every chain (underlying, expiry) is one contiguous block per field holding the calls for the
+# sorted strikes of that expiry followed by the puts, so a chain is a zero-copy (2, strikes)
+# view; a strike listed only as a call or only as a put leaves the other cell NaN
+#
+# the layout follows the instrument registry, it is rebuilt (keeping current values) the first
+# time a tick arrives after the registry swapped in a new index
+#
+
+FIELDS = ("reference", "bid", "ask", "bid_size", "ask_size", "mid", "updated_us")
+CALL, PUT = 0, 1
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for the option surface, install it with 'pip install numpy'")
+
+
+@dataclass(frozen=True)
+class ChainSlice:
+    """One expiry of an underlying, each column is a (2, strikes) view with rows CALL and PUT."""
+    underlying: str
+    expiry: date
+    strikes: "np.ndarray"
+    # entity ids as [CALL, PUT] rows aligned with strikes, "" where that option is not listed
+    entity_ids: Tuple[Tuple[str, ...], Tuple[str, ...]]
+    columns: Dict[str, "np.ndarray"]
+
+    def calls(self, field: str) -> "np.ndarray":
+        return self.columns[field][CALL]
+
+    def puts(self, field: str) -> "np.ndarray":
+        return self.columns[field][PUT]
+
+
+@dataclass(frozen=True)
+class _Chain:
+    offset: int
+    strikes: "np.ndarray"
+    entity_ids: Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+class OptionSurface:
+    """
+    Reference price and top of book of every listed option, written in place as ticks arrive.
+
+    update() can be used as a client.tick_consumers entry and ignores ticks for anything other
+    than the options of `underlyings` (default all). chain() returns live views, surface() a copy.
+    """
+
+    def __init__(self, registry: InstrumentRegistry, underlyings: Sequence[str] = ()) -> None:
+        _require_numpy()
+        self.registry = registry
+        self.underlyings = tuple(underlyings)
+        self.updates = 0
+        self._index: Optional[InstrumentIndex] = None
+        self._chains: Dict[Tuple[str, date], _Chain] = {}
+        self._cells: Dict[str, int] = {}
+        # one extra trailing cell that is always NaN, the gather target for strikes missing from an expiry
+        self._columns: Dict[str, "np.ndarray"] = {name: np.full(1, np.nan) for name in FIELDS}
+        self._gathers: Dict[str, Tuple[List[date], "np.ndarray", "np.ndarray"]] = {}
+        self._build(registry.index)
+
+    def _options(self, index: InstrumentIndex) -> Iterable[Instrument]:
+        instruments: Iterable[Instrument]
+        if self.underlyings:
+            instruments = (i for u in self.underlyings for i in index.by_underlying(u))
+        else:
+            instruments = index
+        return (i for i in instruments if i.kind == "option")
+
+    def _build(self, index: InstrumentIndex) -> None:
+        grouped: Dict[Tuple[str, date], Dict[float, List[str]]] = {}
+        for instrument in self._options(index):
+            strikes = grouped.setdefault((instrument.underlying, instrument.expiry), {})  # type: ignore[arg-type]
+            side = CALL if instrument.option_type == "C" else PUT
+            strikes.setdefault(instrument.strike, ["", ""])[side] = instrument.entity_id  # type: ignore[index]
+        chains: Dict[Tuple[str, date], _Chain] = {}
+        cells: Dict[str, int] = {}
+        offset = 0
+        for key in sorted(grouped):
+            strikes = sorted(grouped[key])
+            ids = [grouped[key][strike] for strike in strikes]
+            calls = tuple(pair[CALL] for pair in ids)
+            puts = tuple(pair[PUT] for pair in ids)
+            for row, entity_ids in ((CALL, calls), (PUT, puts)):
+                for position, entity_id in enumerate(entity_ids):
+                    if entity_id:
+                        cells[entity_id] = offset + row * len(strikes) + position
+            chains[key] = _Chain(offset, np.array(strikes, dtype=np.float64), (calls, puts))
+            offset += 2 * len(strikes)
+        columns = {name: np.full(offset + 1, np.nan) for name in FIELDS}
+        # carry current values over to the new layout
+        moved = [(cell, self._cells[entity_id]) for entity_id, cell in cells.items() if entity_id in self._cells]
+        if moved:
+            new, old = np.array(moved, dtype=np.intp).T
+            for name in FIELDS:
+                columns[name][new] = self._columns[name][old]
+        self._chains, self._cells, self._columns, self._index = chains, cells, columns, index
+        self._gathers = {}
+        logging.info(f"Option surface holds {len(cells)} options in {len(chains)} chains")
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._cells
+
+    def update(self, tick: Tick) -> None:
+        if self.registry.index is not self._index:
+            self._build(self.registry.index)
+        cell = self._cells.get(tick.tradeable_entity_id)
+        if cell is None:
+            return
+        c = self._columns
+        if type(tick) is TopOfBookTick:
+            bid, ask = tick.buy_price_conv, tick.sell_price_conv
+            c["bid"][cell], c["ask"][cell] = bid, ask
+            c["bid_size"][cell], c["ask_size"][cell] = tick.buy_quantity_conv, tick.sell_quantity_conv
+            c["mid"][cell] = (bid + ask) / 2
+        elif type(tick) is ReferencePriceTick:
+            c["reference"][cell] = tick.price_conv
+        else:
+            return
+        c["updated_us"][cell] = tick.exchange_us
+        self.updates += 1
+
+    def listed_underlyings(self) -> List[str]:
+        return sorted({underlying for underlying, _ in self._chains})
+
+    def expiries(self, underlying: str) -> List[date]:
+        return [expiry for u, expiry in self._chains if u == underlying]
+
+    def chain(self, underlying: str, expiry: date, fields: Sequence[str] = FIELDS) -> Optional[ChainSlice]:
+        """
+        Live views of one expiry, values change in place as ticks arrive until the registry swaps in a
+        new index and the layout is rebuilt; None if nothing is listed.
+        """
+        if self.registry.index is not self._index:
+            self._build(self.registry.index)
+        chain = self._chains.get((underlying, expiry))
+        if chain is None:
+            return None
+        size = len(chain.strikes)
+        columns = {name: self._columns[name][chain.offset:chain.offset + 2 * size].reshape(2, size) for name in fields}
+        return ChainSlice(underlying, expiry, chain.strikes, chain.entity_ids, columns)
+
+    def surface(self, underlying: str, field: str = "reference") -> Tuple[List[date], "np.ndarray", "np.ndarray"]:
+        """
+        Expiries, the union of their strikes, and a copy of `field` shaped (expiries, 2, strikes)
+        with rows CALL and PUT, NaN where a strike is not listed for an expiry.
+        """
+        if self.registry.index is not self._index:
+            self._build(self.registry.index)
+        expiries, strikes, gather = self._gathers.get(underlying) or self._gather(underlying)
+        return expiries, strikes, self._columns[field][gather]
+
+    def _gather(self, underlying: str) -> Tuple[List[date], "np.ndarray", "np.ndarray"]:
+        # cell index of every (expiry, call/put, strike) of the underlying, the NaN cell where not listed
+        expiries = self.expiries(underlying)
+        chains = [self._chains[(underlying, expiry)] for expiry in expiries]
+        strikes = np.unique(np.concatenate([chain.strikes for chain in chains])) if chains else np.empty(0)
+        gather = np.full((len(chains), 2, len(strikes)), len(self._columns["mid"]) - 1, dtype=np.intp)
+        for i, chain in enumerate(chains):
+            positions = np.searchsorted(strikes, chain.strikes)
+            size = len(chain.strikes)
+            gather[i, CALL, positions] = chain.offset + np.arange(size)
+            gather[i, PUT, positions] = chain.offset + size + np.arange(size)
+        self._gathers[underlying] = expiries, strikes, gather
+        return expiries, strikes, gather
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from decoder import Frame, peek_entity_id, peek_message_type
+
+#
+# pipeline mode: receive tasks only timestamp and enqueue raw frames,
+# a pool of workers per endpoint decodes and processes them off the socket read path
+#
+# the workers are coroutines on the same event loop as the receive tasks, so they add no CPU
+# parallelism: decoding still competes with socket reads for the one thread, the queue only
+# absorbs bursts. more than one worker helps only when `process` awaits I/O, and then frames
+# of an endpoint may finish out of order, so the default is a single worker
+#
+
+
+class OverflowPolicy(str, Enum):
+    BLOCK = "block"  # receive task waits for space, backpressure reaches the socket
+    DROP_OLDEST = "drop-oldest"  # oldest queued frame is discarded
+    # only once the queue is full: a queued frame for the same message type and instrument is
+    # replaced, below maxsize every frame is queued and processed
+    CONFLATE = "conflate"
+
+
+@dataclass(slots=True)
+class RawFrame:
+    endpoint: str
+    received_ns: int
+    data: Frame
+    key: Optional[Tuple[Optional[str], Optional[str]]] = None
+
+
+@dataclass(slots=True)
+class QueueMetrics:
+    enqueued: int = 0
+    dequeued: int = 0
+    dropped: int = 0
+    conflated: int = 0
+    max_depth: int = 0
+    last_lag_ns: int = 0
+    max_lag_ns: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FrameQueue(asyncio.Queue):
+    """
+    Bounded queue of raw frames applying an overflow policy when full.
+
+    Tracks depth and enqueue-to-dequeue lag so backpressure is visible before
+    it turns into ping timeouts and disconnects.
+    """
+
+    def __init__(self, maxsize: int = 10000, policy: OverflowPolicy = OverflowPolicy.BLOCK) -> None:
+        super().__init__(maxsize)
+        self.policy = OverflowPolicy(policy)
+        self.metrics = QueueMetrics()
+        self._queued: Dict[Tuple[Optional[str], Optional[str]], RawFrame] = {}
+
+    def _put(self, frame: RawFrame) -> None:
+        self._queue.append(frame)
+        if frame.key is not None:
+            self._queued[frame.key] = frame
+        metrics = self.metrics
+        metrics.enqueued += 1
+        if len(self._queue) > metrics.max_depth:
+            metrics.max_depth = len(self._queue)
+
+    def _get(self) -> RawFrame:
+        frame = self._queue.popleft()
+        self._forget(frame)
+        metrics = self.metrics
+        metrics.dequeued += 1
+        metrics.last_lag_ns = lag = time.monotonic_ns() - frame.received_ns
+        if lag > metrics.max_lag_ns:
+            metrics.max_lag_ns = lag
+        return frame
+
+    def _forget(self, frame: RawFrame) -> None:
+        if frame.key is not None and self._queued.get(frame.key) is frame:
+            del self._queued[frame.key]
+
+    def _drop_oldest(self) -> None:
+        self._forget(self._queue.popleft())
+        self.metrics.dropped += 1
+        # a dropped frame will never be processed, keep join() accurate
+        self.task_done()
+
+    def put_nowait(self, frame: RawFrame) -> None:
+        if self.policy is OverflowPolicy.CONFLATE and frame.key is None:
+            frame.key = (peek_message_type(frame.data), peek_entity_id(frame.data))
+        if self.full():
+            if self.policy is OverflowPolicy.CONFLATE:
+                queued = self._queued.get(frame.key)  # type: ignore[arg-type]
+                if queued is not None:
+                    # keep the queue position of the older frame, deliver the latest data
+                    queued.data = frame.data
+                    queued.received_ns = frame.received_ns
+                    self.metrics.conflated += 1
+                    return
+                self._drop_oldest()
+            elif self.policy is OverflowPolicy.DROP_OLDEST:
+                self._drop_oldest()
+        super().put_nowait(frame)
+
+    async def put(self, frame: RawFrame) -> None:
+        if self.policy is OverflowPolicy.BLOCK:
+            await super().put(frame)
+        else:
+            self.put_nowait(frame)
+
+
+ProcessFn = Callable[[Frame, str], Awaitable[Any]]
+
+
+@dataclass
+class Pipeline:
+    """Per endpoint bounded queue plus a pool of workers calling `process` for each frame."""
+    process: ProcessFn
+    workers: int = 1
+    maxsize: int = 10000
+    policy: OverflowPolicy = OverflowPolicy.BLOCK
+    # called with each raw frame as it is received, e.g. Recorder.record
+    on_frame: Optional[Callable[[Frame, str], Any]] = None
+    # also pass the time.monotonic_ns() each frame was received to `process`, as a third argument
+    pass_received_ns: bool = False
+    queues: Dict[str, FrameQueue] = field(default_factory=dict, init=False)
+    _tasks: List[asyncio.Task] = field(default_factory=list, init=False, repr=False)
+
+    def queue_for(self, endpoint: str) -> FrameQueue:
+        queue = self.queues.get(endpoint)
+        if queue is None:
+            queue = self.queues[endpoint] = FrameQueue(self.maxsize, self.policy)
+            for n in range(self.workers):
+                self._tasks.append(asyncio.create_task(self._worker(queue), name=f"worker-{n}:{endpoint}"))
+        return queue
+
+    async def receive(self, websocket: Any, endpoint: str, accept: Optional[Callable[[Frame], bool]] = None) -> None:
+        # only timestamp and enqueue, all decoding happens in the workers
+        # frames for which accept returns False are skipped, e.g. duplicates from a standby connection
+        queue = self.queue_for(endpoint)
+        recv = websocket.recv
+        put = queue.put
+        on_frame = self.on_frame
+        while True:
+            data = await recv(decode=False)
+            if accept is not None and not accept(data):
+                continue
+            if on_frame is not None:
+                on_frame(data, endpoint)
+            await put(RawFrame(endpoint, time.monotonic_ns(), data))
+
+    async def _worker(self, queue: FrameQueue) -> None:
+        process: Callable[..., Awaitable[Any]] = self.process
+        pass_received_ns = self.pass_received_ns
+        while True:
+            frame = await queue.get()
+            try:
+                if pass_received_ns:
+                    await process(frame.data, frame.endpoint, frame.received_ns)
+                else:
+                    await process(frame.data, frame.endpoint)
+            except Exception as e:
+                logging.error(f"Error processing message from {frame.endpoint}: {e}")
+            finally:
+                queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued frame has been processed."""
+        await asyncio.gather(*(queue.join() for queue in self.queues.values()))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {endpoint: dict(queue.metrics.as_dict(), depth=queue.qsize()) for endpoint, queue in self.queues.items()}
+
+    async def report(self, interval: float = 10.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            for endpoint, stats in self.stats().items():
+                logging.info(
+                    f"Pipeline queue for {endpoint}: depth={stats['depth']} max_depth={stats['max_depth']} "
+                    f"enqueued={stats['enqueued']} dropped={stats['dropped']} conflated={stats['conflated']} "
+                    f"lag_ms={stats['last_lag_ns'] / 1e6:.3f} max_lag_ms={stats['max_lag_ns'] / 1e6:.3f}"
+                )
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
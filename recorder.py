@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from decoder import Frame, peek_entity_id
+
+#
+# binary capture of raw websocket frames into rotating segment files
+#
+# segment layout
+#   header   b"PTRC" version:u8 codec:u8
+#   blocks   stored_len:u32 raw_len:u32 count:u32 first_ns:i64 last_ns:i64 + (compressed) records
+#   footer   json index {"blocks": [[offset, first_ns, last_ns, count], ...], "entities": {id: [block, ...]}}
+#   trailer  footer_offset:u64 b"PTRX"
+#
+# each record is received_ns:i64 entity_id:u32 endpoint_len:u16 frame_len:u32 endpoint frame.
+# blocks are self contained, a segment without footer (e.g. after a crash) is still readable sequentially
+#
+
+MAGIC = b"PTRC"
+TRAILER_MAGIC = b"PTRX"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sBB")
+BLOCK_HEADER = struct.Struct("<IIIqq")
+RECORD_HEADER = struct.Struct("<qIHI")
+TRAILER = struct.Struct("<Q4s")
+SEGMENT_SUFFIX = ".ptrc"
+
+
+@dataclass(frozen=True)
+class Codec:
+    id: int
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+def _codecs() -> Dict[str, Codec]:
+    codecs = {
+        "none": Codec(0, "none", _identity, _identity),
+        "zlib": Codec(1, "zlib", lambda d: zlib.compress(d, 1), zlib.decompress),
+    }
+    try:
+        import zstandard
+
+        zstd_compressor, zstd_decompressor = zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+        codecs["zstd"] = Codec(2, "zstd", zstd_compressor.compress, zstd_decompressor.decompress)
+    except ImportError:
+        pass
+    try:
+        import lz4.frame
+
+        codecs["lz4"] = Codec(3, "lz4", lz4.frame.compress, lz4.frame.decompress)
+    except ImportError:
+        pass
+    return codecs
+
+
+CODECS = _codecs()
+CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Named codec, or the best installed one (zstd, lz4, zlib) if no name is given."""
+    if name is None:
+        for preferred in ("zstd", "lz4", "zlib"):
+            if preferred in CODECS:
+                return CODECS[preferred]
+    if name not in CODECS:
+        raise ValueError(f"Compression codec '{name}' is not available, installed codecs are {list(CODECS)}")
+    return CODECS[name]
+
+
+class FrameRecord(NamedTuple):
+    received_ns: int
+    endpoint: str
+    entity_id: int
+    frame: bytes
+
+
+def _as_bytes(frame: Frame) -> bytes:
+    return frame.encode() if isinstance(frame, str) else bytes(frame)
+
+
+def encode_records(records: List[Tuple[int, str, Frame]]) -> Tuple[bytes, List[int]]:
+    parts = []
+    entity_ids = []
+    for received_ns, endpoint, frame in records:
+        data = _as_bytes(frame)
+        entity = peek_entity_id(data)
+        entity_id = int(entity) if entity and int(entity) < 2 ** 32 else 0
+        entity_ids.append(entity_id)
+        endpoint_bytes = endpoint.encode()
+        parts.append(RECORD_HEADER.pack(received_ns, entity_id, len(endpoint_bytes), len(data)))
+        parts.append(endpoint_bytes)
+        parts.append(data)
+    return b"".join(parts), entity_ids
+
+
+def decode_records(raw: bytes) -> Iterator[FrameRecord]:
+    offset, size = 0, len(raw)
+    view = memoryview(raw)
+    while offset < size:
+        received_ns, entity_id, endpoint_len, frame_len = RECORD_HEADER.unpack_from(raw, offset)
+        offset += RECORD_HEADER.size
+        endpoint = bytes(view[offset:offset + endpoint_len]).decode()
+        offset += endpoint_len
+        frame = bytes(view[offset:offset + frame_len])
+        offset += frame_len
+        yield FrameRecord(received_ns, endpoint, entity_id, frame)
+
+
+class SegmentWriter:
+    """Writes blocks of records into a single segment file and its index footer on close."""
+
+    def __init__(self, path: str, codec: Codec) -> None:
+        self.path = path
+        self.codec = codec
+        self.opened = time.monotonic()
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, codec.id))
+        self.size = FILE_HEADER.size
+        self.blocks: List[List[int]] = []
+        self.entities: Dict[int, List[int]] = {}
+
+    def write_block(self, records: List[Tuple[int, str, Frame]]) -> None:
+        raw, entity_ids = encode_records(records)
+        stored = self.codec.compress(raw)
+        first_ns = min(r[0] for r in records)
+        last_ns = max(r[0] for r in records)
+        block = len(self.blocks)
+        self.blocks.append([self.size, first_ns, last_ns, len(records)])
+        for entity_id in set(entity_ids):
+            if entity_id:
+                self.entities.setdefault(entity_id, []).append(block)
+        self._file.write(BLOCK_HEADER.pack(len(stored), len(raw), len(records), first_ns, last_ns))
+        self._file.write(stored)
+        self._file.flush()
+        self.size += BLOCK_HEADER.size + len(stored)
+
+    def close(self) -> None:
+        footer = json.dumps({"blocks": self.blocks, "entities": self.entities}, separators=(",", ":")).encode()
+        self._file.write(footer)
+        self._file.write(TRAILER.pack(self.size, TRAILER_MAGIC))
+        self._file.close()
+
+
+class Recorder:
+    """
+    Appends raw frames to size or time rotated segment files from a background thread.
+
+    record() only puts a tuple on an in-memory queue, batching, compression and file I/O
+    run on the writer thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "frames",
+        codec: Optional[str] = None,
+        max_segment_bytes: int = 256 * 2 ** 20,
+        max_segment_seconds: float = 3600.0,
+        batch_records: int = 2000,
+        flush_interval: float = 0.2,
+    ) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.codec = get_codec(codec)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.batch_records = batch_records
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.blocks = 0
+        self.segments: List[str] = []
+        self._queue: "queue.SimpleQueue[Optional[Tuple[int, str, Frame]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._segment: Optional[SegmentWriter] = None
+
+    def start(self) -> "Recorder":
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, frame: Frame, endpoint: str, received_ns: Optional[int] = None) -> None:
+        self._queue.put((received_ns if received_ns is not None else time.time_ns(), endpoint, frame))
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "Recorder":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        pending: List[Tuple[int, str, Frame]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()  # type: ignore[assignment]
+            if item is None:
+                break
+            if item:
+                pending.append(item)
+            if len(pending) >= self.batch_records or (pending and time.monotonic() >= deadline):
+                self._write(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if pending:
+            self._write(pending)
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write(self, records: List[Tuple[int, str, Frame]]) -> None:
+        try:
+            segment = self._segment
+            if segment is not None and (
+                segment.size >= self.max_segment_bytes or time.monotonic() - segment.opened >= self.max_segment_seconds
+            ):
+                segment.close()
+                segment = None
+            if segment is None:
+                segment = self._segment = SegmentWriter(self._next_path(), self.codec)
+                self.segments.append(segment.path)
+                logging.info(f"Recording frames to '{segment.path}' using '{self.codec.name}' compression")
+            segment.write_block(records)
+            self.records += len(records)
+            self.blocks += 1
+        except Exception as e:
+            logging.error(f"Error recording {len(records)} frames: {e}")
+
+    def _next_path(self) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        return os.path.join(self.directory, f"{self.prefix}.{stamp}.{len(self.segments):04d}{SEGMENT_SUFFIX}")
+
+
+class SegmentReader:
+    """Reads records back from a segment, using the footer index to skip blocks when filtering."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._data = file.read()
+        magic, version, codec_id = FILE_HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a frame recording segment")
+        if version != VERSION:
+            raise ValueError(f"Unsupported segment version {version} in '{path}'")
+        if codec_id not in CODECS_BY_ID:
+            raise ValueError(f"Segment '{path}' needs compression codec id {codec_id} which is not installed")
+        self.codec = CODECS_BY_ID[codec_id]
+        self.blocks, self.entities, self.complete = self._read_index()
+
+    def _read_index(self) -> Tuple[List[List[int]], Dict[int, List[int]], bool]:
+        data = self._data
+        if len(data) >= FILE_HEADER.size + TRAILER.size:
+            footer_offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+            if magic == TRAILER_MAGIC:
+                footer = json.loads(data[footer_offset:len(data) - TRAILER.size])
+                entities = {int(k): v for k, v in footer["entities"].items()}
+                return footer["blocks"], entities, True
+        # no footer, rebuild block offsets by walking the file
+        blocks = []
+        offset = FILE_HEADER.size
+        while offset + BLOCK_HEADER.size <= len(data):
+            stored_len, _, count, first_ns, last_ns = BLOCK_HEADER.unpack_from(data, offset)
+            if offset + BLOCK_HEADER.size + stored_len > len(data):
+                break
+            blocks.append([offset, first_ns, last_ns, count])
+            offset += BLOCK_HEADER.size + stored_len
+        return blocks, {}, False
+
+    def __len__(self) -> int:
+        return sum(block[3] for block in self.blocks)
+
+    def read_block(self, block: int) -> Iterator[FrameRecord]:
+        offset = self.blocks[block][0]
+        stored_len, raw_len, _, _, _ = BLOCK_HEADER.unpack_from(self._data, offset)
+        start = offset + BLOCK_HEADER.size
+        raw = self.codec.decompress(self._data[start:start + stored_len])
+        if len(raw) != raw_len:
+            raise ValueError(f"Corrupt block {block} in '{self.path}'")
+        return decode_records(raw)
+
+    def __iter__(self) -> Iterator[FrameRecord]:
+        return self.read()
+
+    def read(
+        self,
+        entity_id: Optional[Union[int, str]] = None,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+    ) -> Iterator[FrameRecord]:
+        candidates = range(len(self.blocks))
+        if entity_id is not None:
+            entity_id = int(entity_id)
+            if self.complete:
+                candidates = self.entities.get(entity_id, [])  # type: ignore[assignment]
+        for block in candidates:
+            _, first_ns, last_ns, _ = self.blocks[block]
+            if (start_ns is not None and last_ns < start_ns) or (end_ns is not None and first_ns > end_ns):
+                continue
+            for record in self.read_block(block):
+                if entity_id is not None and record.entity_id != entity_id:
+                    continue
+                if (start_ns is not None and record.received_ns < start_ns) or (
+                    end_ns is not None and record.received_ns > end_ns
+                ):
+                    continue
+                yield record
+
+
+def list_segments(directory: str, prefix: str = "") -> List[str]:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(SEGMENT_SUFFIX) and name.startswith(prefix)
+    )
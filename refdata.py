@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from registry import Instrument, InstrumentIndex, InstrumentRegistry, build_index, UNKNOWN_INSTRUMENT
+
+#
+# binary snapshot of the reference data, so later starts skip the csv/json parse
+#
+# layout
+#   header   b"PTRD" version:u8 count:u32 sources_len:u32
+#   sources  json [[path, size, mtime_ns, sha256], ...] of the files the snapshot was built from
+#   columns  price decimals (count bytes, UNKNOWN_DECIMALS when not known), quantity decimals (count bytes),
+#            then entity id, symbol, market id and status columns as one '\n' joined utf-8 blob
+#
+# a snapshot is valid while every source has the same size and mtime, or failing that the same sha256
+#
+
+SNAPSHOT_MAGIC = b"PTRD"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sBII")
+UNKNOWN_DECIMALS = 0x80
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(paths: Sequence[str]) -> List[list]:
+    sources = []
+    for path in paths:
+        stat = os.stat(path)
+        sources.append([path, stat.st_size, stat.st_mtime_ns, _sha256(path)])
+    return sources
+
+
+def _sources_match(recorded: List[list], paths: Sequence[str]) -> bool:
+    if [r[0] for r in recorded] != list(paths):
+        return False
+    for path, size, mtime_ns, sha256 in recorded:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime_ns != mtime_ns and _sha256(path) != sha256:
+            return False
+    return True
+
+
+def write_snapshot(path: str, index: InstrumentIndex, sources: Sequence[str]) -> None:
+    instruments = list(index)
+    columns = (
+        [i.entity_id for i in instruments] + [i.symbol for i in instruments]
+        + [i.market_id for i in instruments] + [i.status for i in instruments]
+    )
+    header_sources = json.dumps(fingerprint(sources)).encode()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(instruments), len(header_sources)))
+        file.write(header_sources)
+        file.write(bytes(i.price_decimals & 0xFF if i.decimals_known else UNKNOWN_DECIMALS for i in instruments))
+        file.write(bytes(i.quantity_decimals & 0xFF for i in instruments))
+        file.write("\n".join(columns).encode())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, sources: Sequence[str]) -> Optional["SnapshotIndex"]:
+    """SnapshotIndex from `path`, or None when it is missing, corrupt or older than its sources."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, count, sources_len = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        offset = SNAPSHOT_HEADER.size
+        if not _sources_match(json.loads(data[offset:offset + sources_len]), sources):
+            return None
+        offset += sources_len
+        price_decimals = data[offset:offset + count]
+        quantity_decimals = data[offset + count:offset + 2 * count]
+        strings = data[offset + 2 * count:].decode().split("\n")
+        if len(strings) != 4 * count:
+            return None
+    except (OSError, ValueError, struct.error):
+        return None
+    return SnapshotIndex(strings, price_decimals, quantity_decimals, count)
+
+
+def _signed(byte: int) -> int:
+    return byte - 256 if byte > 127 else byte
+
+
+class SnapshotIndex(InstrumentIndex):
+    """
+    InstrumentIndex over snapshot columns.
+
+    Loading only splits the columns and maps entity ids to rows; an Instrument is built the first
+    time its id is looked up, and the secondary indexes (symbol, market id, underlying, expiry)
+    the first time one of them is used.
+    """
+
+    __slots__ = ("_strings", "_price_decimals", "_quantity_decimals", "_count", "_rows", "_cache", "_full", "_lock")
+
+    def __init__(self, strings: List[str], price_decimals: bytes, quantity_decimals: bytes, count: int) -> None:
+        self._strings = strings
+        self._price_decimals = price_decimals
+        self._quantity_decimals = quantity_decimals
+        self._count = count
+        self._rows: Dict[str, int] = dict(zip(strings[:count], range(count)))
+        self._cache: Dict[str, Instrument] = {}
+        self._full: Optional[InstrumentIndex] = None
+        self._lock = threading.Lock()
+
+    def _instrument(self, row: int) -> Instrument:
+        strings, count = self._strings, self._count
+        price_decimals = self._price_decimals[row]
+        known = price_decimals != UNKNOWN_DECIMALS
+        return Instrument(
+            entity_id=strings[row],
+            symbol=strings[count + row],
+            market_id=strings[2 * count + row],
+            status=strings[3 * count + row],
+            price_decimals=_signed(price_decimals) if known else 0,
+            quantity_decimals=_signed(self._quantity_decimals[row]),
+            decimals_known=known,
+        )
+
+    def materialize(self) -> InstrumentIndex:
+        """The equivalent fully built InstrumentIndex, built once."""
+        full = self._full
+        if full is None:
+            with self._lock:
+                full = self._full
+                if full is None:
+                    cache = self._cache
+                    full = self._full = InstrumentIndex(
+                        cache.get(self._strings[row]) or self._instrument(row) for row in range(self._count))
+        return full
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._rows
+
+    def __iter__(self) -> Iterator[Instrument]:
+        return iter(self.materialize())
+
+    def get(self, entity_id: str) -> Optional[Instrument]:
+        instrument = self._cache.get(entity_id)
+        if instrument is None:
+            row = self._rows.get(entity_id)
+            if row is None:
+                return None
+            instrument = self._cache[entity_id] = self._instrument(row)
+        return instrument
+
+    def lookup(self, entity_id: str) -> Instrument:
+        return self.get(entity_id) or UNKNOWN_INSTRUMENT
+
+    def by_symbol(self, symbol: str) -> Optional[Instrument]:
+        return self.materialize().by_symbol(symbol)
+
+    def by_market_id(self, market_id: str) -> Optional[Instrument]:
+        return self.materialize().by_market_id(market_id)
+
+    def by_underlying(self, underlying: str) -> Tuple[Instrument, ...]:
+        return self.materialize().by_underlying(underlying)
+
+    def by_expiry(self, expiry: date) -> Tuple[Instrument, ...]:
+        return self.materialize().by_expiry(expiry)
+
+    def expiries(self, underlying: Optional[str] = None) -> List[date]:
+        return self.materialize().expiries(underlying)
+
+    def merge(self, records) -> InstrumentIndex:  # type: ignore[no-untyped-def]
+        return self.materialize().merge(records)
+
+
+def load_index(csv_file_path: str, ref_data_path: Optional[str] = None, cache_path: Optional[str] = None) -> InstrumentIndex:
+    """Reference data index from the snapshot at `cache_path` when it is current, else parsed and snapshotted."""
+    sources = [csv_file_path] + ([ref_data_path] if ref_data_path else [])
+    if cache_path:
+        snapshot = read_snapshot(cache_path, sources)
+        if snapshot is not None:
+            logging.info(f"Loaded {len(snapshot)} instruments from snapshot '{cache_path}'")
+            return snapshot
+    ref_data = None
+    if ref_data_path:
+        with open(ref_data_path, "r") as file:
+            ref_data = json.load(file)
+    index = build_index(csv_file_path, ref_data)
+    logging.info(f"Loaded {len(index)} instruments from '{csv_file_path}'")
+    if cache_path:
+        try:
+            write_snapshot(cache_path, index, sources)
+        except OSError as e:
+            logging.warning(f"Could not write reference data snapshot '{cache_path}': {e}")
+    return index
+
+
+def load_in_background(
+    registry: InstrumentRegistry,
+    csv_file_path: str,
+    ref_data_path: Optional[str] = None,
+    cache_path: Optional[str] = None,
+) -> threading.Thread:
+    """Load the index on a thread and swap it into `registry` when ready, lookups see an empty index until then."""
+
+    def load() -> None:
+        try:
+            registry.swap(load_index(csv_file_path, ref_data_path, cache_path))
+        except Exception as e:
+            logging.error(f"Error loading reference data from '{csv_file_path}': {e}")
+
+    thread = threading.Thread(target=load, name="refdata", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import urllib.request
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from refdata import load_index
+from registry import Instrument, InstrumentIndex, InstrumentRegistry
+from ticks import Tick, TopOfBookTick
+
+#
+# live reference data refresh
+#
+# RefDataRefresher polls the reference files (and optionally a REST snapshot url), builds the new
+# index on an executor thread and swaps it into the registry from the event loop.
+# PendingTicks holds the ticks of entity ids missing from the index, or listed without decimals
+# (e.g. only in REST records), instead of delivering them with (1, 1) conversion factors, until a
+# refresh resolves the id and its decimals
+#
+
+
+def fetch_records(url: str, timeout: float = 10.0) -> List[Dict[str, Any]]:
+    """Reference data records from a REST snapshot, e.g. .../v1/market_data/tradeable_entity/all/summary."""
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported reference data url '{url}'")
+    with urllib.request.urlopen(url, timeout=timeout) as response:  # nosec B310 - scheme checked above
+        records = json.load(response)
+    if not isinstance(records, list):
+        raise ValueError(f"Expected a json array of records from '{url}'")
+    return records
+
+
+def apply_instrument(tick: Tick, instrument: Instrument) -> Tick:
+    tick.product = instrument.symbol
+    tick.price_decimals = instrument.price_decimals
+    if isinstance(tick, TopOfBookTick):
+        tick.quantity_decimals = instrument.quantity_decimals
+    return tick
+
+
+class PendingTicks:
+    """
+    Ticks for entity ids not yet in the registry or without known decimals, oldest first per id.
+
+    At most `max_per_id` ticks are kept per id and `max_ids` ids in total, the oldest are dropped beyond that.
+    `log_unknown` False skips the warning for each new id, e.g. while the whole index is still loading.
+    """
+
+    def __init__(
+        self,
+        registry: InstrumentRegistry,
+        on_unknown: Optional[Callable[[str], Any]] = None,
+        max_per_id: int = 100,
+        max_ids: int = 100,
+        log_unknown: bool = True,
+    ) -> None:
+        self.registry = registry
+        self.on_unknown = on_unknown
+        self.log_unknown = log_unknown
+        self.max_per_id = max_per_id
+        self.max_ids = max_ids
+        self.held = 0
+        self.released = 0
+        self.dropped = 0
+        self._pending: Dict[str, Deque[Tick]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(ticks) for ticks in self._pending.values())
+
+    @property
+    def entity_ids(self) -> List[str]:
+        return list(self._pending)
+
+    def hold(self, tick: Tick) -> None:
+        entity_id = tick.tradeable_entity_id
+        ticks = self._pending.get(entity_id)
+        if ticks is None:
+            if len(self._pending) >= self.max_ids:
+                oldest = next(iter(self._pending))
+                self.dropped += len(self._pending.pop(oldest))
+            ticks = self._pending[entity_id] = deque(maxlen=self.max_per_id)
+            if self.log_unknown:
+                logging.warning(f"Holding ticks for unknown entity id '{entity_id}' until reference data resolves it")
+            if self.on_unknown is not None:
+                self.on_unknown(entity_id)
+        if len(ticks) == self.max_per_id:
+            self.dropped += 1
+        ticks.append(tick)
+        self.held += 1
+
+    def release(self, deliver: Callable[[Tick], Any]) -> int:
+        """Deliver the held ticks of every id the registry now knows with its decimals, returns how many were delivered."""
+        index = self.registry.index
+        resolved = [entity_id for entity_id in self._pending if index.lookup(entity_id).decimals_known]
+        delivered = 0
+        for entity_id in resolved:
+            instrument = index.lookup(entity_id)
+            for tick in self._pending.pop(entity_id):
+                deliver(apply_instrument(tick, instrument))
+                delivered += 1
+            logging.info(f"Resolved entity id '{entity_id}' as '{instrument.symbol}'")
+        self.released += delivered
+        return delivered
+
+    def drain(self) -> List[Tick]:
+        """Remove and return every held tick, oldest first per id."""
+        ticks = [tick for pending in self._pending.values() for tick in pending]
+        self._pending.clear()
+        return ticks
+
+
+class RefDataRefresher:
+    """
+    Keeps the registry current with the reference files and an optional REST snapshot.
+
+    Files are checked every `interval` seconds and reloaded when their size or mtime changes, the
+    url is fetched every `url_interval` seconds. request_refresh() triggers an immediate refresh,
+    at most once per `min_interval` seconds, e.g. when a tick arrives for an unknown entity id; a
+    request inside the interval is deferred to its end, the ids waiting for it are in `requested`.
+    A requested refresh only rebuilds the index when the url records or the files changed (or the
+    registry holds an index this refresher did not build), so a feed repeating an unknown id does
+    not churn the on_swap callbacks.
+    """
+
+    def __init__(
+        self,
+        registry: InstrumentRegistry,
+        csv_file: str,
+        ref_data_file: Optional[str] = None,
+        cache_file: Optional[str] = None,
+        url: Optional[str] = None,
+        interval: float = 30.0,
+        url_interval: float = 300.0,
+        min_interval: float = 5.0,
+        fetch: Callable[[str], List[Dict[str, Any]]] = fetch_records,
+    ) -> None:
+        self.registry = registry
+        self.csv_file = csv_file
+        self.ref_data_file = ref_data_file
+        self.cache_file = cache_file
+        self.url = url
+        self.interval = interval
+        self.url_interval = url_interval
+        self.min_interval = min_interval
+        self.fetch = fetch
+        self.refreshes = 0
+        self.requested: Set[str] = set()
+        self.on_swap: List[Callable[[InstrumentIndex], Any]] = []
+        self._stamps = self._file_stamps()
+        self._url_records: List[Dict[str, Any]] = []
+        self._last_fetch = float("-inf")
+        self._last_requested = float("-inf")
+        self._wake: Optional[asyncio.Event] = None
+        self._deferred: Optional[asyncio.TimerHandle] = None
+        # the index this refresher last swapped in
+        self._built: Optional[InstrumentIndex] = None
+
+    def _file_stamps(self) -> List[Tuple[int, int]]:
+        stamps = []
+        for path in (self.csv_file, self.ref_data_file):
+            if path:
+                try:
+                    stat = os.stat(path)
+                    stamps.append((stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    stamps.append((-1, -1))
+        return stamps
+
+    def request_refresh(self, entity_id: Optional[str] = None) -> None:
+        if entity_id is not None:
+            self.requested.add(entity_id)
+        if self._wake is None or self._deferred is not None:
+            # not running yet (run() picks the ids up) or a deferred refresh is already scheduled
+            return
+        delay = self._last_requested + self.min_interval - time.monotonic()
+        if delay > 0:
+            self._deferred = asyncio.get_running_loop().call_later(delay, self._wake_now)
+        else:
+            self._wake_now()
+
+    def _wake_now(self) -> None:
+        self._deferred = None
+        self._last_requested = time.monotonic()
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self) -> None:
+        self._wake = asyncio.Event()
+        if self.requested:
+            self._wake_now()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.interval)
+                    forced = True
+                except asyncio.TimeoutError:
+                    forced = False
+                self._wake.clear()
+                try:
+                    await self.refresh(forced)
+                except Exception as e:
+                    logging.error(f"Error refreshing reference data: {e}")
+        finally:
+            if self._deferred is not None:
+                self._deferred.cancel()
+                self._deferred = None
+            self._wake = None
+
+    async def refresh(self, forced: bool = False) -> bool:
+        """
+        Rebuild and swap in the index if a source changed, returns whether it swapped. `forced` fetches
+        the url now and also rebuilds when the registry holds an index loaded elsewhere, e.g. at startup.
+        """
+        loop = asyncio.get_running_loop()
+        stamps = self._file_stamps()
+        files_changed = stamps != self._stamps
+        fetched = False
+        if self.url and (forced or time.monotonic() - self._last_fetch >= self.url_interval):
+            self._last_fetch = time.monotonic()
+            records = await loop.run_in_executor(None, self.fetch, self.url)
+            fetched = records != self._url_records
+            self._url_records = records
+        if not (files_changed or fetched) and (not forced or self.registry.index is self._built):
+            return False
+        index = await loop.run_in_executor(None, self._build)
+        self._stamps = stamps
+        self._built = index
+        previous = self.registry.swap(index)
+        self.refreshes += 1
+        self.requested = {entity_id for entity_id in self.requested if not index.lookup(entity_id).decimals_known}
+        logging.info(f"Refreshed reference data, {len(index)} instruments ({len(index) - len(previous):+d})")
+        for callback in self.on_swap:
+            try:
+                callback(index)
+            except Exception as e:
+                logging.error(f"Error in reference data swap callback {callback}: {e}")
+        return True
+
+    def _build(self) -> InstrumentIndex:
+        index = load_index(self.csv_file, self.ref_data_file, self.cache_file)
+        if self._url_records:
+            index = index.merge(self._url_records)
+        return index
@@ -0,0 +1,294 @@
+import csv
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class SymbolInfo:
+    """Attributes encoded in a power.trade symbol."""
+    kind: str
+    underlying: str
+    expiry: Optional[date] = None
+    strike: Optional[float] = None
+    option_type: Optional[str] = None
+
+
+def parse_symbol(symbol: str) -> SymbolInfo:
+    #
+    # symbol formats
+    #   option      ETH-20241003-2800C, SUI-20241129-1.3000P
+    #   future      BTC-20241227
+    #   perpetual   BTC-USD-PERPETUAL
+    #   index       BTC-USD-INDEX
+    #   spot        BTC-USD, BTC-ETH
+    #
+    parts = symbol.split("-")
+    underlying = parts[0]
+    if len(parts) >= 2 and len(parts[1]) == 8 and parts[1].isdigit():
+        d = parts[1]
+        try:
+            expiry = date(int(d[:4]), int(d[4:6]), int(d[6:]))
+        except ValueError:
+            return SymbolInfo("unknown", underlying)
+        if len(parts) == 2:
+            return SymbolInfo("future", underlying, expiry)
+        leg = parts[2]
+        if len(parts) == 3 and leg[-1:] in ("C", "P"):
+            try:
+                return SymbolInfo("option", underlying, expiry, float(leg[:-1]), leg[-1])
+            except ValueError:
+                pass
+        return SymbolInfo("unknown", underlying, expiry)
+    if parts[-1] == "PERPETUAL":
+        return SymbolInfo("perpetual", underlying)
+    if parts[-1] == "INDEX":
+        return SymbolInfo("index", underlying)
+    if len(parts) == 2:
+        return SymbolInfo("spot", underlying)
+    return SymbolInfo("unknown", underlying)
+
+
+@dataclass(frozen=True, slots=True)
+class Instrument:
+    """Reference data for a single tradeable entity @ power.trade."""
+    entity_id: str
+    symbol: str
+    market_id: str = ""
+    status: str = ""
+    price_decimals: int = 0
+    quantity_decimals: int = 0
+    # False when the source (e.g. a REST record) had no decimals and the 0 defaults are placeholders
+    decimals_known: bool = field(default=True, compare=False)
+    price_factor: int = field(init=False, repr=False, compare=False)
+    quantity_factor: int = field(init=False, repr=False, compare=False)
+    info: SymbolInfo = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # precompute divisors once so the message path never evaluates 10 ** n
+        object.__setattr__(self, "price_factor", 10 ** self.price_decimals)
+        object.__setattr__(self, "quantity_factor", 10 ** self.quantity_decimals)
+        object.__setattr__(self, "info", parse_symbol(self.symbol))
+
+    @property
+    def kind(self) -> str:
+        return self.info.kind
+
+    @property
+    def underlying(self) -> str:
+        return self.info.underlying
+
+    @property
+    def expiry(self) -> Optional[date]:
+        return self.info.expiry
+
+    @property
+    def strike(self) -> Optional[float]:
+        return self.info.strike
+
+    @property
+    def option_type(self) -> Optional[str]:
+        return self.info.option_type
+
+
+# returned for entity ids missing from the index, matches legacy ("Unknown", (1, 1)) behaviour
+UNKNOWN_INSTRUMENT = Instrument(entity_id="", symbol="Unknown", decimals_known=False)
+
+
+class InstrumentIndex:
+    """
+    Immutable snapshot of reference data keyed by entity id.
+
+    Secondary indexes by symbol and market id are built once, so every lookup
+    on the message path is a single dict access.
+    """
+
+    __slots__ = ("_by_id", "_by_symbol", "_by_market_id", "_by_underlying", "_by_expiry")
+
+    def __init__(self, instruments: Iterable[Instrument] = ()) -> None:
+        self._by_id: Dict[str, Instrument] = {}
+        self._by_symbol: Dict[str, Instrument] = {}
+        self._by_market_id: Dict[str, Instrument] = {}
+        by_underlying: Dict[str, List[Instrument]] = {}
+        by_expiry: Dict[date, List[Instrument]] = {}
+        for instrument in instruments:
+            self._by_id[instrument.entity_id] = instrument
+            self._by_symbol[instrument.symbol] = instrument
+            if instrument.market_id:
+                self._by_market_id[instrument.market_id] = instrument
+        for instrument in self._by_id.values():
+            by_underlying.setdefault(instrument.underlying, []).append(instrument)
+            if instrument.expiry is not None:
+                by_expiry.setdefault(instrument.expiry, []).append(instrument)
+        self._by_underlying: Dict[str, Tuple[Instrument, ...]] = {k: tuple(v) for k, v in by_underlying.items()}
+        self._by_expiry: Dict[date, Tuple[Instrument, ...]] = {k: tuple(v) for k, v in by_expiry.items()}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return entity_id in self._by_id
+
+    def __iter__(self) -> Iterator[Instrument]:
+        return iter(self._by_id.values())
+
+    def get(self, entity_id: str) -> Optional[Instrument]:
+        return self._by_id.get(entity_id)
+
+    def lookup(self, entity_id: str) -> Instrument:
+        return self._by_id.get(entity_id, UNKNOWN_INSTRUMENT)
+
+    def by_symbol(self, symbol: str) -> Optional[Instrument]:
+        return self._by_symbol.get(symbol)
+
+    def by_market_id(self, market_id: str) -> Optional[Instrument]:
+        return self._by_market_id.get(market_id)
+
+    def by_underlying(self, underlying: str) -> Tuple[Instrument, ...]:
+        return self._by_underlying.get(underlying, ())
+
+    def by_expiry(self, expiry: date) -> Tuple[Instrument, ...]:
+        return self._by_expiry.get(expiry, ())
+
+    def expiries(self, underlying: Optional[str] = None) -> List[date]:
+        if underlying is None:
+            return sorted(self._by_expiry)
+        return sorted({i.expiry for i in self.by_underlying(underlying) if i.expiry is not None})
+
+    @classmethod
+    def from_csv(cls, csv_file_path: str) -> "InstrumentIndex":
+        return cls(read_tradeable_entity_csv(csv_file_path))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "InstrumentIndex":
+        return cls(record_instrument(r) for r in records)
+
+    def merge(self, records: Iterable[Dict[str, Any]]) -> "InstrumentIndex":
+        """
+        Return a new index with symbols taken from ref data records (e.g. data/ref_data.json).
+        Entities only present in the records take their decimals from the record when it has them,
+        otherwise they get default (1, 1) conversion factors and decimals_known False.
+        """
+        merged = dict(self._by_id)
+        for r in records:
+            entity_id = str(r["id"])
+            existing = merged.get(entity_id)
+            if existing is None:
+                merged[entity_id] = record_instrument(r)
+            elif existing.symbol != r["symbol"]:
+                merged[entity_id] = Instrument(
+                    entity_id=entity_id,
+                    symbol=r["symbol"],
+                    market_id=existing.market_id,
+                    status=existing.status,
+                    price_decimals=existing.price_decimals,
+                    quantity_decimals=existing.quantity_decimals,
+                    decimals_known=existing.decimals_known,
+                )
+        return InstrumentIndex(merged.values())
+
+
+def record_instrument(record: Dict[str, Any]) -> Instrument:
+    # ref data / REST records carry id and symbol, market id, status and decimals are optional
+    return Instrument(
+        entity_id=str(record["id"]),
+        symbol=record["symbol"],
+        market_id=str(record.get("market_id", "")),
+        status=record.get("status", ""),
+        price_decimals=int(record.get("price_decimals", 0)),
+        quantity_decimals=int(record.get("quantity_decimals", 0)),
+        decimals_known="price_decimals" in record and "quantity_decimals" in record,
+    )
+
+
+def read_tradeable_entity_csv(csv_file_path: str) -> List[Instrument]:
+    #
+    # row layout: id, symbol, , status, , market id, price decimals, quantity decimals
+    # e.g. '51997,BTC-20241227-40000P,,tradeable,, 52006, 2, 4'
+    #
+    instruments = []
+    with open(csv_file_path, mode="r") as file:
+        for row in csv.reader(file):
+            if not row:
+                continue
+            instruments.append(
+                Instrument(
+                    entity_id=row[0].strip(),
+                    symbol=row[1].strip(),
+                    market_id=row[5].strip() if len(row) > 7 else "",
+                    status=row[3].strip() if len(row) > 7 else "",
+                    price_decimals=int(row[-2]),
+                    quantity_decimals=int(row[-1]),
+                )
+            )
+    return instruments
+
+
+def build_index(csv_file_path: str, ref_data: Optional[List[Dict[str, Any]]] = None) -> InstrumentIndex:
+    index = InstrumentIndex.from_csv(csv_file_path)
+    if ref_data:
+        index = index.merge(ref_data)
+    return index
+
+
+class InstrumentRegistry:
+    """
+    Holder for the current InstrumentIndex.
+
+    Readers take `registry.index` once and use that snapshot; reloads build a
+    complete new index and swap the reference, so readers never see a partial update.
+    Callables in `on_swap` get each new index, on the thread that swapped it in.
+    """
+
+    def __init__(self, index: Optional[InstrumentIndex] = None) -> None:
+        self._index = index if index is not None else InstrumentIndex()
+        self._lock = threading.Lock()
+        self.on_swap: List[Callable[[InstrumentIndex], Any]] = []
+
+    @property
+    def index(self) -> InstrumentIndex:
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, entity_id: str) -> Optional[Instrument]:
+        return self._index.get(entity_id)
+
+    def lookup(self, entity_id: str) -> Instrument:
+        return self._index.lookup(entity_id)
+
+    def by_symbol(self, symbol: str) -> Optional[Instrument]:
+        return self._index.by_symbol(symbol)
+
+    def by_market_id(self, market_id: str) -> Optional[Instrument]:
+        return self._index.by_market_id(market_id)
+
+    def by_underlying(self, underlying: str) -> Tuple[Instrument, ...]:
+        return self._index.by_underlying(underlying)
+
+    def by_expiry(self, expiry: date) -> Tuple[Instrument, ...]:
+        return self._index.by_expiry(expiry)
+
+    def swap(self, index: InstrumentIndex) -> InstrumentIndex:
+        with self._lock:
+            previous, self._index = self._index, index
+        for callback in self.on_swap:
+            try:
+                callback(index)
+            except Exception as e:
+                logging.error(f"Error in reference data swap callback {callback}: {e}")
+        return previous
+
+    def reload(self, csv_file_path: str, ref_data_path: Optional[str] = None) -> InstrumentIndex:
+        ref_data = None
+        if ref_data_path:
+            with open(ref_data_path, "r") as file:
+                ref_data = json.load(file)
+        index = build_index(csv_file_path, ref_data)
+        self.swap(index)
+        logging.info(f"Loaded {len(index)} instruments from '{csv_file_path}'")
+        return index
@@ -0,0 +1,122 @@
+"""
+Deterministic replay of recorded frames through the client message path.
+
+    python replay.py capture/                 # as fast as possible
+    python replay.py capture/ --speed 1       # real time
+    python replay.py capture/ --speed 10      # 10x real time
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import client
+from metrics import LatencyHistogram, StageLatency
+from pipeline import Pipeline, ProcessFn, RawFrame
+from recorder import FrameRecord, SegmentReader, list_segments
+
+
+@dataclass
+class ReplayReport:
+    messages: int
+    elapsed_ns: int
+    latency: StageLatency
+    pipeline_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / (self.elapsed_ns / 1e9) if self.elapsed_ns else 0.0
+
+    def format(self) -> str:
+        lines = [f"replayed {self.messages} messages in {self.elapsed_ns / 1e9:.3f}s ({self.messages_per_second:,.0f} msg/s)"]
+        lines.extend(h.format(stage) for stage, h in self.latency.histograms.items() if h.count)
+        for endpoint, stats in self.pipeline_stats.items():
+            lines.append(f"queue {endpoint}: max_depth={stats['max_depth']} dropped={stats['dropped']} "
+                         f"conflated={stats['conflated']} max_lag_ms={stats['max_lag_ns'] / 1e6:.3f}")
+        return "\n".join(lines)
+
+
+def expand_paths(paths: Iterable[str]) -> List[str]:
+    segments = []
+    for path in paths:
+        segments.extend(list_segments(path) if os.path.isdir(path) else [path])
+    return segments
+
+
+def iter_records(paths: Iterable[str]) -> Iterator[FrameRecord]:
+    for path in expand_paths(paths):
+        yield from SegmentReader(path)
+
+
+async def replay(
+    records: Iterable[FrameRecord],
+    process: ProcessFn,
+    speed: Optional[float] = None,
+    pipeline: Optional[Pipeline] = None,
+    latency: Optional[StageLatency] = None,
+) -> ReplayReport:
+    """
+    Feed recorded frames to `process`, or through `pipeline` when given.
+
+    speed None or 0 replays as fast as possible, 1.0 keeps the recorded inter-arrival times,
+    N replays N times faster.
+    """
+    if latency is None:
+        latency = StageLatency()
+    end_to_end = latency.histograms.setdefault("end_to_end", LatencyHistogram())
+    messages = 0
+    first_ns: Optional[int] = None
+    started = perf_counter_ns()
+    for record in records:
+        if speed:
+            if first_ns is None:
+                first_ns = record.received_ns
+            delay = started + (record.received_ns - first_ns) / speed - perf_counter_ns()
+            if delay > 0:
+                await asyncio.sleep(delay / 1e9)
+        sent = perf_counter_ns()
+        if pipeline is not None:
+            await pipeline.queue_for(record.endpoint).put(RawFrame(record.endpoint, time.monotonic_ns(), record.frame))
+        else:
+            await process(record.frame, record.endpoint)
+            end_to_end.record(perf_counter_ns() - sent)
+        messages += 1
+    if pipeline is not None:
+        await pipeline.join()
+    return ReplayReport(messages, perf_counter_ns() - started, latency, pipeline.stats() if pipeline else {})
+
+
+async def run_replay(paths: List[str], speed: float, workers: int, verbose: bool) -> ReplayReport:
+    if not verbose:
+        client.frame_logger.setLevel(logging.WARNING)
+        client.tick_logger.setLevel(logging.WARNING)
+    client.stage_latency = StageLatency(("parse", "normalize", "deliver", "process"))
+    pipeline = Pipeline(client.process_message, workers=workers) if workers > 0 else None
+    try:
+        return await replay(iter_records(paths), client.process_message, speed, pipeline, client.stage_latency)
+    finally:
+        if pipeline is not None:
+            await pipeline.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded power.trade frames through the client")
+    parser.add_argument("paths", nargs="+", help="segment files or directories of segments")
+    parser.add_argument("--speed", type=float, default=0.0, help="0 = as fast as possible, 1 = real time, N = N x")
+    parser.add_argument("--pipeline-workers", type=int, default=0, help="replay through pipeline mode with N workers")
+    parser.add_argument("--verbose", action="store_true", help="keep raw frame and tick logging enabled")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    client.registry.reload(client.PRODUCT_CSV_FILE)
+    report = asyncio.run(run_replay(args.paths, args.speed, args.pipeline_workers, args.verbose))
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from decoder import Frame, peek_entity_id
+from shm_ring import SpscRing
+from subscriptions import EntityFilter, Subscription
+from ticks import Tick
+
+#
+# multi-process ingestion
+#
+# each shard process runs its own event loop receiving and decoding frames, normalized ticks
+# come back to the parent over a shared memory ring per shard and are merged there,
+# e.g. into client.market_state
+#
+# mode 'endpoint' spreads the endpoints over the processes, mode 'entity' connects every process
+# to every endpoint and each keeps the entity ids hashing to its shard, dropping the others
+# before json decoding; a SUBSCRIBE subscription is passed to every shard and applied there too
+#
+
+SHARD_MODES = ("endpoint", "entity")
+
+
+def shard_of(entity_id: str, shards: int) -> int:
+    # crc32 rather than hash() so every process agrees regardless of PYTHONHASHSEED
+    return zlib.crc32(entity_id.encode()) % shards
+
+
+class ShardFilter:
+    """Frame filter keeping frames for the entity ids in one shard, frames without an id are kept by shard 0."""
+
+    def __init__(self, shard: int, shards: int) -> None:
+        self.shard = shard
+        self.shards = shards
+
+    def __call__(self, frame: Frame) -> bool:
+        entity_id = peek_entity_id(frame)
+        if entity_id is None:
+            return self.shard == 0
+        return shard_of(entity_id, self.shards) == self.shard
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    index: int
+    endpoints: Tuple[str, ...]
+    # > 1 keeps only the entity ids hashing to index
+    shards: int = 1
+
+
+def plan_shards(endpoints: Sequence[str], processes: int, mode: str = "endpoint") -> List[ShardSpec]:
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode '{mode}', expected one of {', '.join(SHARD_MODES)}")
+    if processes <= 0 or not endpoints:
+        raise ValueError("sharding needs at least one process and one endpoint")
+    if mode == "entity":
+        return [ShardSpec(i, tuple(endpoints), processes) for i in range(processes)]
+    processes = min(processes, len(endpoints))
+    return [ShardSpec(i, tuple(endpoints[i::processes])) for i in range(processes)]
+
+
+def run_shard(
+    spec: ShardSpec,
+    ring_name: str,
+    csv_file: str,
+    ref_data_file: Optional[str],
+    decoder_name: Optional[str],
+    cache_file: Optional[str] = None,
+    subscription: Optional[Subscription] = None,
+) -> None:
+    """Shard process entry point, receives and normalizes frames and pushes the ticks into the ring."""
+    import client
+    from refdata import load_index
+    from transport import run
+
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - shard {spec.index} - %(levelname)s - %(message)s')
+    # per tick logging stays in the parent, shards only report connection events and errors
+    client.frame_logger.setLevel(logging.WARNING)
+    client.tick_logger.setLevel(logging.WARNING)
+    client.decoder = client.get_decoder(decoder_name)
+    # spawned processes inherit the environment, so shards use the same WS_* transport settings
+    client.transport_profile = client.transport_from_env()
+    client.registry.swap(load_index(csv_file, ref_data_file, cache_file))
+    ring = SpscRing.attach(ring_name)
+    # ticks carry the monotonic receive time of their frame through the ring
+    client.tick_consumers[:] = [ring.push]
+    shard_filter = ShardFilter(spec.index, spec.shards) if spec.shards > 1 else None
+    entity_filter = EntityFilter(subscription, client.registry) if subscription is not None else None
+    if shard_filter is not None and entity_filter is not None:
+        client.frame_filter = lambda frame: shard_filter(frame) and entity_filter(frame)
+    else:
+        client.frame_filter = shard_filter or entity_filter
+
+    async def listen() -> None:
+        await asyncio.gather(*(client.listen_to_endpoint(endpoint, max_retries=None) for endpoint in spec.endpoints))
+
+    try:
+        run(listen(), use_uvloop=client.transport_profile.uvloop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ShardedIngest:
+    """Starts the shard processes and merges their ticks in the parent event loop."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        processes: int,
+        mode: str = "endpoint",
+        csv_file: str = "data/tradeable_entity.csv",
+        ref_data_file: Optional[str] = None,
+        decoder_name: Optional[str] = None,
+        capacity: int = 65536,
+        cache_file: Optional[str] = None,
+        subscription: Optional[Subscription] = None,
+    ) -> None:
+        self.specs = plan_shards(endpoints, processes, mode)
+        if len(self.specs) < processes:
+            logging.warning(f"Sharding {len(endpoints)} endpoints by endpoint uses only {len(self.specs)} of {processes} "
+                            f"ingest processes, set WS_MULTIPLEX=0 or INGEST_SHARD=entity to use them all")
+        self.mode = mode
+        self.csv_file = csv_file
+        self.ref_data_file = ref_data_file
+        self.decoder_name = decoder_name
+        self.capacity = capacity
+        self.cache_file = cache_file
+        self.subscription = subscription
+        self.rings: List[SpscRing] = []
+        self.processes: List[multiprocessing.process.BaseProcess] = []
+        self.merged = 0
+
+    def start(self) -> "ShardedIngest":
+        # spawn rather than fork, the parent may already be running an event loop and logging threads
+        context = multiprocessing.get_context("spawn")
+        for spec in self.specs:
+            ring = SpscRing.create(self.capacity)
+            process = context.Process(
+                target=run_shard,
+                args=(spec, ring.name, self.csv_file, self.ref_data_file, self.decoder_name, self.cache_file,
+                      self.subscription),
+                name=f"shard-{spec.index}",
+                daemon=True,
+            )
+            process.start()
+            self.rings.append(ring)
+            self.processes.append(process)
+        logging.info(f"Started {len(self.specs)} ingest processes sharded by {self.mode}")
+        return self
+
+    def drain(self, max_records: int = 1024) -> List[Tuple[Tick, int]]:
+        records: List[Tuple[Tick, int]] = []
+        for ring in self.rings:
+            records.extend(ring.pop(max_records))
+        self.merged += len(records)
+        return records
+
+    async def run(self, consumers: List[Callable[[Tick], Any]], poll_interval: float = 0.0005) -> None:
+        """Deliver merged ticks to `consumers` until cancelled or every shard process has exited."""
+        while True:
+            records = self.drain()
+            for tick, _ in records:
+                for consumer in consumers:
+                    try:
+                        consumer(tick)
+                    except Exception as e:
+                        logging.error(f"Error in tick consumer {consumer}: {e}")
+            if not records:
+                if not any(process.is_alive() for process in self.processes):
+                    logging.error("All ingest processes have exited")
+                    return
+                await asyncio.sleep(poll_interval)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            process.name: {"depth": len(ring), "dropped": ring.dropped, "alive": int(process.is_alive())}
+            for process, ring in zip(self.processes, self.rings)
+        }
+
+    def close(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(5)
+        for ring in self.rings:
+            ring.close()
+        self.processes.clear()
+        self.rings.clear()
@@ -0,0 +1,292 @@
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from ticks import LastTradePriceTick, ReferencePriceTick, Tick, TopOfBookTick
+
+#
+# fixed size tick records in shared memory, for handing normalized ticks between processes
+# without pickling
+#
+# one 128 byte record per tick:
+#   kind, price decimals, quantity decimals, 5 pad bytes,
+#   exchange timestamp, entity id, market id, received ns, bid (or price), bid size, ask, ask size,
+#   price type (16 bytes), product symbol (40 bytes)
+#
+# received ns defaults to the tick's received_ns, the local time.monotonic_ns() of its frame, which
+# is system wide on Linux so it stays comparable across the processes on a host
+#
+# entity and market ids are numeric on power.trade, anything else is stored as 0;
+# strings longer than their field are truncated
+#
+
+TICK_RECORD = struct.Struct("<Bbb5xqqqqqqqq16s40s")
+RECORD_SIZE = TICK_RECORD.size
+
+KIND_TOP_OF_BOOK = 1
+KIND_REFERENCE_PRICE = 2
+KIND_LAST_TRADE_PRICE = 3
+
+_PRICE_KINDS = {ReferencePriceTick: KIND_REFERENCE_PRICE, LastTradePriceTick: KIND_LAST_TRADE_PRICE}
+_PRICE_TYPES = {KIND_REFERENCE_PRICE: ReferencePriceTick, KIND_LAST_TRADE_PRICE: LastTradePriceTick}
+
+
+def _int_id(value: str) -> int:
+    return int(value) if value.isdigit() else 0
+
+
+def pack_tick_into(buffer: memoryview, offset: int, tick: Tick, received_ns: int) -> None:
+    if type(tick) is TopOfBookTick:
+        TICK_RECORD.pack_into(
+            buffer, offset, KIND_TOP_OF_BOOK, tick.price_decimals, tick.quantity_decimals,
+            tick.exchange_us, _int_id(tick.tradeable_entity_id), _int_id(tick.market_id), received_ns,
+            tick.buy_price, tick.buy_quantity, tick.sell_price, tick.sell_quantity,
+            b"", tick.product.encode(),
+        )
+    else:
+        TICK_RECORD.pack_into(
+            buffer, offset, _PRICE_KINDS[type(tick)], tick.price_decimals, 0,
+            tick.exchange_us, _int_id(tick.tradeable_entity_id), _int_id(tick.market_id), received_ns,
+            tick.price, 0, 0, 0,
+            tick.price_type.encode(), tick.product.encode(),
+        )
+
+
+def unpack_tick(buffer: memoryview, offset: int) -> Tuple[Tick, int]:
+    (kind, price_decimals, quantity_decimals, timestamp, entity_id, market_id, received_ns,
+     bid, bid_size, ask, ask_size, price_type, product) = TICK_RECORD.unpack_from(buffer, offset)
+    product = product.rstrip(b"\0").decode()
+    if kind == KIND_TOP_OF_BOOK:
+        tick: Tick = TopOfBookTick(str(timestamp), str(entity_id), str(market_id), bid, bid_size, ask, ask_size,
+                                   product, price_decimals, quantity_decimals)
+    else:
+        tick = _PRICE_TYPES[kind](str(timestamp), str(entity_id), str(market_id), bid,
+                                  price_type.rstrip(b"\0").decode(), product, price_decimals)
+    tick.received_ns = received_ns
+    return tick, received_ns
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """Attach to an existing segment without letting this process's resource tracker unlink it on exit."""
+    try:
+        return SharedMemory(name, track=False)  # python 3.13+
+    except TypeError:
+        pass
+    # older versions register every attached segment with the tracker, skip that for this call
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+#
+# ring layout: head (records written) and tail (records read) on separate cache lines,
+# then the drop counter and capacity, then capacity * RECORD_SIZE bytes of records
+#
+_COUNTER = struct.Struct("<Q")
+_HEAD, _TAIL, _DROPPED, _CAPACITY = 0, 64, 128, 136
+_HEADER_SIZE = 192
+
+
+class SpscRing:
+    """
+    Single producer, single consumer ring of tick records in shared memory.
+
+    The producer writes the record before publishing the new head and the consumer reads the
+    record before publishing the new tail, so neither side takes a lock. When the ring is full
+    push drops the tick and counts it rather than blocking the producer's event loop.
+    """
+
+    def __init__(self, shm: SharedMemory, owner: bool = False) -> None:
+        self._shm = shm
+        self._buffer = shm.buf
+        self.owner = owner
+        self.capacity = _COUNTER.unpack_from(self._buffer, _CAPACITY)[0]
+
+    @classmethod
+    def create(cls, capacity: int = 65536, name: Optional[str] = None) -> "SpscRing":
+        if capacity <= 0:
+            raise ValueError("ring capacity must be positive")
+        shm = SharedMemory(name, create=True, size=_HEADER_SIZE + capacity * RECORD_SIZE)
+        shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        _COUNTER.pack_into(shm.buf, _CAPACITY, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SpscRing":
+        return cls(attach_shared_memory(name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def dropped(self) -> int:
+        return _COUNTER.unpack_from(self._buffer, _DROPPED)[0]
+
+    def __len__(self) -> int:
+        return _COUNTER.unpack_from(self._buffer, _HEAD)[0] - _COUNTER.unpack_from(self._buffer, _TAIL)[0]
+
+    def push(self, tick: Tick, received_ns: Optional[int] = None) -> bool:
+        buffer = self._buffer
+        head = _COUNTER.unpack_from(buffer, _HEAD)[0]
+        if head - _COUNTER.unpack_from(buffer, _TAIL)[0] >= self.capacity:
+            _COUNTER.pack_into(buffer, _DROPPED, _COUNTER.unpack_from(buffer, _DROPPED)[0] + 1)
+            return False
+        pack_tick_into(buffer, _HEADER_SIZE + (head % self.capacity) * RECORD_SIZE, tick,
+                       tick.received_ns if received_ns is None else received_ns)
+        _COUNTER.pack_into(buffer, _HEAD, head + 1)
+        return True
+
+    def pop(self, max_records: int = 1024) -> List[Tuple[Tick, int]]:
+        buffer = self._buffer
+        tail = _COUNTER.unpack_from(buffer, _TAIL)[0]
+        count = min(_COUNTER.unpack_from(buffer, _HEAD)[0] - tail, max_records)
+        capacity = self.capacity
+        records = [unpack_tick(buffer, _HEADER_SIZE + ((tail + i) % capacity) * RECORD_SIZE) for i in range(count)]
+        if count:
+            _COUNTER.pack_into(buffer, _TAIL, tail + count)
+        return records
+
+    def close(self) -> None:
+        self._buffer = None  # type: ignore[assignment]
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+#
+# broadcast ring: one writer, any number of readers in other processes, no connections or
+# serialization beyond the fixed size record
+#
+# the writer never waits for readers, it overwrites the oldest slot. Each slot carries a seqlock
+# sequence, odd while the record is being written and 2 * (position + 1) once it is complete,
+# a reader copies the record then re-checks the sequence to detect a torn or overwritten slot
+#
+# layout: magic, head (next position to write) on its own cache line, capacity, then slots of
+# sequence + record
+#
+BROADCAST_MAGIC = b"PTSB"
+_B_MAGIC, _B_HEAD, _B_CAPACITY = 0, 64, 128
+_B_HEADER_SIZE = 192
+_SLOT_SIZE = 8 + RECORD_SIZE
+
+
+class BroadcastWriter:
+    """Publishes ticks into a named broadcast ring, e.g. as a client.tick_consumers entry."""
+
+    def __init__(self, name: str, capacity: int = 65536) -> None:
+        if capacity <= 0:
+            raise ValueError("ring capacity must be positive")
+        size = _B_HEADER_SIZE + capacity * _SLOT_SIZE
+        try:
+            self._shm = SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a previous writer, readers still attached to it must reattach
+            stale = attach_shared_memory(name)
+            stale.close()
+            stale.unlink()
+            self._shm = SharedMemory(name, create=True, size=size)
+        self._buffer = self._shm.buf
+        self._buffer[:_B_HEADER_SIZE] = bytes(_B_HEADER_SIZE)
+        self.capacity = capacity
+        self.head = 0
+        _COUNTER.pack_into(self._buffer, _B_CAPACITY, capacity)
+        self._buffer[_B_MAGIC:_B_MAGIC + 4] = BROADCAST_MAGIC
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def publish(self, tick: Tick, received_ns: Optional[int] = None) -> None:
+        buffer = self._buffer
+        position = self.head
+        offset = _B_HEADER_SIZE + (position % self.capacity) * _SLOT_SIZE
+        _COUNTER.pack_into(buffer, offset, 2 * position + 1)
+        pack_tick_into(buffer, offset + 8, tick, tick.received_ns if received_ns is None else received_ns)
+        _COUNTER.pack_into(buffer, offset, 2 * position + 2)
+        self.head = position + 1
+        _COUNTER.pack_into(buffer, _B_HEAD, position + 1)
+
+    __call__ = publish
+
+    def close(self) -> None:
+        self._buffer = None  # type: ignore[assignment]
+        self._shm.close()
+        self._shm.unlink()
+
+
+class BroadcastReader:
+    """
+    Reads a broadcast ring from another process.
+
+    Starts at the newest record unless `from_oldest` is set. A reader that falls a whole ring
+    behind skips ahead to the oldest record still available and counts the skipped records in `lost`.
+    """
+
+    def __init__(self, name: str, from_oldest: bool = False) -> None:
+        self._shm = attach_shared_memory(name)
+        self._buffer = self._shm.buf
+        if bytes(self._buffer[_B_MAGIC:_B_MAGIC + 4]) != BROADCAST_MAGIC:
+            self._shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a broadcast ring")
+        self.capacity = _COUNTER.unpack_from(self._buffer, _B_CAPACITY)[0]
+        head = _COUNTER.unpack_from(self._buffer, _B_HEAD)[0]
+        self.position = max(0, head - self.capacity) if from_oldest else head
+        self.lost = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        """Records published but not yet read."""
+        return _COUNTER.unpack_from(self._buffer, _B_HEAD)[0] - self.position
+
+    def _poll(self, unpack: Callable[[memoryview, int], Any], max_records: int) -> list:
+        buffer = self._buffer
+        capacity = self.capacity
+        records = []
+        while len(records) < max_records:
+            position = self.position
+            offset = _B_HEADER_SIZE + (position % capacity) * _SLOT_SIZE
+            expected = 2 * position + 2
+            sequence = _COUNTER.unpack_from(buffer, offset)[0]
+            if sequence < expected:
+                # not written yet, or being written
+                break
+            record = unpack(buffer, offset + 8)
+            if sequence != expected or _COUNTER.unpack_from(buffer, offset)[0] != expected:
+                # overwritten by a newer lap while we were behind, resume at the oldest slot available
+                head = _COUNTER.unpack_from(buffer, _B_HEAD)[0]
+                resume = max(position + 1, head - capacity + 1)
+                self.lost += resume - position
+                self.position = resume
+                continue
+            records.append(record)
+            self.position = position + 1
+        return records
+
+    def poll(self, max_records: int = 1024) -> List[Tuple[Tick, int]]:
+        """Ticks published since the previous call with the writer's received_ns, oldest first."""
+        return self._poll(unpack_tick, max_records)
+
+    def poll_raw(self, max_records: int = 1024) -> List[tuple]:
+        """Record tuples in TICK_RECORD field order, cheaper than poll when tick objects are not needed."""
+        return self._poll(TICK_RECORD.unpack_from, max_records)
+
+    def follow(self, idle_sleep: float = 0.0001) -> Iterator[Tuple[Tick, int]]:
+        """Yield ticks as they are published, sleeping for `idle_sleep` seconds while there are none."""
+        while True:
+            records = self.poll()
+            if not records:
+                time.sleep(idle_sleep)
+            yield from records
+
+    def close(self) -> None:
+        self._buffer = None  # type: ignore[assignment]
+        self._shm.close()
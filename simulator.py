@@ -0,0 +1,190 @@
+"""
+Local websocket server mimicking the power.trade market data feeds, for tests and load benchmarks.
+
+    python simulator.py --port 8765 --rate 5000
+
+    export WS_ENDPOINTS="ws://127.0.0.1:8765/v1/feeds?type[]=top_of_book"
+    python client.py
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+MESSAGE_TYPES = ("top_of_book", "reference_price", "last_trade_price")
+
+
+def load_entity_ids(csv_file_path: str, limit: Optional[int] = None) -> List[str]:
+    with open(csv_file_path, mode="r") as file:
+        ids = [row[0] for row in csv.reader(file) if row]
+    return ids[:limit] if limit else ids
+
+
+class SyntheticFeed:
+    """Random walk prices per entity id rendered as power.trade feed frames."""
+
+    def __init__(self, entity_ids: Sequence[str], seed: Optional[int] = None) -> None:
+        if not entity_ids:
+            raise ValueError("SyntheticFeed needs at least one entity id")
+        self.entity_ids = list(entity_ids)
+        self._random = random.Random(seed)  # nosec B311 - synthetic prices, not security
+        self._prices: Dict[str, int] = {}
+
+    def _next_price(self, entity_id: str) -> int:
+        price = self._prices.get(entity_id)
+        if price is None:
+            price = self._random.randint(10_000, 10_000_000)
+        price = max(1, price + self._random.randint(-5, 5))
+        self._prices[entity_id] = price
+        return price
+
+    def frame(self, message_type: str) -> str:
+        entity_id = self._random.choice(self.entity_ids)
+        price = self._next_price(entity_id)
+        # exchange timestamp in microseconds since epoch, lets clients measure end to end latency
+        timestamp = time.time_ns() // 1000
+        if message_type == "top_of_book":
+            return (
+                f'{{"top_of_book":{{"timestamp":"{timestamp}","tradeable_entity_id":"{entity_id}",'
+                f'"market_id":"0","buy_price":"{price}","buy_quantity":"{self._random.randint(1, 100000)}",'
+                f'"sell_price":"{price + 1}","sell_quantity":"{self._random.randint(1, 100000)}"}}}}'
+            )
+        return (
+            f'{{"{message_type}":{{"timestamp":"{timestamp}","tradeable_entity_id":"{entity_id}",'
+            f'"market_id":"0","price":"{price}","price_type":"synthetic"}}}}'
+        )
+
+
+@dataclass
+class SimulatorConfig:
+    entity_ids: Sequence[str] = field(default_factory=lambda: ["1"])
+    # messages per second per connection, 0 sends as fast as possible
+    rate: float = 1000.0
+    # extra messages sent back to back every burst_interval seconds
+    burst_size: int = 0
+    burst_interval: float = 1.0
+    # close with an error code after this many messages per connection
+    disconnect_after: Optional[int] = None
+    # close cleanly after this many messages per connection
+    total_messages: Optional[int] = None
+    seed: Optional[int] = None
+
+
+class ExchangeSimulator:
+    """Serves /v1/feeds?type[]=... streams of synthetic frames for the requested message types."""
+
+    def __init__(self, config: SimulatorConfig, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.messages_sent = 0
+        self._server: Optional[Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def endpoint(self, *message_types: str) -> str:
+        query = "&".join(f"type[]={t}" for t in (message_types or MESSAGE_TYPES))
+        return f"{self.url}/v1/feeds?{query}"
+
+    async def start(self) -> "ExchangeSimulator":
+        self._server = await serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logging.info(f"Exchange simulator listening on {self.url}")
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "ExchangeSimulator":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    async def _handler(self, connection: ServerConnection) -> None:
+        url = urlsplit(connection.request.path)
+        if url.path != "/v1/feeds":
+            await connection.close(1008, "unknown path")
+            return
+        types = [t for t in parse_qs(url.query).get("type[]", []) if t in MESSAGE_TYPES] or list(MESSAGE_TYPES)
+        self.connections += 1
+        try:
+            await self._stream(connection, types)
+        except ConnectionClosed:
+            pass
+
+    async def _stream(self, connection: ServerConnection, types: List[str]) -> None:
+        config = self.config
+        feed = SyntheticFeed(config.entity_ids, config.seed)
+        sent = 0
+        started = time.monotonic()
+        next_burst = started + config.burst_interval
+        while True:
+            if config.rate > 0:
+                # send whatever is due at the configured rate, then yield for ~1ms
+                due = int((time.monotonic() - started) * config.rate) - sent
+                await asyncio.sleep(0.001)
+            else:
+                due = 100
+                await asyncio.sleep(0)
+            if config.burst_size and time.monotonic() >= next_burst:
+                due += config.burst_size
+                next_burst += config.burst_interval
+            for _ in range(max(0, due)):
+                await connection.send(feed.frame(types[sent % len(types)]))
+                sent += 1
+                self.messages_sent += 1
+                if config.disconnect_after is not None and sent >= config.disconnect_after:
+                    await connection.close(1011, "simulated disconnect")
+                    return
+                if config.total_messages is not None and sent >= config.total_messages:
+                    await connection.close()
+                    return
+
+
+async def run_simulator(config: SimulatorConfig, host: str, port: int) -> None:
+    async with ExchangeSimulator(config, host, port) as simulator:
+        print(f"serving synthetic feeds on {simulator.endpoint()}", flush=True)
+        await asyncio.Future()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local power.trade market data feed simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1000.0, help="messages/sec per connection, 0 = unthrottled")
+    parser.add_argument("--burst-size", type=int, default=0)
+    parser.add_argument("--burst-interval", type=float, default=1.0)
+    parser.add_argument("--disconnect-after", type=int, default=None)
+    parser.add_argument("--entities", type=int, default=None, help="limit to the first N entity ids")
+    parser.add_argument("--csv", default="data/tradeable_entity.csv")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = SimulatorConfig(
+        entity_ids=load_entity_ids(args.csv, args.entities),
+        rate=args.rate,
+        burst_size=args.burst_size,
+        burst_interval=args.burst_interval,
+        disconnect_after=args.disconnect_after,
+    )
+    asyncio.run(run_simulator(config, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
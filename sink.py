@@ -0,0 +1,249 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from registry import Instrument, parse_symbol
+from ticks import LastTradePriceTick, ReferencePriceTick, Tick, TopOfBookTick
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+#
+# columnar export of normalized ticks
+#
+# ticks are buffered per message type and converted to Arrow tables on a background thread,
+# then written to hive partitioned parquet datasets (<dir>/<message type>/date=.../underlying=.../*.parquet)
+# and/or appended to DuckDB tables named after the message type
+#
+# prices and quantities are stored as converted floats, timestamp is the exchange epoch in microseconds,
+# received_ns the local time.monotonic_ns() the frame was received (the tick's received_ns) and
+# received_wall_ns the wall clock epoch ns the tick reached the sink, which the date partition is taken from
+#
+# the instrument dimension table is written at start and rewritten whenever update_instruments() is
+# called, e.g. from InstrumentRegistry.on_swap when reference data loads in the background or refreshes
+#
+
+MESSAGE_TYPES = {TopOfBookTick: "top_of_book", ReferencePriceTick: "reference_price", LastTradePriceTick: "last_trade_price"}
+DEFAULT_PARTITIONS = ("date", "underlying")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the tick sink, install it with 'pip install pyarrow'")
+
+
+def _schema(message_type: str) -> "pa.Schema":
+    fields = [
+        ("date", pa.string()),
+        ("underlying", pa.string()),
+        ("timestamp", pa.int64()),
+        ("received_ns", pa.int64()),
+        ("received_wall_ns", pa.int64()),
+        ("entity_id", pa.int64()),
+        ("market_id", pa.string()),
+        ("product", pa.string()),
+    ]
+    if message_type == "top_of_book":
+        fields += [(name, pa.float64()) for name in ("buy_price", "buy_quantity", "sell_price", "sell_quantity")]
+    else:
+        fields += [("price", pa.float64()), ("price_type", pa.string())]
+    return pa.schema(fields)
+
+
+@lru_cache(maxsize=65536)
+def _underlying(product: str) -> str:
+    return parse_symbol(product).underlying
+
+
+@lru_cache(maxsize=64)
+def _day(day: int) -> str:
+    return datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%d")
+
+
+def tick_table(message_type: str, records: Sequence[Tuple[Tick, int, int]]) -> "pa.Table":
+    """Arrow table for ticks of one message type, records are (tick, received_ns, received_wall_ns)."""
+    _require_pyarrow()
+    columns: Dict[str, List[Any]] = {name: [] for name in _schema(message_type).names}
+    date, underlying, timestamp = columns["date"], columns["underlying"], columns["timestamp"]
+    received, received_wall, entity_id, market_id, product = (
+        columns["received_ns"], columns["received_wall_ns"], columns["entity_id"], columns["market_id"], columns["product"])
+    for tick, received_ns, received_wall_ns in records:
+        date.append(_day(received_wall_ns // 86_400_000_000_000))
+        underlying.append(_underlying(tick.product))
+        timestamp.append(tick.exchange_us)
+        received.append(received_ns)
+        received_wall.append(received_wall_ns)
+        entity_id.append(int(tick.tradeable_entity_id) if tick.tradeable_entity_id.isdigit() else None)
+        market_id.append(tick.market_id)
+        product.append(tick.product)
+    if message_type == "top_of_book":
+        for name in ("buy_price", "buy_quantity", "sell_price", "sell_quantity"):
+            columns[name] = [getattr(tick, f"{name}_conv") for tick, _, _ in records]
+    else:
+        columns["price"] = [tick.price_conv for tick, _, _ in records]
+        columns["price_type"] = [tick.price_type for tick, _, _ in records]
+    return pa.Table.from_pydict(columns, schema=_schema(message_type))
+
+
+def instrument_table(instruments: Iterable[Instrument]) -> "pa.Table":
+    """Instrument dimension table from the reference data, one row per tradeable entity."""
+    _require_pyarrow()
+    rows = list(instruments)
+    return pa.table({
+        "entity_id": pa.array([int(i.entity_id) if i.entity_id.isdigit() else None for i in rows], pa.int64()),
+        "symbol": [i.symbol for i in rows],
+        "market_id": [i.market_id for i in rows],
+        "status": [i.status for i in rows],
+        "price_decimals": pa.array([i.price_decimals for i in rows], pa.int8()),
+        "quantity_decimals": pa.array([i.quantity_decimals for i in rows], pa.int8()),
+        "kind": [i.kind for i in rows],
+        "underlying": [i.underlying for i in rows],
+        "expiry": pa.array([i.expiry for i in rows], pa.date32()),
+        "strike": pa.array([i.strike for i in rows], pa.float64()),
+        "option_type": [i.option_type for i in rows],
+    })
+
+
+class TickSink:
+    """
+    Writes normalized ticks to parquet and/or DuckDB in batches from a background thread.
+
+    update() only puts the tick on an in-memory queue and can be used as a client.tick_consumers
+    entry, batches flush after `batch_rows` ticks or `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        parquet_dir: Optional[str] = None,
+        duckdb_path: Optional[str] = None,
+        instruments: Iterable[Instrument] = (),
+        partition_cols: Sequence[str] = DEFAULT_PARTITIONS,
+        batch_rows: int = 50_000,
+        flush_interval: float = 5.0,
+    ) -> None:
+        _require_pyarrow()
+        if duckdb_path and duckdb is None:
+            raise RuntimeError("duckdb is required to write ticks to a DuckDB file, install it with 'pip install duckdb'")
+        if not parquet_dir and not duckdb_path:
+            raise ValueError("TickSink needs a parquet directory, a DuckDB file or both")
+        self.parquet_dir = parquet_dir
+        self.duckdb_path = duckdb_path
+        self.partition_cols = list(partition_cols)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.rows = 0
+        self.batches = 0
+        self._instruments = list(instruments)
+        self._instruments_changed = threading.Event()
+        self._queue: "queue.SimpleQueue[Optional[Tuple[Tick, int, int]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._connection: Any = None
+
+    def start(self) -> "TickSink":
+        if self.parquet_dir:
+            os.makedirs(self.parquet_dir, exist_ok=True)
+        if self.duckdb_path and os.path.dirname(self.duckdb_path):
+            os.makedirs(os.path.dirname(self.duckdb_path), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="tick-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def update(self, tick: Tick, received_ns: Optional[int] = None) -> None:
+        self._queue.put((tick, tick.received_ns if received_ns is None else received_ns, time.time_ns()))
+
+    def update_instruments(self, instruments: Iterable[Instrument]) -> None:
+        """Replace the instrument dimension table, written by the sink thread before its next batch."""
+        self._instruments = list(instruments)
+        self._instruments_changed.set()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "TickSink":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        # the DuckDB connection is created and used only on this thread
+        if self.duckdb_path:
+            self._connection = duckdb.connect(self.duckdb_path)
+        if self._instruments:
+            self._write_instruments()
+        pending: List[Tuple[Tick, int, int]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()  # type: ignore[assignment]
+            if self._instruments_changed.is_set():
+                self._instruments_changed.clear()
+                self._write_instruments()
+            if item is None:
+                break
+            if item:
+                pending.append(item)
+            if len(pending) >= self.batch_rows or (pending and time.monotonic() >= deadline):
+                self._write(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if pending:
+            self._write(pending)
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _write_instruments(self) -> None:
+        try:
+            table = instrument_table(self._instruments)
+            if self.parquet_dir:
+                pq.write_table(table, os.path.join(self.parquet_dir, "instrument.parquet"))
+            if self._connection is not None:
+                self._connection.register("instrument_batch", table)
+                self._connection.execute("CREATE OR REPLACE TABLE instrument AS SELECT * FROM instrument_batch")
+                self._connection.unregister("instrument_batch")
+            logging.info(f"Wrote instrument dimension table with {table.num_rows} rows")
+        except Exception as e:
+            logging.error(f"Error writing instrument dimension table: {e}")
+
+    def _write(self, records: List[Tuple[Tick, int, int]]) -> None:
+        by_type: Dict[str, List[Tuple[Tick, int, int]]] = {}
+        for record in records:
+            by_type.setdefault(MESSAGE_TYPES[type(record[0])], []).append(record)
+        for message_type, rows in by_type.items():
+            try:
+                table = tick_table(message_type, rows)
+                if self.parquet_dir:
+                    pq.write_to_dataset(
+                        table, os.path.join(self.parquet_dir, message_type), partition_cols=self.partition_cols
+                    )
+                if self._connection is not None:
+                    self._connection.register("tick_batch", table)
+                    self._connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {message_type} AS SELECT * FROM tick_batch LIMIT 0")  # nosec B608
+                    self._connection.execute(f"INSERT INTO {message_type} SELECT * FROM tick_batch")  # nosec B608
+                    self._connection.unregister("tick_batch")
+                self.rows += table.num_rows
+                self.batches += 1
+            except Exception as e:
+                logging.error(f"Error writing {len(rows)} {message_type} ticks: {e}")
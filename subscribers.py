@@ -0,0 +1,278 @@
+import asyncio
+import inspect
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter_ns
+from typing import Any, Callable, Deque, Dict, FrozenSet, Hashable, Iterable, List, Optional, Union
+
+from conflation import conflation_key
+from metrics import LatencyHistogram
+from ticks import LastTradePriceTick, ReferencePriceTick, Tick, TopOfBookTick
+
+#
+# subscriber registry, user handlers for ticks selected by message type and/or entity id
+#
+# publish() runs on the message path and only appends the tick to the queue of each matching
+# subscriber; every subscriber is drained by its own task, so a slow handler falls behind (and
+# drops its oldest ticks once its queue is full) without stalling the websocket readers or the
+# other subscribers. Sync handlers run on the event loop unless `threaded`, then on a thread pool
+#
+
+MESSAGE_TYPES: Dict[str, type] = {
+    "top_of_book": TopOfBookTick,
+    "reference_price": ReferencePriceTick,
+    "last_trade_price": LastTradePriceTick,
+}
+TickType = Union[str, type]
+
+
+def _tick_types(types: Union[None, TickType, Iterable[TickType]]) -> FrozenSet[type]:
+    if types is None:
+        return frozenset(MESSAGE_TYPES.values())
+    if isinstance(types, (str, type)):
+        types = [types]
+    resolved = set()
+    for t in types:
+        if isinstance(t, str):
+            if t not in MESSAGE_TYPES:
+                raise ValueError(f"Unknown message type '{t}', expected one of {', '.join(MESSAGE_TYPES)}")
+            t = MESSAGE_TYPES[t]
+        resolved.add(t)
+    return frozenset(resolved)
+
+
+class Subscriber:
+    """
+    One registered handler with its queue, delivery options and counters.
+
+    `latency` holds the wall time of each handler call in ns, for threaded handlers including
+    the hand-off to the pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Any],
+        types: FrozenSet[type],
+        entity_ids: Optional[FrozenSet[str]],
+        batch: bool,
+        conflate: bool,
+        interval: float,
+        threaded: bool,
+        max_batch: int,
+        maxsize: int,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.types = types
+        self.entity_ids = entity_ids
+        self.batch = batch
+        self.conflate = conflate
+        self.interval = interval
+        self.threaded = threaded
+        self.max_batch = max_batch
+        self.is_async = inspect.iscoroutinefunction(handler)
+        if self.is_async and threaded:
+            raise ValueError(f"Subscriber '{name}' is async, only sync handlers can be threaded")
+        self.latency = LatencyHistogram()
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: Deque[Tick] = deque(maxlen=maxsize)
+        self._latest: Dict[Hashable, Tick] = {}
+        self._ready: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._latest) if self.conflate else len(self._queue)
+
+    def offer(self, tick: Tick) -> None:
+        self.received += 1
+        if self.conflate:
+            self._latest[conflation_key(tick)] = tick
+        else:
+            queue = self._queue
+            if len(queue) == queue.maxlen:
+                self.dropped += 1
+            queue.append(tick)
+        if self._ready is not None:
+            self._ready.set()
+
+    def _take(self) -> List[Tick]:
+        if self.conflate:
+            ticks, self._latest = list(self._latest.values()), {}
+            return ticks
+        queue = self._queue
+        return [queue.popleft() for _ in range(min(len(queue), self.max_batch))]
+
+    def summary(self) -> Dict[str, float]:
+        s = self.latency.summary()
+        return {
+            "received": self.received, "delivered": self.delivered, "dropped": self.dropped, "errors": self.errors,
+            "pending": self.pending, "calls": s["count"], "mean_ns": s["mean"], "p99_ns": s["p99"], "max_ns": s["max"],
+        }
+
+
+class SubscriberRegistry:
+    """
+    Routes normalized ticks to subscribed handlers, publish() can be used as a client.tick_consumers entry.
+
+    Handlers receive one tick per call, or with `batch` a list of up to `max_batch` ticks per wakeup.
+    With `conflate` only the latest tick per instrument since the previous call is delivered, and
+    `interval` > 0 delivers at most once per interval. Ticks offered before start() are delivered
+    once it runs.
+    """
+
+    def __init__(self, threads: int = 4) -> None:
+        self.threads = threads
+        self.subscribers: List[Subscriber] = []
+        self._by_type: Dict[type, List[Subscriber]] = {}
+        self._tasks: Dict[Subscriber, asyncio.Task] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def subscribe(
+        self,
+        handler: Callable[[Any], Any],
+        types: Union[None, TickType, Iterable[TickType]] = None,
+        entity_ids: Optional[Iterable[str]] = None,
+        batch: bool = False,
+        conflate: bool = False,
+        interval: float = 0.0,
+        threaded: bool = False,
+        max_batch: int = 1000,
+        maxsize: int = 10000,
+        name: Optional[str] = None,
+    ) -> Subscriber:
+        subscriber = Subscriber(
+            name or getattr(handler, "__qualname__", repr(handler)),
+            handler,
+            _tick_types(types),
+            frozenset(entity_ids) if entity_ids is not None else None,
+            batch,
+            conflate,
+            interval,
+            threaded,
+            max_batch,
+            maxsize,
+        )
+        self.subscribers.append(subscriber)
+        self._route()
+        if self._running:
+            self._start(subscriber)
+        return subscriber
+
+    def on(self, types: Union[None, TickType, Iterable[TickType]] = None, **options: Any) -> Callable:
+        """Decorator form of subscribe(), e.g. @subscribers.on("top_of_book", batch=True)."""
+
+        def register(handler: Callable[[Any], Any]) -> Callable[[Any], Any]:
+            self.subscribe(handler, types, **options)
+            return handler
+
+        return register
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.remove(subscriber)
+        self._route()
+        task = self._tasks.pop(subscriber, None)
+        if task is not None:
+            task.cancel()
+
+    def _route(self) -> None:
+        by_type: Dict[type, List[Subscriber]] = {}
+        for subscriber in self.subscribers:
+            for tick_type in subscriber.types:
+                by_type.setdefault(tick_type, []).append(subscriber)
+        self._by_type = by_type
+
+    def publish(self, tick: Tick) -> None:
+        for subscriber in self._by_type.get(type(tick), ()):
+            if subscriber.entity_ids is None or tick.tradeable_entity_id in subscriber.entity_ids:
+                subscriber.offer(tick)
+
+    async def start(self) -> None:
+        self._running = True
+        for subscriber in self.subscribers:
+            self._start(subscriber)
+
+    def _start(self, subscriber: Subscriber) -> None:
+        if subscriber.threaded and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="subscriber")
+        subscriber._ready = asyncio.Event()
+        if subscriber.pending:
+            subscriber._ready.set()
+        self._tasks[subscriber] = asyncio.create_task(self._run(subscriber), name=f"subscriber-{subscriber.name}")
+
+    async def _run(self, subscriber: Subscriber) -> None:
+        ready = subscriber._ready
+        assert ready is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            await ready.wait()
+            if subscriber.interval > 0:
+                await asyncio.sleep(subscriber.interval)
+            ready.clear()
+            ticks = subscriber._take()
+            if subscriber.pending:
+                # more queued than max_batch, come straight back after yielding to the readers
+                ready.set()
+            if subscriber.batch:
+                await self._call(subscriber, loop, ticks, len(ticks))
+            else:
+                for tick in ticks:
+                    await self._call(subscriber, loop, tick, 1)
+            await asyncio.sleep(0)
+
+    async def _call(self, subscriber: Subscriber, loop: asyncio.AbstractEventLoop, item: Any, count: int) -> None:
+        started = perf_counter_ns()
+        try:
+            if subscriber.is_async:
+                await subscriber.handler(item)
+            elif subscriber.threaded:
+                await loop.run_in_executor(self._executor, subscriber.handler, item)
+            else:
+                subscriber.handler(item)
+            subscriber.delivered += count
+        except Exception as e:
+            subscriber.errors += 1
+            logging.error(f"Error in subscriber '{subscriber.name}': {e}")
+        subscriber.latency.record(perf_counter_ns() - started)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {subscriber.name: subscriber.summary() for subscriber in self.subscribers}
+
+    def slowest(self, count: int = 3) -> List[Subscriber]:
+        """Subscribers with the highest p99 handler time first."""
+        def p99(subscriber: Subscriber) -> float:
+            return subscriber.latency.percentile(99.0) if subscriber.latency.count else 0
+
+        return sorted(self.subscribers, key=p99, reverse=True)[:count]
+
+    def format(self) -> str:
+        return "\n".join(
+            f"{s.latency.format(f'subscriber {s.name}')} pending={s.pending} dropped={s.dropped} errors={s.errors}"
+            for s in self.slowest(len(self.subscribers)) if s.latency.count
+        )
+
+    async def report(self, interval: float) -> None:
+        """Log handler times, slowest subscriber first, every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            if self.subscribers:
+                logging.info(f"Subscriber stats\n{self.format()}")
+
+    async def close(self) -> None:
+        self._running = False
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
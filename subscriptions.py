@@ -0,0 +1,229 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from fnmatch import fnmatchcase
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from decoder import Frame, peek_entity_id
+from registry import Instrument, InstrumentIndex, InstrumentRegistry
+
+#
+# feed subscriptions, a power.trade feed url selects message types with repeated type[] params,
+# e.g. wss://api.wss.prod.power.trade/v1/feeds?type[]=top_of_book&type[]=reference_price
+# and may narrow the entities with repeated tradeable_entity_id[] params
+#
+# a Subscription selects instruments by attribute, it is resolved against the instrument index to
+# a set of entity ids which EntityFilter checks on the raw frame before it is decoded
+#
+
+TYPE_PARAM = "type[]"
+ENTITY_PARAM = "tradeable_entity_id[]"
+
+
+def split_endpoint(endpoint: str) -> Tuple[str, List[str], List[Tuple[str, str]]]:
+    """Base url without query, the subscribed message types, and any other query params."""
+    url = urlsplit(endpoint)
+    params = parse_qsl(url.query, keep_blank_values=True)
+    types = [value for key, value in params if key == TYPE_PARAM]
+    others = [(key, value) for key, value in params if key != TYPE_PARAM]
+    return urlunsplit((url.scheme, url.netloc, url.path, "", "")), types, others
+
+
+def feed_url(base: str, types: Iterable[str], params: Sequence[Tuple[str, str]] = ()) -> str:
+    query = urlencode([(TYPE_PARAM, t) for t in types] + list(params), safe="[]")
+    return f"{base}?{query}" if query else base
+
+
+def multiplex(endpoints: Sequence[str], split_types: Iterable[str] = ()) -> List[str]:
+    """
+    Combine endpoints that differ only in their message types into one connection per host.
+
+    Types listed in `split_types`, e.g. a heavy top_of_book stream, keep a connection of their own.
+    Frames are keyed by message type, so one connection carrying several types is demultiplexed
+    by the MESSAGE_HANDLERS dispatch as before.
+    """
+    split = set(split_types)
+    groups: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[str]] = {}
+    separate: List[str] = []
+    for endpoint in endpoints:
+        base, types, params = split_endpoint(endpoint)
+        if not types:
+            # no type filter means every type, nothing to combine it with
+            separate.append(endpoint)
+            continue
+        key = (base, tuple(params))
+        combined = groups.setdefault(key, [])
+        for message_type in types:
+            if message_type in split:
+                url = feed_url(base, [message_type], params)
+                if url not in separate:
+                    separate.append(url)
+            elif message_type not in combined:
+                combined.append(message_type)
+    combined_urls = [feed_url(base, types, params) for (base, params), types in groups.items() if types]
+    return combined_urls + separate
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """
+    Instruments of interest, every attribute set must match and each list matches any of its values.
+
+    `entity_ids` are subscribed in addition to the instruments matching the attributes, and on their
+    own when no attribute is set. Expiry and strike ranges are inclusive, either end may be open.
+    """
+
+    symbols: Tuple[str, ...] = ()
+    underlyings: Tuple[str, ...] = ()
+    kinds: Tuple[str, ...] = ()
+    expiry_from: Optional[date] = None
+    expiry_to: Optional[date] = None
+    strike_min: Optional[float] = None
+    strike_max: Optional[float] = None
+    entity_ids: FrozenSet[str] = frozenset()
+
+    @property
+    def by_attributes(self) -> bool:
+        return bool(
+            self.symbols or self.underlyings or self.kinds
+            or self.expiry_from or self.expiry_to or self.strike_min is not None or self.strike_max is not None
+        )
+
+    def matches(self, instrument: Instrument) -> bool:
+        if instrument.entity_id in self.entity_ids:
+            return True
+        if not self.by_attributes:
+            return False
+        if self.symbols and not any(fnmatchcase(instrument.symbol, pattern) for pattern in self.symbols):
+            return False
+        if self.underlyings and instrument.underlying not in self.underlyings:
+            return False
+        if self.kinds and instrument.kind not in self.kinds:
+            return False
+        if self.expiry_from or self.expiry_to:
+            expiry = instrument.expiry
+            if expiry is None:
+                return False
+            if (self.expiry_from and expiry < self.expiry_from) or (self.expiry_to and expiry > self.expiry_to):
+                return False
+        if self.strike_min is not None or self.strike_max is not None:
+            strike = instrument.strike
+            if strike is None:
+                return False
+            if self.strike_min is not None and strike < self.strike_min:
+                return False
+            if self.strike_max is not None and strike > self.strike_max:
+                return False
+        return True
+
+    def resolve(self, index: InstrumentIndex) -> FrozenSet[str]:
+        """Entity ids in `index` matching this subscription, plus the explicit entity ids."""
+        if not self.by_attributes:
+            return self.entity_ids
+        if self.underlyings and not self.symbols:
+            candidates: Iterable[Instrument] = (i for u in self.underlyings for i in index.by_underlying(u))
+        else:
+            candidates = index
+        return frozenset(i.entity_id for i in candidates if self.matches(i)) | self.entity_ids
+
+
+def _date(value: str, today: date) -> Optional[date]:
+    # ISO date or +N / +Nd days from today
+    value = value.strip()
+    if not value:
+        return None
+    if value.startswith("+"):
+        return today + timedelta(days=int(value[1:].rstrip("d")))
+    return date.fromisoformat(value)
+
+
+def _range(value: str) -> Tuple[str, str]:
+    low, separator, high = value.partition("..")
+    return (low, high) if separator else (value, value)
+
+
+def parse_subscription(spec: str, today: Optional[date] = None) -> Optional[Subscription]:
+    """
+    Subscription from e.g. 'underlying=BTC;kind=option;expiry=..+7d;strike=50000..80000',
+    also 'symbol=BTC-*,ETH-*' and 'id=1234,5678'. None for an empty spec.
+    """
+    spec = spec.strip()
+    if not spec:
+        return None
+    today = today or date.today()
+    values: Dict[str, object] = {}
+    for item in spec.split(";"):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        items = tuple(v.strip() for v in value.split(",") if v.strip())
+        if key == "symbol":
+            values["symbols"] = items
+        elif key == "underlying":
+            values["underlyings"] = items
+        elif key == "kind":
+            values["kinds"] = items
+        elif key == "id":
+            values["entity_ids"] = frozenset(items)
+        elif key == "expiry":
+            low, high = _range(value)
+            values["expiry_from"], values["expiry_to"] = _date(low, today), _date(high, today)
+        elif key == "strike":
+            low, high = _range(value)
+            values["strike_min"] = float(low) if low.strip() else None
+            values["strike_max"] = float(high) if high.strip() else None
+        else:
+            raise ValueError(
+                f"Unknown subscription attribute '{key}', expected symbol, underlying, kind, expiry, strike or id"
+            )
+    return Subscription(**values)  # type: ignore[arg-type]
+
+
+class EntityFilter:
+    """
+    Frame filter keeping frames for the subscribed entity ids, checked before json decoding.
+
+    The subscription is resolved again whenever the registry swaps in a new index. Frames for ids
+    missing from the index are kept while `keep_unknown` is set, so a newly listed instrument reaches
+    the reference data refresh and is filtered once it resolves; frames without an id are kept.
+    """
+
+    def __init__(self, subscription: Subscription, registry: InstrumentRegistry, keep_unknown: bool = True) -> None:
+        self.subscription = subscription
+        self.registry = registry
+        self.keep_unknown = keep_unknown
+        self.dropped = 0
+        self._index: Optional[InstrumentIndex] = None
+        self._ids: FrozenSet[str] = frozenset()
+
+    @property
+    def entity_ids(self) -> FrozenSet[str]:
+        index = self.registry.index
+        if index is not self._index:
+            self._ids = self.subscription.resolve(index)
+            self._index = index
+        return self._ids
+
+    def __call__(self, frame: Frame) -> bool:
+        entity_id = peek_entity_id(frame)
+        if entity_id is None or entity_id in self.entity_ids:
+            return True
+        if self.keep_unknown and entity_id not in self._index:  # type: ignore[operator]
+            return True
+        self.dropped += 1
+        return False
+
+
+def filter_endpoints(endpoints: Sequence[str], entity_ids: Iterable[str], max_ids: int = 500) -> List[str]:
+    """
+    Endpoints narrowed to `entity_ids` with tradeable_entity_id[] params, left unchanged when there are
+    none or more than `max_ids` (a url that long is better filtered on the client).
+    """
+    ids = sorted(entity_ids, key=lambda i: (len(i), i))
+    if not ids or len(ids) > max_ids:
+        return list(endpoints)
+    narrowed = []
+    for endpoint in endpoints:
+        base, types, params = split_endpoint(endpoint)
+        params = [(key, value) for key, value in params if key != ENTITY_PARAM] + [(ENTITY_PARAM, i) for i in ids]
+        narrowed.append(feed_url(base, types, params))
+    return narrowed
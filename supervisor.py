@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+import websockets
+from websockets.asyncio.client import connect
+
+from decoder import Frame
+
+#
+# connection supervision: reconnect with jittered exponential backoff, optional hot standby
+# connections with first arrival dedup, and per endpoint accounting of time spent disconnected
+#
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Reconnect delays: the first retry is immediate, then initial * multiplier ** n capped at maximum."""
+
+    initial: float = 0.25
+    maximum: float = 30.0
+    multiplier: float = 2.0
+    # fraction of each delay that is randomized, spreads out reconnects of many clients after an outage
+    jitter: float = 0.5
+    # seconds a connection must stay up before the delays start over, so a server that accepts and
+    # closes straight away is retried with growing delays instead of in a tight loop
+    reset_after: float = 5.0
+
+    def delay(self, attempt: int) -> float:
+        if attempt <= 0:
+            return 0.0
+        delay = min(self.maximum, self.initial * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())  # nosec B311 - jitter, not security
+
+
+@dataclass
+class ConnectionStats:
+    """
+    Per endpoint connection accounting.
+
+    The endpoint counts as disconnected only while none of its connections (primary or standby)
+    are up. Messages potentially missed are estimated from the message rate while connected.
+    """
+
+    endpoint: str
+    connects: int = 0
+    disconnects: int = 0
+    messages: int = 0
+    duplicates: int = 0
+    live: int = 0
+    connected_ns: int = 0
+    disconnected_ns: int = 0
+    missed_estimate: float = 0.0
+    _up_since: Optional[int] = field(default=None, repr=False)
+    _down_since: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def reconnects(self) -> int:
+        return max(0, self.connects - 1)
+
+    @property
+    def message_rate(self) -> float:
+        up_ns = self.connected_ns + (time.monotonic_ns() - self._up_since if self._up_since is not None else 0)
+        return self.messages / (up_ns / 1e9) if up_ns else 0.0
+
+    def connected(self) -> Optional[int]:
+        """Record a connection coming up, returns the length of the gap it closes in ns if any."""
+        now = time.monotonic_ns()
+        self.connects += 1
+        self.live += 1
+        if self.live > 1:
+            return None
+        self._up_since = now
+        if self._down_since is None:
+            return None
+        gap = now - self._down_since
+        self.disconnected_ns += gap
+        self.missed_estimate += self.message_rate * gap / 1e9
+        self._down_since = None
+        return gap
+
+    def disconnected(self) -> None:
+        now = time.monotonic_ns()
+        self.disconnects += 1
+        self.live -= 1
+        if self.live == 0:
+            if self._up_since is not None:
+                self.connected_ns += now - self._up_since
+            self._up_since = None
+            self._down_since = now
+
+    def as_dict(self) -> Dict[str, float]:
+        disconnected_ns = self.disconnected_ns
+        if self._down_since is not None:
+            disconnected_ns += time.monotonic_ns() - self._down_since
+        return {
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "live": self.live,
+            "messages": self.messages,
+            "duplicates": self.duplicates,
+            "disconnected_ms": disconnected_ns / 1e6,
+            "missed_estimate": round(self.missed_estimate),
+        }
+
+
+class FrameDeduplicator:
+    """First arrival wins: remembers the last `window` frames and rejects repeats of them."""
+
+    def __init__(self, window: int = 8192) -> None:
+        self.window = window
+        self._seen: Set[Frame] = set()
+        self._order: Deque[Frame] = deque()
+
+    def first(self, frame: Frame) -> bool:
+        seen = self._seen
+        if frame in seen:
+            return False
+        seen.add(frame)
+        order = self._order
+        order.append(frame)
+        if len(order) > self.window:
+            seen.discard(order.popleft())
+        return True
+
+
+Session = Callable[[Any, "ConnectionSupervisor"], Awaitable[None]]
+
+
+class ConnectionSupervisor:
+    """
+    Keeps `1 + standby` connections to an endpoint open, running `session(websocket, supervisor)` on each.
+
+    max_retries None never gives up, otherwise the connection stops after that many consecutive
+    failures. A clean close from the server (e.g. 1001 going away during a deploy) or a session
+    returning is not a failure and never stops the connection, but like failures it backs off unless
+    the connection was up for `backoff.reset_after` seconds. With standby connections, sessions
+    should pass frames through `accept` so only the first copy is processed.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        session: Session,
+        backoff: Optional[Backoff] = None,
+        max_retries: Optional[int] = None,
+        standby: int = 0,
+        **connect_kwargs: Any,
+    ) -> None:
+        self.endpoint = endpoint
+        self.session = session
+        self.backoff = backoff or Backoff()
+        self.max_retries = max_retries
+        self.standby = standby
+        self.connect_kwargs = {"ping_interval": 10, "ping_timeout": 20, **connect_kwargs}
+        self.stats = ConnectionStats(endpoint)
+        self.dedup = FrameDeduplicator() if standby else None
+
+    def accept(self, frame: Frame) -> bool:
+        dedup = self.dedup
+        if dedup is not None and not dedup.first(frame):
+            self.stats.duplicates += 1
+            return False
+        self.stats.messages += 1
+        return True
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._connection(index) for index in range(1 + self.standby)))
+
+    async def _connection(self, index: int) -> None:
+        endpoint = self.endpoint
+        name = endpoint if not self.standby else f"{endpoint} [{index}]"
+        # consecutive errors, counted against max_retries, and consecutive reconnects for the backoff;
+        # both start over only once a connection has stayed up for backoff.reset_after seconds
+        failures = attempts = 0
+        while True:
+            up_since: Optional[float] = None
+            error: Optional[str] = None
+            try:
+                async with connect(endpoint, **self.connect_kwargs) as websocket:
+                    up_since = time.monotonic()
+                    gap = self.stats.connected()
+                    if gap is None:
+                        logging.info(f"Connected to {name}")
+                    else:
+                        logging.info(f"Reconnected to {name} after {gap / 1e6:.0f}ms, "
+                                     f"~{self.stats.missed_estimate:.0f} messages potentially missed in total")
+                    await self.session(websocket, self)
+                # the session ended without an error, e.g. iterating a websocket the server closed
+                logging.info(f"Connection to {name} ended. Reconnecting")
+            except websockets.exceptions.ConnectionClosedOK as e:
+                logging.info(f"Connection to {name} closed cleanly: {e}. Reconnecting")
+            except websockets.exceptions.ConnectionClosedError as e:
+                error = f"Connection to {name} closed with error: {e}"
+            except Exception as e:
+                error = f"Unexpected error on {name}: {e}"
+            finally:
+                if up_since is not None:
+                    self.stats.disconnected()
+            if up_since is not None and time.monotonic() - up_since >= self.backoff.reset_after:
+                failures = attempts = 0
+            attempts += 1
+            if error is not None:
+                failures += 1
+                logging.error(f"{error}. Retry {self._retry_label(failures)}")
+            if self.max_retries is not None and failures >= self.max_retries:
+                logging.error(f"Max retries exceeded for {name}. Giving up.")
+                return
+            await asyncio.sleep(self.backoff.delay(attempts - 1))
+
+    def _retry_label(self, failures: int) -> str:
+        return f"{failures}/{self.max_retries}" if self.max_retries is not None else str(failures)
@@ -0,0 +1,114 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import analytics as analytics_module  # noqa: E402
+from analytics import Analytics  # noqa: E402
+from ticks import LastTradePriceTick, ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+SECOND = 1_000_000
+
+
+def tob(entity_id, ts, bid, ask, bid_size=1, ask_size=1):
+    return TopOfBookTick(str(ts), entity_id, "0", bid, bid_size, ask, ask_size)
+
+
+def trade(entity_id, ts, price):
+    return LastTradePriceTick(str(ts), entity_id, "0", price, "t")
+
+
+def test_quote_fields_and_microprice():
+    a = Analytics(capacity=4)
+    a.update(tob("1", SECOND, 100, 102, bid_size=3, ask_size=1))
+    state = a.get("1")
+    assert (state["mid"], state["spread"], state["mid_ewma"]) == (101.0, 2.0, 101.0)
+    assert state["microprice"] == pytest.approx((100 * 1 + 102 * 3) / 4)
+    assert a.get("2") is None
+
+
+def test_ewma_decays_by_half_per_halflife():
+    a = Analytics(halflife=10)
+    a.update(tob("1", 0, 99, 101))
+    a.update(tob("1", 10 * SECOND, 199, 201))
+    assert a.get("1")["mid_ewma"] == pytest.approx(150.0)
+
+
+def test_trade_ewma_volatility_and_reference():
+    a = Analytics(halflife=0)
+    a.update(trade("1", SECOND, 100))
+    assert a.get("1")["volatility"] != a.get("1")["volatility"]  # NaN until a second trade
+    a.update(trade("1", 2 * SECOND, 110))
+    a.update(ReferencePriceTick(str(3 * SECOND), "1", "0", 105, "index"))
+    state = a.get("1")
+    assert state["trade_ewma"] == 110.0 and state["trades"] == 2 and state["reference"] == 105.0
+    assert state["volatility"] == pytest.approx(abs(math.log(110 / 100)))
+
+
+def test_time_and_count_bars():
+    a = Analytics(bar_seconds=60, bar_count=3)
+    bars = []
+    a.bar_consumers.append(bars.append)
+    for ts, price in ((1, 10), (20, 12), (59, 9), (61, 11), (70, 11)):
+        a.update(trade("1", ts * SECOND, price))
+    count_bar, time_bar = bars
+    assert (count_bar.kind, count_bar.open, count_bar.high, count_bar.low, count_bar.close, count_bar.count) == (
+        "count", 10, 12, 9, 9, 3)
+    assert (time_bar.kind, time_bar.start_us, time_bar.end_us, time_bar.close, time_bar.count) == (
+        "time", 0, 60 * SECOND, 9, 3)
+    a.flush()
+    assert [(b.kind, b.count, b.open) for b in bars[2:]] == [("time", 2, 11), ("count", 2, 11)]
+
+
+def test_slots_grow_beyond_capacity():
+    a = Analytics(capacity=2)
+    for i in range(5):
+        a.update(trade(str(i), SECOND, 100 + i))
+    assert len(a) == 5 and a.capacity == 8
+    assert a.get("4")["last"] == 104.0 and a.get("4")["trades"] == 1
+
+
+@pytest.mark.parametrize("numpy", [False, True])
+def test_batched_recompute_and_select(monkeypatch, numpy):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analytics_module, "np", None)
+    a = Analytics(capacity=2, derive=False)
+    a.update(tob("1", SECOND, 100, 102, bid_size=3, ask_size=1))
+    a.update(tob("2", SECOND, 50, 51, bid_size=0, ask_size=0))
+    a.update(tob("3", SECOND, 10, 14))
+    assert a.get("1")["mid"] != a.get("1")["mid"]
+    a.recompute()
+    columns = a.select(["mid", "spread", "microprice"], ["3", "missing", "2", "1"])
+    assert columns["entity_id"] == ["3", "2", "1"]
+    assert list(columns["mid"]) == [12.0, 50.5, 101.0] and list(columns["spread"]) == [4.0, 1.0, 2.0]
+    assert list(columns["microprice"]) == pytest.approx([12.0, 50.5, 101.5])
+    a.update(tob("4", SECOND, 1, 3))  # growth after a NumPy view was taken
+    assert len(a.select(["bid"])["bid"]) == 4
+
+
+def test_unknown_bar_price():
+    with pytest.raises(ValueError):
+        Analytics(bar_price="vwap")
+    with pytest.raises(ValueError):
+        Analytics(bar_price="mid", derive=False)
+
+
+def test_count_bars_count_trades_whatever_the_bar_price():
+    a = Analytics(bar_seconds=60, bar_count=2, bar_price="mid")
+    bars = []
+    a.bar_consumers.append(bars.append)
+    for ts in range(1, 6):
+        a.update(tob("1", ts * SECOND, 100 + ts, 102 + ts))
+    assert bars == []
+    a.update(trade("1", 10 * SECOND, 50))
+    a.update(trade("1", 11 * SECOND, 52))
+    assert [(b.kind, b.open, b.close, b.count) for b in bars] == [("count", 50, 52, 2)]
+    a.flush()
+    assert (bars[-1].kind, bars[-1].open, bars[-1].count) == ("time", 102, 5)
@@ -1,6 +1,7 @@
 import json
 import asyncio
 import logging
+import time
 
 from pathlib import Path
 import sys
@@ -11,6 +12,8 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import client  # noqa: E402
+from metrics import ClientMetrics  # noqa: E402
+from registry import Instrument, InstrumentIndex  # noqa: E402
 
 
 def test_load_ref_data(tmp_path):
@@ -22,21 +25,29 @@ def test_load_ref_data(tmp_path):
 
 
 def test_find_product_by_id():
-    client.ref_data = [{"id": 1, "symbol": "BTC"}, {"id": 2, "symbol": "ETH"}]
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}, {"id": 2, "symbol": "ETH"}]))
     assert client.find_product_by_id("2") == "ETH"
+    assert client.find_product_by_id("3") == "Unknown"
+
+
+def test_find_instrument_returns_conversion_factors():
+    client.registry.swap(InstrumentIndex([Instrument("1", "BTC-USD", "11", "tradeable", 2, 8)]))
+    instrument = client.find_instrument("1")
+    assert (instrument.symbol, instrument.price_factor, instrument.quantity_factor) == ("BTC-USD", 100, 10 ** 8)
+    unknown = client.find_instrument("99")
+    assert (unknown.symbol, unknown.price_factor, unknown.quantity_factor) == ("Unknown", 1, 1)
 
 
 def test_find_product_by_id_without_data(caplog):
-    client.ref_data = None
+    client.registry.swap(InstrumentIndex())
     result = client.find_product_by_id("1")
     assert result == "Error"
     assert any("No Reference data loaded" in r.message for r in caplog.records)
 
 
 
-def test_process_message_top_of_book(monkeypatch, caplog):
-    client.ref_data = [{"id": 1, "symbol": "BTC"}]
-    monkeypatch.setattr(client, "lookup_conversion_number_by_id", lambda *args, **kwargs: (1, 1))
+def test_process_message_top_of_book(caplog):
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}]))
     message = json.dumps({
         "top_of_book": {
             "timestamp": "ts",
@@ -54,9 +65,32 @@ def test_process_message_top_of_book(monkeypatch, caplog):
     assert any("Received Top Of Book" in r.message for r in caplog.records)
 
 
-def test_process_message_reference_price(monkeypatch, caplog):
-    client.ref_data = [{"id": 1, "symbol": "BTC"}]
-    monkeypatch.setattr(client, "lookup_conversion_number_by_id", lambda *a, **k: (1, 1))
+def test_process_message_top_of_book_conversion(caplog):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    message = json.dumps({
+        "top_of_book": {
+            "timestamp": "ts",
+            "tradeable_entity_id": "7",
+            "market_id": "3",
+            "buy_price": "6543210",
+            "buy_quantity": "12345678",
+            "sell_price": "6543300",
+            "sell_quantity": "50000000"
+        }
+    })
+    caplog.clear()
+    caplog.set_level(logging.INFO)
+    asyncio.run(client.process_message(message, "endpoint"))
+    record = next(r.message for r in caplog.records if "Received Top Of Book" in r.message)
+    assert "buy_price_conv=65432.1," in record
+    assert "buy_quantity_conv=0.12345678," in record
+    assert "sell_price_conv=65433.0," in record
+    # sell quantity is converted from sell_quantity, not sell_price
+    assert "sell_quantity_conv=0.5)" in record
+
+
+def test_process_message_reference_price(caplog):
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}]))
     message = json.dumps({
         "reference_price": {
             "timestamp": "ts",
@@ -72,9 +106,8 @@ def test_process_message_reference_price(monkeypatch, caplog):
     assert any("Received Reference Price" in r.message for r in caplog.records)
 
 
-def test_process_message_last_trade_price(monkeypatch, caplog):
-    client.ref_data = [{"id": 1, "symbol": "BTC"}]
-    monkeypatch.setattr(client, "lookup_conversion_number_by_id", lambda *a, **k: (1, 1))
+def test_process_message_last_trade_price(caplog):
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}]))
     message = json.dumps({
         "last_trade_price": {
             "timestamp": "ts",
@@ -90,6 +123,76 @@ def test_process_message_last_trade_price(monkeypatch, caplog):
     assert any("Received Last Trade Price" in r.message for r in caplog.records)
 
 
+def test_process_message_accepts_bytes(caplog):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    message = json.dumps({
+        "reference_price": {
+            "timestamp": "ts",
+            "tradeable_entity_id": "7",
+            "market_id": "3",
+            "price": "6543210",
+            "price_type": "mark"
+        }
+    }).encode()
+    caplog.clear()
+    caplog.set_level(logging.INFO)
+    asyncio.run(client.process_message(message, "endpoint"))
+    assert any("Received Reference Price for product 'BTC-USD'" in r.message and "price_conv=65432.1" in r.message
+               for r in caplog.records)
+    assert any(r.message == f"Received message: {message.decode()}" for r in caplog.records)
+
+
+def test_process_message_dispatches_through_handler_table(monkeypatch):
+    received = []
+    monkeypatch.setitem(client.MESSAGE_HANDLERS, "top_of_book", received.append)
+    asyncio.run(client.process_message('{"top_of_book": {"tradeable_entity_id": "1"}}', "endpoint"))
+    assert received == [{"tradeable_entity_id": "1"}]
+
+
+def test_process_message_missing_field(caplog):
+    caplog.set_level(logging.ERROR)
+    asyncio.run(client.process_message('{"top_of_book": {"timestamp": "ts"}}', "endpoint"))
+    assert any("Error decoding message" in r.message for r in caplog.records)
+
+
+def test_process_message_delivers_ticks_to_consumers(monkeypatch):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    received = []
+    monkeypatch.setattr(client, "tick_consumers", [received.append])
+    message = ('{"last_trade_price": {"timestamp": "ts", "tradeable_entity_id": "7", '
+               '"market_id": "3", "price": "100", "price_type": "t"}}')
+    asyncio.run(client.process_message(message, "endpoint"))
+    assert len(received) == 1
+    assert (received[0].product, received[0].price_conv) == ("BTC-USD", 1.0)
+
+
+def test_process_message_raw_frame_logging_can_be_disabled(caplog):
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}]))
+    message = ('{"reference_price": {"timestamp": "ts", "tradeable_entity_id": "1", '
+               '"market_id": "m", "price": "1", "price_type": "t"}}')
+    caplog.clear()
+    caplog.set_level(logging.INFO)
+    client.frame_logger.setLevel(logging.WARNING)
+    try:
+        asyncio.run(client.process_message(message, "endpoint"))
+    finally:
+        client.frame_logger.setLevel(logging.NOTSET)
+    assert not any("Received message" in r.message for r in caplog.records)
+    assert any("Received Reference Price" in r.message for r in caplog.records)
+
+
+def test_process_message_samples_tick_logging(caplog, monkeypatch):
+    client.registry.swap(InstrumentIndex.from_records([{"id": 1, "symbol": "BTC"}]))
+    monkeypatch.setattr(client.last_trade_price_sampler, "every", 3)
+    message = ('{"last_trade_price": {"timestamp": "ts", "tradeable_entity_id": "1", '
+               '"market_id": "m", "price": "1", "price_type": "t"}}')
+    caplog.clear()
+    caplog.set_level(logging.INFO)
+    for _ in range(6):
+        asyncio.run(client.process_message(message, "endpoint"))
+    assert sum("Received Last Trade Price" in r.message for r in caplog.records) == 2
+
+
 def test_process_message_invalid_json(caplog):
     caplog.set_level(logging.ERROR)
     asyncio.run(client.process_message("{invalid}", "endpoint"))
@@ -100,3 +203,96 @@ def test_process_message_unknown_message(caplog):
     caplog.set_level(logging.WARNING)
     asyncio.run(client.process_message('{"foo": 1}', "endpoint"))
     assert any("Unknown message type" in r.message for r in caplog.records)
+
+
+def test_process_message_records_metrics_when_enabled(monkeypatch):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    metrics = ClientMetrics()
+    monkeypatch.setattr(client, "metrics", metrics)
+    monkeypatch.setattr(client, "stage_latency", metrics.stages)
+    monkeypatch.setattr(client, "tick_consumers", [])
+    timestamp = time.time_ns() // 1000 - 2000  # 2ms ago
+    message = (f'{{"last_trade_price": {{"timestamp": "{timestamp}", "tradeable_entity_id": "7", "market_id": "3", '
+               f'"price": "100", "price_type": "t"}}}}')
+    for _ in range(3):
+        asyncio.run(client.process_message(message, "endpoint"))
+    asyncio.run(client.process_message("{invalid}", "endpoint"))
+    assert metrics.messages == {("endpoint", "last_trade_price"): 3}
+    assert metrics.errors == {("endpoint", "decode"): 1}
+    assert metrics.stages["process"].count == 3
+    assert metrics.lag["last_trade_price"].min >= 2_000_000
+    clock = metrics.clocks.clocks["endpoint"]
+    assert clock.count == 3 and clock.offset_ns >= 2_000_000
+
+
+def test_process_message_times_stages_from_receive_time(monkeypatch):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    metrics = ClientMetrics()
+    monkeypatch.setattr(client, "stage_latency", metrics.stages)
+    monkeypatch.setattr(client, "tick_consumers", [])
+    message = ('{"reference_price": {"timestamp": "1728314722542871", "tradeable_entity_id": "7", "market_id": "3", '
+               '"price": "100", "price_type": "t"}}')
+    # a frame read 5ms ago, e.g. waiting in a pipeline queue since
+    asyncio.run(client.process_message(message, "endpoint", received_ns=time.monotonic_ns() - 5_000_000))
+    assert metrics.stages["parse"].min >= 5_000_000 and metrics.stages["process"].min >= 5_000_000
+
+
+def test_process_message_stamps_receive_time(monkeypatch):
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    received = []
+    monkeypatch.setattr(client, "tick_consumers", [received.append])
+    message = ('{"reference_price": {"timestamp": "1728314722542871", "tradeable_entity_id": "7", "market_id": "3", '
+               '"price": "100", "price_type": "t"}}')
+    asyncio.run(client.process_message(message, "endpoint", received_ns=42))
+    before = time.monotonic_ns()
+    asyncio.run(client.process_message(message, "endpoint"))
+    assert received[0].received_ns == 42 and received[1].received_ns >= before
+    assert received[0].exchange_us == 1728314722542871
+
+
+def test_process_message_holds_unknown_ids_until_resolved(monkeypatch):
+    from refresh import PendingTicks
+
+    client.registry.swap(InstrumentIndex())
+    delivered = []
+    monkeypatch.setattr(client, "tick_consumers", [delivered.append])
+    monkeypatch.setattr(client, "pending_ticks", PendingTicks(client.registry))
+    message = ('{"last_trade_price": {"timestamp": "1", "tradeable_entity_id": "7", "market_id": "3", '
+               '"price": "12345", "price_type": "t"}}')
+    asyncio.run(client.process_message(message, "endpoint"))
+    assert delivered == [] and len(client.pending_ticks) == 1
+    # listed by a REST record without decimals, still held
+    client.registry.swap(InstrumentIndex.from_records([{"id": 7, "symbol": "BTC-USD"}]))
+    asyncio.run(client.process_message(message, "endpoint"))
+    assert delivered == [] and len(client.pending_ticks) == 2
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    assert client.pending_ticks.release(client.deliver_tick) == 2
+    assert delivered[0].product == "BTC-USD" and delivered[0].price_conv == 123.45
+
+
+def test_hold_until_loaded_delivers_ticks_once_the_background_load_ends(monkeypatch):
+    import threading
+
+    client.registry.swap(InstrumentIndex())
+    delivered = []
+    monkeypatch.setattr(client, "tick_consumers", [delivered.append])
+    monkeypatch.setattr(client, "pending_ticks", None)
+    loading = threading.Event()
+    index = InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)])
+    loader = threading.Thread(target=lambda: loading.wait(5) and client.registry.swap(index))
+    known = ('{"last_trade_price": {"timestamp": "1", "tradeable_entity_id": "7", "market_id": "3", '
+             '"price": "12345", "price_type": "t"}}')
+    unknown = known.replace('"7"', '"8"')
+
+    async def run() -> None:
+        loader.start()
+        client.hold_until_loaded(loader)
+        await client.process_message(known, "endpoint")
+        await client.process_message(unknown, "endpoint")
+        assert delivered == [] and len(client.pending_ticks) == 2
+        loading.set()
+        while client.pending_ticks is not None:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert [(tick.product, tick.price_conv) for tick in delivered] == [("BTC-USD", 123.45), ("Unknown", 12345.0)]
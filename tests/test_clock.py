@@ -0,0 +1,50 @@
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from clock import ClockTracker, EndpointClock, wall_offset_ns  # noqa: E402
+
+SECOND = 1_000_000_000
+MS = 1_000_000
+
+
+def test_wall_offset_converts_monotonic_to_wall_time():
+    offset = wall_offset_ns()
+    assert abs(time.monotonic_ns() + offset - time.time_ns()) < 50 * MS
+
+
+def test_endpoint_clock_offset_is_windowed_minimum():
+    clock = EndpointClock(window=3, alpha=0.5)
+    # 5ms best case in the first second, 8ms after it
+    for second, delay in ((100, 5 * MS), (100, 9 * MS), (101, 8 * MS), (102, 12 * MS)):
+        clock.observe(delay, second * SECOND)
+    assert clock.offset_ns == 5 * MS
+    clock.observe(10 * MS, 103 * SECOND)
+    # second 100 left the window
+    assert clock.offset_ns == 8 * MS
+    assert clock.count == 5 and clock.last_ns == 10 * MS and clock.max_ns == 12 * MS
+
+
+def test_endpoint_clock_excess_lag_ignores_skew():
+    skewed, accurate = EndpointClock(alpha=1.0), EndpointClock(alpha=1.0)
+    for i, latency in enumerate((2 * MS, 2 * MS, 30 * MS)):
+        skewed.observe(latency - 500 * MS, i * SECOND)
+        accurate.observe(latency, i * SECOND)
+    assert skewed.offset_ns == -498 * MS and accurate.offset_ns == 2 * MS
+    assert skewed.excess_ns == accurate.excess_ns == 28 * MS
+
+
+def test_tracker_observes_per_endpoint():
+    tracker = ClockTracker(window=10, alpha=0.1)
+    received = time.monotonic_ns()
+    exchange_us = (tracker.wall_ns(received) - 3 * MS) // 1000
+    assert 3 * MS <= tracker.observe("wss://a", exchange_us, received) < 3 * MS + 1000
+    tracker.observe("wss://b", exchange_us - 7000, received)
+    stats = tracker.as_dict()
+    assert set(stats) == {"wss://a", "wss://b"}
+    assert stats["wss://b"]["offset_ns"] - stats["wss://a"]["offset_ns"] == 7 * MS
+    assert tracker.format().startswith("clock wss://a: offset=3.0")
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from conflation import Conflator  # noqa: E402
+from ticks import ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+
+def tob(entity_id: str, bid: int) -> TopOfBookTick:
+    return TopOfBookTick("ts", entity_id, "m", bid, 1, bid + 1, 1)
+
+
+def test_drain_returns_latest_per_changed_instrument():
+    conflator = Conflator()
+    for bid in range(100):
+        conflator.update(tob("1", bid))
+    conflator.update(tob("2", 5))
+    conflator.update(ReferencePriceTick("ts", "1", "m", 7, "mark"))
+    ticks = conflator.drain()
+    assert [(type(t).__name__, t.tradeable_entity_id) for t in ticks] == [
+        ("TopOfBookTick", "1"), ("TopOfBookTick", "2"), ("ReferencePriceTick", "1")
+    ]
+    assert ticks[0].buy_price == 99
+    assert (conflator.updates, conflator.conflated, conflator.drained) == (102, 99, 3)
+    # nothing changed since the previous drain
+    assert conflator.drain() == []
+    assert conflator.latest((TopOfBookTick, "1")).buy_price == 99
+    conflator.update(tob("2", 6))
+    assert [t.buy_price for t in conflator.drain()] == [6]
+
+
+def test_run_delivers_on_cadence_and_wait_on_demand():
+    delivered = []
+
+    async def consumer(ticks):
+        delivered.append([t.buy_price for t in ticks])
+
+    async def run():
+        conflator = Conflator()
+        task = asyncio.create_task(conflator.run(consumer, 0.01))
+        for bid in range(10):
+            conflator.update(tob("1", bid))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        conflator.update(tob("3", 30))
+        return await asyncio.wait_for(conflator.wait(), 1)
+
+    waited = asyncio.run(run())
+    assert delivered == [[9]]
+    assert [t.buy_price for t in waited] == [30]
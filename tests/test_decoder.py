@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import decoder  # noqa: E402
+from decoder import available_decoders, get_decoder  # noqa: E402
+
+FRAME = '{"top_of_book": {"tradeable_entity_id": "7", "buy_price": "100"}}'
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_decoders_accept_str_and_bytes(name):
+    json_decoder = get_decoder(name)
+    assert json_decoder.name == name
+    expected = {"top_of_book": {"tradeable_entity_id": "7", "buy_price": "100"}}
+    assert json_decoder.loads(FRAME) == expected
+    assert json_decoder.loads(FRAME.encode()) == expected
+
+
+@pytest.mark.parametrize("name", available_decoders())
+def test_decoders_raise_declared_errors(name):
+    json_decoder = get_decoder(name)
+    with pytest.raises(json_decoder.errors):
+        json_decoder.loads(b"{invalid}")
+
+
+def test_get_decoder_prefers_fast_backend():
+    assert get_decoder().name == available_decoders()[0]
+    assert "json" in available_decoders()
+
+
+def test_get_decoder_falls_back_when_not_installed(monkeypatch, caplog):
+    def missing():
+        raise ImportError("not installed")
+
+    monkeypatch.setitem(decoder.DECODER_FACTORIES, "msgspec", missing)
+    assert get_decoder("msgspec").name == "json"
+    assert any("not installed" in r.message for r in caplog.records)
+
+
+def test_get_decoder_unknown_name():
+    with pytest.raises(ValueError):
+        get_decoder("yaml")
+
+
+def test_peek_fields_without_full_decode():
+    assert decoder.peek_message_type(FRAME) == "top_of_book"
+    assert decoder.peek_message_type(FRAME.encode()) == "top_of_book"
+    assert decoder.peek_entity_id(FRAME) == "7"
+    assert decoder.peek_entity_id(FRAME.encode()) == "7"
+    assert decoder.peek_entity_id(b'{"heartbeat": {}}') is None
+
+
+def test_frame_text_decodes_raw_frames():
+    assert decoder.frame_text(FRAME) is FRAME
+    assert decoder.frame_text(FRAME.encode()) == decoder.frame_text(memoryview(FRAME.encode())) == FRAME
+    assert decoder.frame_text(b'{"x": "\xff"}') == '{"x": "�"}'
@@ -0,0 +1,68 @@
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fixedpoint import FixedPoint, convert_batch, parse_mantissa, sum_scaled, to_decimal, to_float  # noqa: E402
+from registry import InstrumentIndex  # noqa: E402
+
+# (entity id, raw price, raw quantity, expected price, expected quantity) using decimals from data/tradeable_entity.csv
+GOLDEN_VALUES = [
+    ("7", "6543210", "12345678", 65432.10, 0.12345678),  # BTC-USD: 2 price, 8 qty decimals
+    ("1", "10000", "2500", 1.0, 0.25),  # PTF-USD: 4, 4
+    ("51997", "123456", "15000", 1234.56, 1.5),  # BTC-20241227-40000P: 2, 4
+    ("218906", "1300000", "1234", 1.3, 12.34),  # SUI-20241129-1.3000P: 6, 2
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return InstrumentIndex.from_csv(str(ROOT / "data" / "tradeable_entity.csv"))
+
+
+@pytest.mark.parametrize("entity_id,raw_price,raw_quantity,price,quantity", GOLDEN_VALUES)
+def test_golden_values(index, entity_id, raw_price, raw_quantity, price, quantity):
+    instrument = index.get(entity_id)
+    assert to_float(parse_mantissa(raw_price), instrument.price_decimals) == price
+    assert to_float(parse_mantissa(raw_quantity), instrument.quantity_decimals) == quantity
+    assert to_decimal(parse_mantissa(raw_price), instrument.price_decimals) == Decimal(str(price))
+
+
+def test_parse_mantissa():
+    assert parse_mantissa("6500000") == 6500000
+    assert parse_mantissa("10.0") == 10
+    assert parse_mantissa(42) == 42
+    with pytest.raises(ValueError):
+        parse_mantissa("10.5")
+    with pytest.raises(ValueError):
+        parse_mantissa("abc")
+
+
+def test_fixed_point_arithmetic_is_exact():
+    tick = FixedPoint.from_raw("1", 1)  # 0.1
+    total = FixedPoint(0, 1)
+    for _ in range(10):
+        total = total + tick
+    assert total == FixedPoint(1, 0)
+    assert float(total) == 1.0
+    assert sum(0.1 for _ in range(10)) != 1.0
+    assert FixedPoint(150, 2) - FixedPoint(5, 1) == FixedPoint(1, 0)
+    assert sum_scaled([1] * 10, 1).to_decimal() == Decimal("1.0")
+
+
+def test_rescale_rejects_precision_loss():
+    assert FixedPoint(15, 1).rescale(3).mantissa == 1500
+    with pytest.raises(ValueError):
+        FixedPoint(15, 1).rescale(0)
+
+
+def test_convert_batch():
+    assert convert_batch([100, 250, -5], 2) == [1.0, 2.5, -0.05]
+    assert convert_batch([100, 250], [2, 1]) == [1.0, 25.0]
+    with pytest.raises(ValueError):
+        convert_batch([1, 2], [1])
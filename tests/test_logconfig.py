@@ -0,0 +1,104 @@
+import json
+import logging
+import queue
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from logconfig import (  # noqa: E402
+    JsonLinesFormatter,
+    LazyQueueHandler,
+    Sampler,
+    configure_sampling,
+    parse_sampling,
+    sampler,
+    setup_logging,
+)
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger('')
+    handlers, level = list(root.handlers), root.level
+    yield root
+    for handler in root.handlers:
+        if handler not in handlers:
+            root.removeHandler(handler)
+            handler.close()
+    root.setLevel(level)
+
+
+def test_sampler_every_n_per_key():
+    s = Sampler(every=3)
+    assert [s("a") for _ in range(6)] == [True, False, False, True, False, False]
+    assert s("b") is True
+    assert Sampler().unsampled and not s.unsampled
+
+
+def test_sampler_max_per_second():
+    s = Sampler(max_per_second=2)
+    assert [s("a") for _ in range(4)] == [True, True, False, False]
+    assert s("b") is True
+
+
+def test_configure_sampling_updates_shared_sampler():
+    s = sampler("test_category")
+    configure_sampling("test_category", every=10)
+    assert s.every == 10
+    assert parse_sampling("5") == {"*": 5}
+    assert parse_sampling("top_of_book=100, reference_price=10") == {"top_of_book": 100, "reference_price": 10}
+    assert parse_sampling("") == {}
+
+
+def test_lazy_queue_handler_defers_formatting():
+    class Tick:
+        formatted = 0
+
+        def __str__(self):
+            Tick.formatted += 1
+            return "tick"
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = LazyQueueHandler(records)
+    logger = logging.getLogger("test.lazy")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("Received %s", Tick())
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    record = records.get_nowait()
+    assert Tick.formatted == 0
+    assert record.getMessage() == "Received tick"
+
+
+def test_json_lines_formatter():
+    record = logging.makeLogRecord({"msg": "hello %s", "args": ("world",), "levelname": "INFO", "name": "client",
+                                    "entity_id": "7"})
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "client" and entry["entity_id"] == "7"
+    assert "ts" in entry
+
+
+def test_setup_logging_queue_mode_writes_file(tmp_path, root_logger):
+    log_file = tmp_path / "client.log"
+    listener = setup_logging(str(log_file), use_queue=True, json_lines=True, console=False)
+    assert listener is not None
+    logging.getLogger("client.ticks").info("Received %s", "tick")
+    listener.stop()
+    lines = log_file.read_text().splitlines()
+    assert json.loads(lines[-1])["message"] == "Received tick"
+
+
+def test_setup_logging_sync_mode(tmp_path, root_logger):
+    log_file = tmp_path / "client.log"
+    assert setup_logging(str(log_file), use_queue=False, console=False) is None
+    logging.info("sync line")
+    assert "INFO - sync line" in log_file.read_text()
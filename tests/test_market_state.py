@@ -0,0 +1,96 @@
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from market_state import MarketStateStore  # noqa: E402
+from registry import Instrument, InstrumentIndex, InstrumentRegistry  # noqa: E402
+from ticks import LastTradePriceTick, ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+
+@pytest.fixture
+def store():
+    registry = InstrumentRegistry(InstrumentIndex([
+        Instrument("7", "BTC-USD", "3", "tradeable", 2, 8),
+        Instrument("51997", "BTC-20241227-40000P", "52006", "tradeable", 2, 4),
+        Instrument("51998", "BTC-20241227-41000P", "52007", "tradeable", 2, 4),
+        Instrument("60000", "ETH-20241227-3000C", "60010", "tradeable", 2, 4),
+    ]))
+    return MarketStateStore(registry)
+
+
+def tob(entity_id: str, bid: int = 100) -> TopOfBookTick:
+    return TopOfBookTick("1", entity_id, "m", bid, 10000, bid + 1, 20000, price_decimals=2, quantity_decimals=4)
+
+
+def test_update_merges_tick_types(store):
+    store.update(tob("7", 6543210), received_ns=1)
+    store.update(ReferencePriceTick("2", "7", "m", 6543000, "mark", price_decimals=2), received_ns=2)
+    state = store.update(LastTradePriceTick("3", "7", "m", 6543100, "last", price_decimals=2), received_ns=3)
+    assert (state.bid, state.ask, state.bid_size, state.ask_size) == (65432.1, 65432.11, 1.0, 2.0)
+    assert (state.reference, state.last) == (65430.0, 65431.0)
+    assert (state.top_of_book_received_ns, state.reference_price_received_ns, state.last_trade_received_ns) == (1, 2, 3)
+    assert state.received_ns == 3
+    assert store.get("7") is state
+    assert store.by_symbol("BTC-USD") is state
+    assert store.get("8") is None and store.by_symbol("XRP-USD") is None
+
+
+def test_snapshot_is_isolated_from_updates(store):
+    store.update(tob("7", 100))
+    snapshot = store.snapshot()
+    before = snapshot["7"]
+    store.update(tob("7", 200))
+    store.update(tob("51997"))
+    assert snapshot["7"] is before and snapshot["7"].top_of_book.buy_price == 100
+    assert "51997" not in snapshot
+    assert store.get("7").top_of_book.buy_price == 200
+    with pytest.raises(AttributeError):
+        before.top_of_book = None
+
+
+def test_queries_by_underlying_and_expiry(store):
+    for entity_id in ("7", "51997", "51998", "60000"):
+        store.update(tob(entity_id))
+    assert {s.entity_id for s in store.by_underlying("BTC")} == {"7", "51997", "51998"}
+    assert {s.entity_id for s in store.by_expiry(date(2024, 12, 27))} == {"51997", "51998", "60000"}
+    assert {s.entity_id for s in store.by_expiry(date(2024, 12, 27), underlying="ETH")} == {"60000"}
+    assert store.by_underlying("SOL") == []
+
+
+def test_concurrent_readers_never_lock_or_fail(store):
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                for state in store.snapshot().values():
+                    tick = state.top_of_book
+                    if tick.sell_price != tick.buy_price + 1:
+                        errors.append(state)
+            except Exception as e:  # e.g. dict changed size during iteration
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for bid in range(20000):
+        store.update(tob(str(bid % 5000), bid), received_ns=1)
+    done.set()
+    thread.join()
+    assert errors == []
+    assert len(store) == 5000
+
+
+def test_update_rejects_unknown_tick_type(store):
+    class Heartbeat:
+        tradeable_entity_id = "7"
+
+    with pytest.raises(TypeError):
+        store.update(Heartbeat())
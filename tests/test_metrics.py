@@ -0,0 +1,116 @@
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from metrics import ClientMetrics, LatencyHistogram, StageLatency, bucket_bounds, bucket_index, serve_metrics  # noqa: E402
+
+
+def test_buckets_are_contiguous_with_bounded_error():
+    previous_high = -1
+    for index in range(bucket_index(10 ** 12)):
+        low, high = bucket_bounds(index)
+        assert low == previous_high + 1
+        assert bucket_index(low) == index and bucket_index(high) == index
+        assert (high - low) <= max(1, low) / 100
+        previous_high = high
+
+
+def test_percentiles_within_one_percent():
+    values = [random.randint(1_000, 5_000_000) for _ in range(10_000)]  # nosec B311
+    histogram = LatencyHistogram()
+    histogram.record_many(values)
+    values.sort()
+    for percent in (50, 99, 99.9):
+        exact = values[int(len(values) * percent / 100) - 1]
+        assert abs(histogram.percentile(percent) - exact) <= exact / 100
+    assert histogram.max == values[-1] and histogram.min == values[0]
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_merge_and_reset():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.record_many([10, 20])
+    b.record_many([30, 5])
+    a.merge(b)
+    assert (a.count, a.total, a.min, a.max) == (4, 65, 5, 30)
+    a.reset()
+    assert a.count == 0 and a.percentile(50) == 0 and a.summary()["min"] == 0
+
+
+def test_negative_values_are_counted_and_recorded_as_zero():
+    histogram = LatencyHistogram()
+    histogram.record_many([-500, 100, -1])
+    other = LatencyHistogram()
+    other.record(-7)
+    histogram.merge(other)
+    assert (histogram.count, histogram.negative, histogram.total, histogram.min) == (4, 3, 100, 0)
+    assert histogram.percentile(50) == 0 and "negative=3" in histogram.format("lag")
+    metrics = ClientMetrics()
+    metrics.record_lag("trade", -2_000_000)
+    assert 'powertrade_negative_latency_total{metric="exchange_lag",type="trade"} 1' in metrics.render()
+    histogram.reset()
+    assert histogram.negative == 0
+
+
+def test_stage_latency():
+    latency = StageLatency(("parse",))
+    latency.record("parse", 1000)
+    latency.record("deliver", 2000)
+    assert latency["parse"].count == latency["deliver"].count == 1
+    assert "deliver: count=1" in latency.format()
+
+
+def test_client_metrics_prometheus_text():
+    metrics = ClientMetrics()
+    metrics.count("wss://feed", "top_of_book")
+    metrics.count("wss://feed", "top_of_book")
+    metrics.error('wss://"odd"', "decode")
+    metrics.stages.record("parse", 1500)
+    metrics.record_lag("top_of_book", 3_000_000)
+    connections = {"wss://feed": {"connects": 3, "reconnects": 2, "live": 1, "duplicates": 0,
+                                  "missed_estimate": 40, "disconnected_ms": 1500.0}}
+    text = metrics.render(connections)
+    assert 'powertrade_messages_total{endpoint="wss://feed",type="top_of_book"} 2' in text
+    assert 'powertrade_errors_total{endpoint="wss://\\"odd\\"",kind="decode"} 1' in text
+    assert 'powertrade_stage_latency_seconds_count{stage="parse"} 1' in text
+    assert 'powertrade_exchange_lag_seconds{type="top_of_book",quantile="0.99"} 0.003' in text
+    assert 'powertrade_reconnects_total{endpoint="wss://feed"} 2' in text
+    assert 'powertrade_disconnected_seconds_total{endpoint="wss://feed"} 1.500' in text
+    line = metrics.summary_line(connections)
+    assert "messages=2" in line and "top_of_book=2" in line and "reconnects=2" in line
+
+
+def test_client_metrics_clock_gauges():
+    metrics = ClientMetrics()
+    received = time.monotonic_ns()
+    exchange_us = metrics.clocks.wall_ns(received) // 1000 - 4000
+    metrics.clocks.observe("wss://feed", exchange_us, received)
+    text = metrics.render()
+    assert 'powertrade_clock_offset_seconds{endpoint="wss://feed"} 0.004' in text
+    assert 'powertrade_excess_lag_seconds{endpoint="wss://feed"} 0.000000000' in text
+    assert "excess_lag_max=0.0ms" in metrics.summary_line()
+
+
+def test_serve_metrics_over_http():
+    async def run():
+        server = await serve_metrics(lambda: "powertrade_up 1\n", port=0)
+        port = server.sockets[0].getsockname()[1]
+        responses = []
+        for path in (b"/metrics", b"/other"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET " + path + b" HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            responses.append(await reader.read())
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    ok, missing = asyncio.run(run())
+    assert ok.startswith(b"HTTP/1.1 200 OK") and ok.endswith(b"\r\n\r\npowertrade_up 1\n")
+    assert missing.startswith(b"HTTP/1.1 404")
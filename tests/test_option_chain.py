@@ -0,0 +1,84 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from option_chain import CALL, PUT, OptionSurface  # noqa: E402
+from registry import Instrument, InstrumentIndex, InstrumentRegistry  # noqa: E402
+from ticks import LastTradePriceTick, ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+DEC = date(2024, 12, 27)
+MAR = date(2025, 3, 28)
+
+
+def registry():
+    return InstrumentRegistry(InstrumentIndex([
+        Instrument("1", "BTC-20241227-60000C", price_decimals=2),
+        Instrument("2", "BTC-20241227-60000P", price_decimals=2),
+        Instrument("3", "BTC-20241227-70000C", price_decimals=2),
+        Instrument("4", "BTC-20250328-50000P", price_decimals=2),
+        Instrument("5", "ETH-20241227-3000C"),
+        Instrument("6", "BTC-USD-PERPETUAL"),
+    ]))
+
+
+def reference(entity_id, price, decimals=2):
+    return ReferencePriceTick("1000", entity_id, "0", price, "mark", price_decimals=decimals)
+
+
+def test_layout_groups_by_underlying_expiry_and_strike():
+    surface = OptionSurface(registry())
+    assert len(surface) == 5 and "6" not in surface
+    assert surface.listed_underlyings() == ["BTC", "ETH"]
+    assert surface.expiries("BTC") == [DEC, MAR]
+    chain = surface.chain("BTC", DEC)
+    assert list(chain.strikes) == [60000.0, 70000.0]
+    assert chain.entity_ids == (("1", "3"), ("2", ""))
+    assert surface.chain("BTC", date(2030, 1, 1)) is None
+    assert OptionSurface(registry(), underlyings=["ETH"]).listed_underlyings() == ["ETH"]
+
+
+def test_ticks_write_in_place_into_live_views():
+    surface = OptionSurface(registry())
+    chain = surface.chain("BTC", DEC)
+    surface.update(reference("1", 250000))
+    surface.update(reference("2", 12345))
+    surface.update(TopOfBookTick("2000", "3", "0", 9900, 1, 10100, 2, price_decimals=2))
+    surface.update(LastTradePriceTick("3000", "1", "0", 1, "t", price_decimals=2))
+    surface.update(reference("6", 1))
+    assert surface.updates == 3
+    assert chain.calls("reference")[0] == 2500.0 and chain.puts("reference")[0] == 123.45
+    assert np.isnan(chain.puts("reference")[1])
+    assert chain.calls("mid")[1] == 100.0 and chain.columns["bid_size"][CALL, 1] == 1
+    assert chain.calls("updated_us")[1] == 2000
+
+
+def test_surface_aligns_expiries_on_union_of_strikes():
+    surface = OptionSurface(registry())
+    surface.update(reference("1", 100))
+    surface.update(reference("4", 300))
+    expiries, strikes, values = surface.surface("BTC")
+    assert expiries == [DEC, MAR] and list(strikes) == [50000.0, 60000.0, 70000.0]
+    assert values.shape == (2, 2, 3)
+    assert values[0, CALL, 1] == 1.0 and values[1, PUT, 0] == 3.0
+    assert np.isnan(values[0, CALL, 0]) and np.isnan(values[1, PUT, 1])
+    values[0, CALL, 1] = 0
+    assert surface.surface("BTC")[2][0, CALL, 1] == 1.0
+
+
+def test_layout_is_rebuilt_on_registry_swap_keeping_values():
+    reg = registry()
+    surface = OptionSurface(reg)
+    surface.update(reference("3", 500))
+    reg.swap(reg.index.merge([{"id": 7, "symbol": "BTC-20241227-65000C", "price_decimals": 2}]))
+    surface.update(reference("7", 700))
+    chain = surface.chain("BTC", DEC)
+    assert list(chain.strikes) == [60000.0, 65000.0, 70000.0]
+    assert list(chain.calls("reference")[1:]) == [7.0, 5.0]
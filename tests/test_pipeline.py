@@ -0,0 +1,142 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from pipeline import FrameQueue, OverflowPolicy, Pipeline, RawFrame  # noqa: E402
+
+
+def frame(entity_id: str, price: str = "1", message_type: str = "top_of_book") -> RawFrame:
+    data = f'{{"{message_type}": {{"tradeable_entity_id": "{entity_id}", "buy_price": "{price}"}}}}'.encode()
+    return RawFrame("endpoint", time.monotonic_ns(), data)
+
+
+def drain(queue: FrameQueue) -> list:
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait().data)
+    return frames
+
+
+def test_block_policy_raises_when_full_without_waiting():
+    async def run():
+        queue = FrameQueue(maxsize=1, policy=OverflowPolicy.BLOCK)
+        queue.put_nowait(frame("1"))
+        with pytest.raises(asyncio.QueueFull):
+            queue.put_nowait(frame("2"))
+        # put() waits for a consumer instead
+        putter = asyncio.create_task(queue.put(frame("2")))
+        await asyncio.sleep(0)
+        assert not putter.done()
+        queue.get_nowait()
+        await putter
+        assert queue.metrics.enqueued == 2
+
+    asyncio.run(run())
+
+
+def test_drop_oldest_policy():
+    async def run():
+        queue = FrameQueue(maxsize=2, policy="drop-oldest")
+        for entity_id in ("1", "2", "3"):
+            await queue.put(frame(entity_id))
+        assert queue.metrics.dropped == 1
+        assert queue.metrics.max_depth == 2
+        assert [b'"3"' in f for f in drain(queue)] == [False, True]
+
+    asyncio.run(run())
+
+
+def test_conflate_policy_replaces_queued_frame_for_same_instrument():
+    async def run():
+        queue = FrameQueue(maxsize=2, policy=OverflowPolicy.CONFLATE)
+        await queue.put(frame("1", "100"))
+        await queue.put(frame("2", "200"))
+        await queue.put(frame("1", "101"))  # full, replaces the queued frame for entity 1
+        await queue.put(frame("1", "101", message_type="reference_price"))  # different type, drops oldest
+        assert queue.metrics.conflated == 1
+        assert queue.metrics.dropped == 1
+        frames = drain(queue)
+        assert len(frames) == 2
+        assert b'"200"' in frames[0] and b"reference_price" in frames[1]
+        assert queue.metrics.dequeued == 2 and queue.metrics.max_lag_ns > 0
+
+    asyncio.run(run())
+
+
+class FakeWebSocket:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    async def recv(self, decode=None):
+        if not self.frames:
+            raise ConnectionError("closed")
+        return self.frames.pop(0)
+
+
+def test_pipeline_receive_and_workers():
+    processed = []
+    seen = []
+
+    async def process(message, endpoint):
+        processed.append((message, endpoint))
+        if message == b"bad":
+            raise ValueError("bad frame")
+
+    async def run():
+        pipeline = Pipeline(process, workers=3, maxsize=10, on_frame=lambda data, endpoint: seen.append(data))
+        with pytest.raises(ConnectionError):
+            await pipeline.receive(FakeWebSocket([b"a", b"bad", b"b"]), "ws://feed")
+        for _ in range(10):
+            await asyncio.sleep(0)
+        stats = pipeline.stats()["ws://feed"]
+        await pipeline.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert sorted(m for m, _ in processed) == [b"a", b"b", b"bad"]
+    assert seen == [b"a", b"bad", b"b"]
+    assert stats["enqueued"] == stats["dequeued"] == 3
+    assert stats["depth"] == 0
+
+
+def test_pipeline_passes_receive_time():
+    processed = []
+
+    async def process(message, endpoint, received_ns):
+        processed.append((message, received_ns))
+
+    async def run():
+        pipeline = Pipeline(process, workers=1, pass_received_ns=True)
+        before = time.monotonic_ns()
+        with pytest.raises(ConnectionError):
+            await pipeline.receive(FakeWebSocket([b"a"]), "ws://feed")
+        await pipeline.join()
+        await pipeline.close()
+        return before
+
+    before = asyncio.run(run())
+    assert processed[0][0] == b"a" and processed[0][1] >= before
+
+
+def test_join_accounts_for_dropped_frames():
+    async def process(message, endpoint):
+        await asyncio.sleep(0)
+
+    async def run():
+        pipeline = Pipeline(process, workers=1, maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+        queue = pipeline.queue_for("endpoint")
+        for entity_id in range(10):
+            queue.put_nowait(frame(str(entity_id)))
+        await asyncio.wait_for(pipeline.join(), 1)
+        await pipeline.close()
+        return queue.metrics
+
+    metrics = asyncio.run(run())
+    assert metrics.dropped == 8 and metrics.dequeued == 2
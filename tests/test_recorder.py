@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from recorder import CODECS, Recorder, SegmentReader, SegmentWriter, get_codec, list_segments  # noqa: E402
+
+
+def frame(entity_id: int, price: int) -> bytes:
+    return f'{{"top_of_book": {{"tradeable_entity_id": "{entity_id}", "buy_price": "{price}"}}}}'.encode()
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_recorder_round_trip(tmp_path, codec):
+    with Recorder(str(tmp_path), codec=codec, batch_records=10) as recorder:
+        for i in range(25):
+            recorder.record(frame(i % 3, i), "wss://feed", received_ns=1000 + i)
+        recorder.record('{"heartbeat": {}}', "wss://other", received_ns=2000)
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == 1
+    reader = SegmentReader(segments[0])
+    assert reader.complete and reader.codec.name == codec
+    records = list(reader)
+    assert len(records) == len(reader) == 26
+    assert records[0].frame == frame(0, 0)
+    assert records[0].entity_id == 0 and records[1].entity_id == 1
+    assert records[-1].endpoint == "wss://other" and records[-1].received_ns == 2000
+
+
+def test_reader_filters_by_entity_and_time(tmp_path):
+    with Recorder(str(tmp_path), codec="none", batch_records=5) as recorder:
+        for i in range(50):
+            recorder.record(frame(100 + i // 10, i), "wss://feed", received_ns=i)
+    reader = SegmentReader(list_segments(str(tmp_path))[0])
+    # entity 102 only appears in the blocks written for frames 20-29
+    assert reader.entities[102] == [4, 5]
+    assert [r.received_ns for r in reader.read(entity_id="102")] == list(range(20, 30))
+    assert [r.received_ns for r in reader.read(start_ns=45)] == list(range(45, 50))
+    assert [r.received_ns for r in reader.read(entity_id=100, end_ns=3)] == [0, 1, 2, 3]
+
+
+def test_recorder_rotates_segments_by_size(tmp_path):
+    with Recorder(str(tmp_path), codec="none", batch_records=10, max_segment_bytes=500) as recorder:
+        for i in range(100):
+            recorder.record(frame(1, i), "wss://feed", received_ns=i)
+    segments = list_segments(str(tmp_path))
+    assert len(segments) > 1
+    assert sum(len(SegmentReader(path)) for path in segments) == 100
+
+
+def test_segment_without_footer_is_readable(tmp_path):
+    path = str(tmp_path / "crashed.ptrc")
+    writer = SegmentWriter(path, get_codec("zlib"))
+    writer.write_block([(1, "wss://feed", frame(7, 1)), (2, "wss://feed", frame(8, 2))])
+    writer.write_block([(3, "wss://feed", frame(7, 3))])
+    writer._file.close()  # simulate a crash before the footer is written
+    reader = SegmentReader(path)
+    assert not reader.complete
+    assert [r.received_ns for r in reader.read(entity_id=7)] == [1, 3]
+
+
+def test_get_codec_unknown():
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+    assert get_codec().name in ("zstd", "lz4", "zlib")
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from refdata import SnapshotIndex, load_in_background, load_index, read_snapshot  # noqa: E402
+from registry import InstrumentRegistry, build_index  # noqa: E402
+
+ROWS = [
+    "51997,BTC-20241227-40000P,,tradeable,, 52006, 2, 4",
+    "3,ETH-USD-PERPETUAL,,tradeable,, 9, -1, 3",
+    "4,ETH-20241227,,display_only,, 10, 1, 0",
+]
+
+
+def write_csv(tmp_path, rows=ROWS) -> str:
+    path = tmp_path / "tradeable_entity.csv"
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_snapshot_round_trip_matches_parsed_index(tmp_path):
+    csv_path = write_csv(tmp_path)
+    ref_path = tmp_path / "ref_data.json"
+    ref_path.write_text(json.dumps([{"id": 3, "symbol": "ETH-USD-PERP"}, {"id": 99, "symbol": "NEW"}]))
+    cache = str(tmp_path / "ref.cache")
+    parsed = load_index(csv_path, str(ref_path), cache)
+    assert not isinstance(parsed, SnapshotIndex) and os.path.exists(cache)
+    snapshot = load_index(csv_path, str(ref_path), cache)
+    assert isinstance(snapshot, SnapshotIndex)
+    assert len(snapshot) == len(parsed) == 4 and "99" in snapshot
+    assert snapshot.lookup("3") == parsed.lookup("3")
+    assert snapshot.lookup("3").price_decimals == -1
+    # 99 is only in the ref data records, which carry no decimals
+    assert snapshot.lookup("3").decimals_known and not snapshot.lookup("99").decimals_known
+    assert snapshot.lookup("missing").symbol == "Unknown"
+    assert snapshot.by_symbol("BTC-20241227-40000P").entity_id == "51997"
+    assert snapshot.by_expiry(date(2024, 12, 27)) == parsed.by_expiry(date(2024, 12, 27))
+    assert sorted(i.entity_id for i in snapshot) == sorted(i.entity_id for i in parsed)
+
+
+def test_snapshot_validated_by_mtime_then_hash(tmp_path):
+    csv_path = write_csv(tmp_path)
+    cache = str(tmp_path / "ref.cache")
+    load_index(csv_path, cache_path=cache)
+    # touched but unchanged, the hash still matches
+    os.utime(csv_path, ns=(0, 0))
+    assert read_snapshot(cache, [csv_path]) is not None
+    write_csv(tmp_path, ROWS[:2])
+    assert read_snapshot(cache, [csv_path]) is None
+    assert read_snapshot(cache, [csv_path, "other.json"]) is None
+    rebuilt = load_index(csv_path, cache_path=cache)
+    assert len(rebuilt) == 2 and len(load_index(csv_path, cache_path=cache)) == 2
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    csv_path = write_csv(tmp_path)
+    cache = tmp_path / "ref.cache"
+    cache.write_bytes(b"PTRD garbage")
+    assert read_snapshot(str(cache), [csv_path]) is None
+    assert len(load_index(csv_path, cache_path=str(cache))) == 3
+
+
+def test_snapshot_of_bundled_reference_data(tmp_path):
+    cache = str(tmp_path / "ref.cache")
+    parsed = load_index("data/tradeable_entity.csv", cache_path=cache)
+    snapshot = load_index("data/tradeable_entity.csv", cache_path=cache)
+    assert isinstance(snapshot, SnapshotIndex)
+    assert snapshot.materialize().by_underlying("BTC") == parsed.by_underlying("BTC")
+
+
+def test_load_in_background_swaps_registry(tmp_path):
+    registry = InstrumentRegistry()
+    thread = load_in_background(registry, write_csv(tmp_path))
+    thread.join(5)
+    assert registry.lookup("51997").symbol == "BTC-20241227-40000P"
+    assert len(registry) == len(build_index(write_csv(tmp_path)))
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from refresh import PendingTicks, RefDataRefresher, fetch_records  # noqa: E402
+from registry import InstrumentIndex, InstrumentRegistry  # noqa: E402
+from ticks import TopOfBookTick  # noqa: E402
+
+ROWS = [
+    "1,BTC-USD,,tradeable,, 5, 2, 4",
+    "2,ETH-USD,,tradeable,, 6, 1, 3",
+]
+
+
+def write_csv(path, rows) -> str:
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def tob(entity_id: str) -> TopOfBookTick:
+    return TopOfBookTick("1", entity_id, "0", 12345, 100000, 12346, 200000, product="Unknown")
+
+
+@pytest.fixture
+def stub_server():
+    """Local stand-in for the REST reference data endpoint, serves whatever is in `records`."""
+    records = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(records).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/market_data/tradeable_entity/all/summary", records
+    server.shutdown()
+    server.server_close()
+
+
+def test_refresh_swaps_in_changed_files(tmp_path):
+    csv_path = write_csv(tmp_path / "tradeable_entity.csv", ROWS[:1])
+    registry = InstrumentRegistry()
+    refresher = RefDataRefresher(registry, csv_path)
+    swapped = []
+    refresher.on_swap.append(swapped.append)
+
+    async def run():
+        assert await refresher.refresh(forced=True)
+        assert "2" not in registry.index
+        assert not await refresher.refresh()
+        write_csv(tmp_path / "tradeable_entity.csv", ROWS)
+        os.utime(csv_path, ns=(0, 1))
+        assert await refresher.refresh()
+
+    asyncio.run(run())
+    assert registry.lookup("2").symbol == "ETH-USD" and registry.lookup("2").price_decimals == 1
+    assert refresher.refreshes == 2 and len(swapped) == 2
+
+
+def test_refresh_merges_records_from_url(tmp_path, stub_server):
+    url, records = stub_server
+    records.append({"id": 3, "symbol": "SOL-USD", "market_id": 7, "price_decimals": 3, "quantity_decimals": 2})
+    registry = InstrumentRegistry()
+    refresher = RefDataRefresher(registry, write_csv(tmp_path / "tradeable_entity.csv", ROWS), url=url)
+    assert asyncio.run(refresher.refresh())
+    instrument = registry.lookup("3")
+    assert (instrument.symbol, instrument.market_id, instrument.price_decimals) == ("SOL-USD", "7", 3)
+    assert registry.lookup("1").symbol == "BTC-USD"
+
+
+def test_fetch_records_rejects_other_schemes():
+    with pytest.raises(ValueError):
+        fetch_records("file:///etc/passwd")
+
+
+def test_request_refresh_wakes_run_loop_once_per_interval(tmp_path):
+    csv_path = write_csv(tmp_path / "tradeable_entity.csv", ROWS)
+    registry = InstrumentRegistry()
+    refresher = RefDataRefresher(registry, csv_path, interval=60, min_interval=60)
+
+    async def run():
+        task = asyncio.create_task(refresher.run())
+        await asyncio.sleep(0)
+        refresher.request_refresh("2")
+        refresher.request_refresh("2")
+        for _ in range(100):
+            if refresher.refreshes:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    assert refresher.refreshes == 1 and registry.lookup("2").symbol == "ETH-USD"
+
+
+def test_request_refresh_inside_min_interval_is_deferred(tmp_path):
+    csv_path = write_csv(tmp_path / "tradeable_entity.csv", ROWS)
+    registry = InstrumentRegistry()
+    refresher = RefDataRefresher(registry, csv_path, interval=60, min_interval=0.1)
+
+    async def run():
+        task = asyncio.create_task(refresher.run())
+        await asyncio.sleep(0)
+        refresher.request_refresh("1")
+        for _ in range(100):
+            if refresher.refreshes:
+                break
+            await asyncio.sleep(0.01)
+        write_csv(tmp_path / "tradeable_entity.csv", ROWS + ["3,SOL-USD,,tradeable,, 7, 3, 2"])
+        os.utime(csv_path, ns=(0, 1))
+        refresher.request_refresh("3")
+        assert refresher.requested == {"3"} and refresher.refreshes == 1
+        for _ in range(100):
+            if refresher.refreshes == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    assert refresher.refreshes == 2 and not refresher.requested and registry.lookup("3").symbol == "SOL-USD"
+
+
+def test_requested_refresh_skips_unchanged_sources(tmp_path):
+    csv_path = write_csv(tmp_path / "tradeable_entity.csv", ROWS)
+    registry = InstrumentRegistry()
+    refresher = RefDataRefresher(registry, csv_path)
+    swapped = []
+    refresher.on_swap.append(swapped.append)
+
+    async def run():
+        # the first request replaces the index loaded at startup, repeats for a delisted id change nothing
+        assert await refresher.refresh(forced=True)
+        for _ in range(10):
+            assert not await refresher.refresh(forced=True)
+        registry.swap(InstrumentIndex())
+        assert await refresher.refresh(forced=True)
+
+    asyncio.run(run())
+    assert refresher.refreshes == len(swapped) == 2
+
+
+def test_pending_ticks_release_in_order_with_resolved_scaling(tmp_path):
+    registry = InstrumentRegistry()
+    requested = []
+    pending = PendingTicks(registry, on_unknown=requested.append, max_per_id=2)
+    for tick in (tob("2"), tob("2"), tob("2"), tob("1")):
+        pending.hold(tick)
+    assert requested == ["2", "1"] and len(pending) == 3 and pending.dropped == 1
+    delivered = []
+    assert pending.release(delivered.append) == 0
+
+    registry.swap(RefDataRefresher(registry, write_csv(tmp_path / "t.csv", ROWS[1:]))._build())
+    assert pending.release(delivered.append) == 2
+    assert pending.entity_ids == ["1"]
+    assert all(t.product == "ETH-USD" for t in delivered)
+    assert delivered[0].buy_price_conv == 1234.5 and delivered[0].buy_quantity_conv == 100.0
+
+
+def test_pending_ticks_wait_for_decimals():
+    registry = InstrumentRegistry()
+    pending = PendingTicks(registry)
+    pending.hold(tob("7"))
+    delivered = []
+    registry.swap(InstrumentIndex.from_records([{"id": 7, "symbol": "SOL-USD"}]))
+    assert pending.release(delivered.append) == 0 and pending.entity_ids == ["7"]
+    registry.swap(InstrumentIndex.from_records([{"id": 7, "symbol": "SOL-USD", "price_decimals": 2, "quantity_decimals": 4}]))
+    assert pending.release(delivered.append) == 1
+    assert delivered[0].buy_price_conv == 123.45 and delivered[0].buy_quantity_conv == 10.0
+
+
+def test_pending_ticks_bounds_number_of_ids():
+    pending = PendingTicks(InstrumentRegistry(), max_ids=2)
+    for entity_id in ("1", "2", "3"):
+        pending.hold(tob(entity_id))
+    assert pending.entity_ids == ["2", "3"] and pending.dropped == 1
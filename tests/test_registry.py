@@ -0,0 +1,125 @@
+import sys
+import threading
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from registry import (  # noqa: E402
+    UNKNOWN_INSTRUMENT,
+    InstrumentIndex,
+    InstrumentRegistry,
+    build_index,
+    parse_symbol,
+)
+
+CSV_ROWS = (
+    "7,BTC-USD,,tradeable,, 3, 2, 8\n"
+    "51997,BTC-20241227-40000P,,tradeable,, 52006, 2, 4\n"
+)
+
+
+def test_index_from_csv(tmp_path):
+    csv_file = tmp_path / "entities.csv"
+    csv_file.write_text(CSV_ROWS)
+    index = InstrumentIndex.from_csv(str(csv_file))
+    assert len(index) == 2
+    btc = index.get("7")
+    assert btc.symbol == "BTC-USD"
+    assert btc.market_id == "3"
+    assert (btc.price_factor, btc.quantity_factor) == (100, 10 ** 8)
+    assert index.by_symbol("BTC-20241227-40000P").entity_id == "51997"
+    assert index.by_market_id("52006").symbol == "BTC-20241227-40000P"
+
+
+def test_index_lookup_unknown():
+    index = InstrumentIndex()
+    assert not index
+    assert index.get("1") is None
+    assert index.lookup("1") is UNKNOWN_INSTRUMENT
+    assert (UNKNOWN_INSTRUMENT.price_factor, UNKNOWN_INSTRUMENT.quantity_factor) == (1, 1)
+
+
+def test_build_index_merges_ref_data(tmp_path):
+    csv_file = tmp_path / "entities.csv"
+    csv_file.write_text(CSV_ROWS)
+    index = build_index(str(csv_file), [{"id": 7, "symbol": "BTC-USD-PERP"}, {"id": 8, "symbol": "ETH-USD"}])
+    assert index.get("7").symbol == "BTC-USD-PERP"
+    assert index.get("7").price_decimals == 2
+    assert index.by_symbol("BTC-USD") is None
+    assert index.get("8").price_factor == 1
+
+
+def test_registry_swap_is_atomic(tmp_path):
+    csv_file = tmp_path / "entities.csv"
+    csv_file.write_text(CSV_ROWS)
+    registry = InstrumentRegistry()
+    old = registry.index
+    snapshot = registry.index
+    registry.reload(str(csv_file))
+    # readers holding the previous snapshot are unaffected by the swap
+    assert snapshot is old and len(snapshot) == 0
+    assert registry.lookup("7").symbol == "BTC-USD"
+
+    errors = []
+
+    def reader():
+        for _ in range(1000):
+            index = registry.index
+            if len(index) not in (0, 2):
+                errors.append(len(index))
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for _ in range(50):
+        registry.swap(InstrumentIndex())
+        registry.swap(InstrumentIndex.from_csv(str(csv_file)))
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_registry_calls_swap_callbacks(tmp_path):
+    csv_file = tmp_path / "entities.csv"
+    csv_file.write_text(CSV_ROWS)
+    registry = InstrumentRegistry()
+    swapped = []
+
+    def failing(index):
+        raise RuntimeError("boom")
+
+    registry.on_swap.extend([failing, swapped.append])
+    index = registry.reload(str(csv_file))
+    assert swapped == [index] and registry.index is index
+
+
+def test_index_from_bundled_csv():
+    index = InstrumentIndex.from_csv(str(ROOT / "data" / "tradeable_entity.csv"))
+    assert len(index) > 28000
+    assert index.get("1").symbol == "PTF-USD"
+
+
+def test_parse_symbol():
+    option = parse_symbol("SUI-20241129-1.3000P")
+    assert (option.kind, option.underlying, option.expiry, option.strike, option.option_type) == (
+        "option", "SUI", date(2024, 11, 29), 1.3, "P"
+    )
+    assert parse_symbol("BTC-20241227").kind == "future"
+    assert parse_symbol("BTC-20241227").expiry == date(2024, 12, 27)
+    assert parse_symbol("BTC-USD-PERPETUAL").kind == "perpetual"
+    assert parse_symbol("BTC-USD-INDEX").kind == "index"
+    assert (parse_symbol("BTC-USD").kind, parse_symbol("BTC-USD").underlying) == ("spot", "BTC")
+    assert parse_symbol("BTC-20241399-1C").kind == "unknown"
+
+
+def test_index_by_underlying_and_expiry(tmp_path):
+    csv_file = tmp_path / "entities.csv"
+    csv_file.write_text(CSV_ROWS + "60000,ETH-20241227-3000C,,tradeable,, 60010, 2, 4\n")
+    index = InstrumentIndex.from_csv(str(csv_file))
+    assert [i.symbol for i in index.by_underlying("BTC")] == ["BTC-USD", "BTC-20241227-40000P"]
+    assert {i.symbol for i in index.by_expiry(date(2024, 12, 27))} == {"BTC-20241227-40000P", "ETH-20241227-3000C"}
+    assert index.expiries("ETH") == [date(2024, 12, 27)]
+    assert index.by_underlying("SOL") == ()
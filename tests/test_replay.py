@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import client  # noqa: E402
+from metrics import StageLatency  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+from recorder import FrameRecord, Recorder  # noqa: E402
+from registry import Instrument, InstrumentIndex  # noqa: E402
+from replay import iter_records, replay, run_replay  # noqa: E402
+
+
+def records(count: int, spacing_ns: int = 0):
+    for i in range(count):
+        frame = (f'{{"top_of_book": {{"timestamp": "{i}", "tradeable_entity_id": "7", "market_id": "3", '
+                 f'"buy_price": "{100 + i}", "buy_quantity": "1", "sell_price": "{101 + i}", "sell_quantity": "1"}}}}')
+        yield FrameRecord(i * spacing_ns, "wss://feed", 7, frame.encode())
+
+
+def test_replay_max_speed_preserves_order():
+    seen = []
+
+    async def process(message, endpoint):
+        seen.append(message)
+
+    report = asyncio.run(replay(records(100), process))
+    assert report.messages == 100
+    assert seen == [r.frame for r in records(100)]
+    assert report.latency["end_to_end"].count == 100
+    assert report.messages_per_second > 0
+    assert "replayed 100 messages" in report.format()
+
+
+def test_replay_speed_keeps_recorded_pacing():
+    async def process(message, endpoint):
+        pass
+
+    # 5 frames 20ms apart take >= 80ms in real time and ~8ms at 10x
+    real_time = asyncio.run(replay(records(5, spacing_ns=20_000_000), process, speed=1.0))
+    fast = asyncio.run(replay(records(5, spacing_ns=20_000_000), process, speed=10.0))
+    assert real_time.elapsed_ns >= 80_000_000
+    assert 8_000_000 <= fast.elapsed_ns < real_time.elapsed_ns
+
+
+def test_replay_through_pipeline():
+    seen = []
+
+    async def process(message, endpoint):
+        seen.append(message)
+
+    async def run():
+        pipeline = Pipeline(process, workers=2, maxsize=10)
+        try:
+            return await replay(records(50), process, pipeline=pipeline)
+        finally:
+            await pipeline.close()
+
+    report = asyncio.run(run())
+    assert len(seen) == 50
+    assert report.pipeline_stats["wss://feed"]["dequeued"] == 50
+
+
+def test_run_replay_from_recorded_segments(tmp_path, monkeypatch):
+    with Recorder(str(tmp_path), batch_records=10) as recorder:
+        for record in records(30):
+            recorder.record(record.frame, record.endpoint, received_ns=record.received_ns)
+    assert len(list(iter_records([str(tmp_path)]))) == 30
+
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD", "3", "tradeable", 2, 8)]))
+    monkeypatch.setattr(client, "stage_latency", None)
+    try:
+        report = asyncio.run(run_replay([str(tmp_path)], speed=0, workers=0, verbose=False))
+    finally:
+        client.frame_logger.setLevel(logging.NOTSET)
+        client.tick_logger.setLevel(logging.NOTSET)
+    assert report.messages == 30
+    assert isinstance(report.latency, StageLatency)
+    assert {stage: h.count for stage, h in report.latency.histograms.items()} == {
+        "parse": 30, "normalize": 30, "deliver": 30, "process": 30, "end_to_end": 30
+    }
+    assert client.market_state.get("7").top_of_book.buy_price == 129
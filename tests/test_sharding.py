@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sharding import ShardedIngest, ShardFilter, ShardSpec, plan_shards, shard_of  # noqa: E402
+from simulator import ExchangeSimulator, SimulatorConfig  # noqa: E402
+from subscriptions import Subscription  # noqa: E402
+
+
+def test_plan_shards_by_endpoint():
+    specs = plan_shards(["a", "b", "c"], 2)
+    assert specs == [ShardSpec(0, ("a", "c")), ShardSpec(1, ("b",))]
+    assert len(plan_shards(["a"], 4)) == 1
+
+
+def test_sharded_ingest_warns_when_processes_are_unused(caplog):
+    with caplog.at_level(logging.WARNING):
+        ingest = ShardedIngest(["wss://feed?type[]=top_of_book&type[]=reference_price"], 3)
+    assert len(ingest.specs) == 1
+    assert "uses only 1 of 3 ingest processes" in caplog.text
+
+
+def test_plan_shards_by_entity():
+    specs = plan_shards(["a", "b"], 3, "entity")
+    assert [s.endpoints for s in specs] == [("a", "b")] * 3
+    assert {s.shards for s in specs} == {3}
+    with pytest.raises(ValueError):
+        plan_shards(["a"], 2, "random")
+    with pytest.raises(ValueError):
+        plan_shards([], 2)
+
+
+def test_shard_filter_partitions_entity_ids():
+    filters = [ShardFilter(i, 3) for i in range(3)]
+    for entity_id in map(str, range(100)):
+        frame = f'{{"top_of_book": {{"tradeable_entity_id": "{entity_id}"}}}}'.encode()
+        assert [f(frame) for f in filters].count(True) == 1
+        assert filters[shard_of(entity_id, 3)](frame)
+    assert [f(b'{"heartbeat": {}}') for f in filters] == [True, False, False]
+
+
+def test_sharded_ingest_merges_ticks_from_processes():
+    async def run():
+        config = SimulatorConfig(entity_ids=[str(i) for i in range(50)], rate=2000, total_messages=200, seed=1)
+        async with ExchangeSimulator(config) as simulator:
+            ingest = ShardedIngest([simulator.endpoint()], 2, mode="entity").start()
+            ticks = []
+            try:
+                deadline = time.monotonic() + 30
+                while len(ticks) < 200 and time.monotonic() < deadline:
+                    ticks.extend(tick for tick, _ in ingest.drain())
+                    await asyncio.sleep(0.01)
+                return ticks, ingest.stats()
+            finally:
+                ingest.close()
+
+    ticks, stats = asyncio.run(run())
+    # both connections see the same seeded stream, each shard kept only its own entity ids; the simulator
+    # closes cleanly after 200 frames and the shards reconnect, so more may have arrived since
+    assert len(ticks) >= 200
+    assert set(stats) == {"shard-0", "shard-1"}
+    assert all(s["dropped"] == 0 for s in stats.values())
+
+
+def test_sharded_ingest_applies_the_subscription_in_shards():
+    async def run():
+        # ids listed in the bundled csv, unknown ids would be kept for the reference data refresh
+        config = SimulatorConfig(entity_ids=["1", "2", "4", "6", "7", "8", "10", "16"], rate=2000, total_messages=200, seed=1)
+        async with ExchangeSimulator(config) as simulator:
+            subscription = Subscription(entity_ids=frozenset({"1", "2"}))
+            ingest = ShardedIngest([simulator.endpoint()], 1, subscription=subscription).start()
+            ticks = []
+            try:
+                deadline = time.monotonic() + 30
+                while len(ticks) < 10 and time.monotonic() < deadline:
+                    ticks.extend(tick for tick, _ in ingest.drain())
+                    await asyncio.sleep(0.01)
+                return ticks
+            finally:
+                ingest.close()
+
+    ticks = asyncio.run(run())
+    assert len(ticks) >= 10 and {tick.tradeable_entity_id for tick in ticks} <= {"1", "2"}
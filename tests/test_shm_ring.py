@@ -0,0 +1,164 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from shm_ring import RECORD_SIZE, BroadcastReader, BroadcastWriter, SpscRing  # noqa: E402
+from ticks import LastTradePriceTick, ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+
+def top_of_book(i: int) -> TopOfBookTick:
+    return TopOfBookTick("1728314722542871", str(100 + i), "7", 1000 + i, 5, 1010 + i, 6, "BTC-USD-PERPETUAL", 2, 4)
+
+
+def test_record_size_is_two_cache_lines():
+    assert RECORD_SIZE == 128
+
+
+def test_push_pop_round_trip_all_tick_types():
+    ring = SpscRing.create(capacity=8)
+    try:
+        ticks = [
+            top_of_book(1),
+            ReferencePriceTick("1728314722542871", "51997", "0", 123456, "index", "ETH-20241003-2800C", 1),
+            LastTradePriceTick("1728314722542871", "51997", "0", -5, "trade", "ETH-20241003-2800C", 1),
+        ]
+        for received_ns, tick in enumerate(ticks):
+            assert ring.push(tick, received_ns)
+        assert len(ring) == 3
+        records = ring.pop()
+        assert [r[1] for r in records] == [0, 1, 2]
+        assert [repr(t) for t, _ in records] == [repr(t) for t in ticks]
+        assert records[0][0].sell_quantity == 6 and type(records[2][0]) is LastTradePriceTick
+        assert ring.pop() == [] and len(ring) == 0
+    finally:
+        ring.close()
+
+
+def test_ring_keeps_tick_receive_time():
+    ring = SpscRing.create(capacity=4)
+    try:
+        tick = top_of_book(1)
+        tick.received_ns = 123456789
+        assert ring.push(tick)
+        (popped, received_ns), = ring.pop()
+        assert received_ns == popped.received_ns == 123456789
+        assert popped.exchange_us == tick.exchange_us
+    finally:
+        ring.close()
+
+
+def test_full_ring_drops_and_wraps():
+    ring = SpscRing.create(capacity=4)
+    try:
+        assert all(ring.push(top_of_book(i), i) for i in range(4))
+        assert not ring.push(top_of_book(4), 4)
+        assert ring.dropped == 1
+        assert [ns for _, ns in ring.pop(2)] == [0, 1]
+        assert ring.push(top_of_book(5), 5) and ring.push(top_of_book(6), 6)
+        assert [t.tradeable_entity_id for t, _ in ring.pop()] == ["102", "103", "105", "106"]
+    finally:
+        ring.close()
+    with pytest.raises(ValueError):
+        SpscRing.create(capacity=0)
+
+
+def produce(name: str, count: int) -> None:
+    ring = SpscRing.attach(name)
+    sent = 0
+    while sent < count:
+        if ring.push(top_of_book(sent), sent):
+            sent += 1
+    ring.close()
+
+
+def test_ring_across_processes():
+    ring = SpscRing.create(capacity=64)
+    try:
+        producer = multiprocessing.get_context("spawn").Process(target=produce, args=(ring.name, 1000))
+        producer.start()
+        received = []
+        while len(received) < 1000:
+            received.extend(ns for _, ns in ring.pop())
+            if not producer.is_alive() and not len(ring) and len(received) < 1000:
+                break
+        producer.join(10)
+        assert received == list(range(1000))
+    finally:
+        ring.close()
+
+
+def test_broadcast_readers_each_see_every_tick():
+    writer = BroadcastWriter("test_broadcast_fanout", capacity=16)
+    try:
+        first, second = BroadcastReader(writer.name), BroadcastReader(writer.name)
+        for i in range(10):
+            writer.publish(top_of_book(i), i)
+        assert len(first) == 10
+        assert [ns for _, ns in first.poll()] == list(range(10))
+        assert [r[4] for r in second.poll_raw(4)] == [100, 101, 102, 103]  # entity id field
+        assert [t.tradeable_entity_id for t, _ in second.poll()][:2] == ["104", "105"]
+        assert first.poll() == [] and first.lost == 0
+        # a late reader starts at the newest record unless asked for the oldest still available
+        assert BroadcastReader(writer.name).poll() == []
+        assert len(BroadcastReader(writer.name, from_oldest=True).poll()) == 10
+        for reader in (first, second):
+            reader.close()
+    finally:
+        writer.close()
+
+
+def test_broadcast_reader_skips_overwritten_records():
+    writer = BroadcastWriter("test_broadcast_overrun", capacity=4)
+    try:
+        reader = BroadcastReader(writer.name)
+        for i in range(10):
+            writer.publish(top_of_book(i), i)
+        assert [ns for _, ns in reader.poll()] == [7, 8, 9]
+        assert reader.lost == 7
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_broadcast_reader_rejects_other_segments():
+    ring = SpscRing.create(capacity=4)
+    try:
+        with pytest.raises(ValueError):
+            BroadcastReader(ring.name)
+    finally:
+        ring.close()
+
+
+def read_broadcast(name: str, count: int, results: "multiprocessing.Queue") -> None:
+    reader = BroadcastReader(name, from_oldest=True)
+    received = []
+    for _, received_ns in reader.follow():
+        received.append(received_ns)
+        if len(received) == count:
+            break
+    results.put((received, reader.lost))
+    reader.close()
+
+
+def test_broadcast_across_processes():
+    writer = BroadcastWriter("test_broadcast_processes", capacity=4096)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    try:
+        readers = [context.Process(target=read_broadcast, args=(writer.name, 1000, results)) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        for i in range(1000):
+            writer.publish(top_of_book(i), i)
+        outcomes = [results.get(timeout=30) for _ in readers]
+        for reader in readers:
+            reader.join(10)
+        assert outcomes == [(list(range(1000)), 0)] * 2
+    finally:
+        writer.close()
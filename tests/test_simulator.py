@@ -0,0 +1,111 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosedError
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import client  # noqa: E402
+from decoder import peek_entity_id  # noqa: E402
+from pipeline import OverflowPolicy, Pipeline  # noqa: E402
+from registry import Instrument, InstrumentIndex  # noqa: E402
+from simulator import ExchangeSimulator, SimulatorConfig, SyntheticFeed  # noqa: E402
+from transport import TransportProfile  # noqa: E402
+
+
+def test_synthetic_feed_frames_decode():
+    feed = SyntheticFeed(["101", "102"], seed=1)
+    top = json.loads(feed.frame("top_of_book"))["top_of_book"]
+    assert top["tradeable_entity_id"] in ("101", "102")
+    assert int(top["sell_price"]) == int(top["buy_price"]) + 1
+    last = json.loads(feed.frame("last_trade_price"))["last_trade_price"]
+    assert last["timestamp"].isdigit() and "price" in last
+    with pytest.raises(ValueError):
+        SyntheticFeed([])
+
+
+def test_simulator_streams_requested_types_then_closes():
+    async def run():
+        config = SimulatorConfig(entity_ids=["7"], rate=0, total_messages=20)
+        async with ExchangeSimulator(config) as simulator:
+            async with connect(simulator.endpoint("reference_price")) as websocket:
+                return [json.loads(message) async for message in websocket]
+
+    frames = asyncio.run(run())
+    assert len(frames) == 20
+    assert all(list(f) == ["reference_price"] for f in frames)
+
+
+def test_simulator_forced_disconnect():
+    async def run():
+        config = SimulatorConfig(rate=0, disconnect_after=5)
+        async with ExchangeSimulator(config) as simulator:
+            async with connect(simulator.endpoint()) as websocket:
+                received = []
+                with pytest.raises(ConnectionClosedError) as closed:
+                    while True:
+                        received.append(await websocket.recv())
+                return received, closed.value.rcvd.code
+
+    received, code = asyncio.run(run())
+    assert len(received) == 5 and code == 1011
+
+
+def test_listen_to_endpoint_against_simulator(monkeypatch):
+    # without a read-ahead limit, a connection cancelled while reading is paused waits close_timeout for the close frame
+    monkeypatch.setattr(client, "transport_profile", TransportProfile(max_queue=None))
+    client.registry.swap(InstrumentIndex([Instrument("7", "BTC-USD-PERPETUAL", "0", "active", 2, 4)]))
+    ticks = []
+    client.tick_consumers.append(ticks.append)
+
+    async def run():
+        config = SimulatorConfig(entity_ids=["7"], rate=5000, burst_size=50, burst_interval=0.005, total_messages=300)
+        async with ExchangeSimulator(config) as simulator:
+            # the simulator closes cleanly after 300 frames and the client reconnects, stop once they arrived
+            task = asyncio.create_task(client.listen_to_endpoint(simulator.endpoint()))
+            deadline = time.monotonic() + 5
+            while len(ticks) < 300 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    try:
+        asyncio.run(run())
+    finally:
+        client.tick_consumers.remove(ticks.append)
+    assert len(ticks) >= 300
+    assert {type(t).__name__ for t in ticks} == {"TopOfBookTick", "ReferencePriceTick", "LastTradePriceTick"}
+    assert client.market_state.get("7").bid is not None
+
+
+def test_pipeline_mode_filters_frames_before_queueing(monkeypatch):
+    monkeypatch.setattr(client, "transport_profile", TransportProfile(max_queue=None))
+    monkeypatch.setattr(client, "frame_filter", lambda frame: peek_entity_id(frame) == "7")
+    queued = []
+
+    async def process(frame, endpoint):
+        queued.append(peek_entity_id(frame))
+
+    async def run():
+        config = SimulatorConfig(entity_ids=["7", "8"], rate=5000, burst_size=50, burst_interval=0.005, total_messages=300)
+        async with ExchangeSimulator(config) as simulator:
+            pipeline = Pipeline(process, maxsize=10, policy=OverflowPolicy.DROP_OLDEST)
+            task = asyncio.create_task(client.listen_to_endpoint(simulator.endpoint(), pipeline=pipeline))
+            deadline = time.monotonic() + 5
+            while len(queued) < 100 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await pipeline.close()
+            return pipeline.queues[simulator.endpoint()].metrics
+
+    metrics = asyncio.run(run())
+    assert len(queued) >= 100 and set(queued) == {"7"}
+    assert metrics.enqueued == metrics.dequeued + metrics.dropped
@@ -0,0 +1,89 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from registry import Instrument  # noqa: E402
+from sink import TickSink, instrument_table, tick_table  # noqa: E402
+from ticks import LastTradePriceTick, TopOfBookTick  # noqa: E402
+
+DAY_NS = 1728314722542871000  # 2024-10-07
+
+
+def top_of_book(entity_id: str, product: str, bid: int) -> TopOfBookTick:
+    return TopOfBookTick("1728314722542871", entity_id, "0", bid, 150, bid + 10, 200, product, 2, 1)
+
+
+def test_tick_table_converts_values():
+    table = tick_table("top_of_book", [(top_of_book("7", "BTC-USD-PERPETUAL", 12345), 42, DAY_NS)])
+    row = table.to_pylist()[0]
+    assert row["date"] == "2024-10-07" and row["underlying"] == "BTC"
+    assert (row["received_ns"], row["received_wall_ns"]) == (42, DAY_NS)
+    assert row["entity_id"] == 7 and row["timestamp"] == 1728314722542871
+    assert (row["buy_price"], row["buy_quantity"], row["sell_price"]) == (123.45, 15.0, 123.55)
+    prices = tick_table("last_trade_price", [(LastTradePriceTick("1", "x", "0", 5, "trade", "ETH-USD", 1), 42, DAY_NS)])
+    assert prices.to_pylist()[0]["price"] == 0.5 and prices.column("entity_id").to_pylist() == [None]
+
+
+def test_instrument_table():
+    table = instrument_table([Instrument("3", "ETH-20241003-2800C", "9", "tradeable", 2, 4)])
+    row = table.to_pylist()[0]
+    assert (row["kind"], row["underlying"], row["strike"], row["option_type"]) == ("option", "ETH", 2800.0, "C")
+    assert row["expiry"].isoformat() == "2024-10-03"
+
+
+def test_sink_writes_partitioned_parquet(tmp_path):
+    instruments = [Instrument("7", "BTC-USD-PERPETUAL"), Instrument("8", "ETH-USD-PERPETUAL")]
+    with TickSink(parquet_dir=str(tmp_path), instruments=instruments, batch_rows=3) as sink:
+        for i in range(10):
+            sink.update(top_of_book("7" if i % 2 else "8", "BTC-USD-PERPETUAL" if i % 2 else "ETH-USD-PERPETUAL", i))
+        tick = LastTradePriceTick("1", "7", "0", 5, "trade", "BTC-USD-PERPETUAL", 1, received_ns=42)
+        sink.update(tick)
+    assert sink.rows == 11
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    assert (tmp_path / "top_of_book" / f"date={today}" / "underlying=BTC").is_dir()
+    table = pq.read_table(tmp_path / "top_of_book")
+    assert table.num_rows == 10
+    assert sorted(table.column("entity_id").to_pylist()) == [7] * 5 + [8] * 5
+    assert pq.read_table(tmp_path / "last_trade_price").column("received_ns").to_pylist() == [42]
+    assert pq.read_table(tmp_path / "instrument.parquet").num_rows == 2
+
+
+def test_sink_appends_to_duckdb(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    path = str(tmp_path / "product.db")
+    for _ in range(2):
+        with TickSink(duckdb_path=path, instruments=[Instrument("7", "BTC-USD-PERPETUAL")], batch_rows=100) as sink:
+            for i in range(5):
+                sink.update(top_of_book("7", "BTC-USD-PERPETUAL", i))
+    connection = duckdb.connect(path, read_only=True)
+    assert connection.execute("SELECT count(*), max(buy_price) FROM top_of_book").fetchone() == (10, 0.04)
+    assert connection.execute(
+        "SELECT i.kind FROM top_of_book t JOIN instrument i USING (entity_id) LIMIT 1").fetchone() == ("perpetual",)
+    connection.close()
+
+
+def test_sink_rewrites_instruments_on_update(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    path = str(tmp_path / "db" / "ticks.duckdb")
+    # e.g. reference data loading in the background, empty when the sink starts
+    with TickSink(parquet_dir=str(tmp_path), duckdb_path=path, flush_interval=0.05) as sink:
+        sink.update_instruments([Instrument("7", "BTC-USD-PERPETUAL"), Instrument("8", "ETH-USD-PERPETUAL")])
+        sink.update(top_of_book("7", "BTC-USD-PERPETUAL", 1))
+    assert pq.read_table(tmp_path / "instrument.parquet").num_rows == 2
+    connection = duckdb.connect(path, read_only=True)
+    assert connection.execute("SELECT count(*) FROM instrument").fetchone() == (2,)
+    connection.close()
+
+
+def test_sink_needs_a_destination():
+    with pytest.raises(ValueError):
+        TickSink()
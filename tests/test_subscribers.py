@@ -0,0 +1,135 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from subscribers import SubscriberRegistry  # noqa: E402
+from ticks import LastTradePriceTick, ReferencePriceTick, TopOfBookTick  # noqa: E402
+
+
+def tob(entity_id, price=100):
+    return TopOfBookTick("1", entity_id, "0", price, 1, price + 1, 1)
+
+
+def ref(entity_id, price=100):
+    return ReferencePriceTick("1", entity_id, "0", price, "mark")
+
+
+async def settle(registry, rounds=50):
+    for _ in range(rounds):
+        await asyncio.sleep(0.01)
+        if not any(s.pending for s in registry.subscribers):
+            break
+    await asyncio.sleep(0.01)
+
+
+def test_routes_by_message_type_and_entity_id():
+    registry = SubscriberRegistry()
+    quotes, btc, everything = [], [], []
+    registry.subscribe(quotes.append, "top_of_book")
+    registry.subscribe(btc.append, [TopOfBookTick, "reference_price"], entity_ids={"1"})
+    registry.subscribe(everything.append)
+
+    async def run():
+        await registry.start()
+        for tick in (tob("1"), tob("2"), ref("1"), ref("2"), LastTradePriceTick("1", "1", "0", 1, "t")):
+            registry.publish(tick)
+        await settle(registry)
+        await registry.close()
+
+    asyncio.run(run())
+    assert [t.tradeable_entity_id for t in quotes] == ["1", "2"]
+    assert [type(t) for t in btc] == [TopOfBookTick, ReferencePriceTick]
+    assert len(everything) == 5
+    with pytest.raises(ValueError):
+        registry.subscribe(print, "order_book")
+
+
+def test_batched_and_conflated_delivery():
+    registry = SubscriberRegistry()
+    batches, conflated = [], []
+
+    @registry.on("top_of_book", batch=True, max_batch=3, name="batch")
+    async def on_batch(ticks):
+        batches.append([t.tradeable_entity_id for t in ticks])
+
+    registry.subscribe(conflated.append, "top_of_book", batch=True, conflate=True, interval=0.05)
+
+    async def run():
+        # ticks published before start are delivered once it runs
+        for entity_id in ("1", "2", "1", "3", "1"):
+            registry.publish(tob(entity_id, int(entity_id) * 10))
+        await registry.start()
+        await settle(registry)
+        await registry.close()
+
+    asyncio.run(run())
+    assert batches == [["1", "2", "1"], ["3", "1"]]
+    assert len(conflated) == 1 and sorted(t.tradeable_entity_id for t in conflated[0]) == ["1", "2", "3"]
+    assert registry.stats()["batch"]["delivered"] == 5
+
+
+def test_slow_handler_is_isolated_and_timed():
+    registry = SubscriberRegistry(threads=2)
+    fast, threads = [], set()
+
+    def slow(tick):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+
+    slow_subscriber = registry.subscribe(slow, "reference_price", threaded=True, maxsize=2)
+    registry.subscribe(fast.append, "reference_price", name="fast")
+
+    async def run():
+        await registry.start()
+        started = time.perf_counter()
+        for i in range(5):
+            registry.publish(ref(str(i)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        # the loop and the fast subscriber kept going while the slow handler ran on the pool
+        assert len(fast) == 5 and time.perf_counter() - started < 0.2
+        for _ in range(100):
+            if slow_subscriber.delivered + slow_subscriber.dropped == 5:
+                break
+            await asyncio.sleep(0.01)
+        await registry.close()
+
+    asyncio.run(run())
+    assert all(name.startswith("subscriber") for name in threads)
+    assert slow_subscriber.dropped >= 1 and slow_subscriber.delivered + slow_subscriber.dropped == 5
+    assert slow_subscriber.latency.min >= 50_000_000
+    assert registry.slowest(1) == [slow_subscriber]
+    assert "subscriber test_slow_handler_is_isolated_and_timed.<locals>.slow" in registry.format()
+
+
+def test_handler_errors_are_counted_and_unsubscribe_stops_delivery():
+    registry = SubscriberRegistry()
+    received = []
+
+    def failing(tick):
+        raise RuntimeError("boom")
+
+    bad = registry.subscribe(failing)
+    good = registry.subscribe(received.append)
+
+    async def run():
+        await registry.start()
+        registry.publish(tob("1"))
+        await settle(registry)
+        registry.unsubscribe(good)
+        registry.publish(tob("2"))
+        await settle(registry)
+        await registry.close()
+
+    asyncio.run(run())
+    assert bad.errors == 2 and len(received) == 1 and len(registry) == 1
+    with pytest.raises(ValueError):
+        registry.subscribe(settle, threaded=True)
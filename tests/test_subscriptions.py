@@ -0,0 +1,95 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from registry import Instrument, InstrumentIndex, InstrumentRegistry  # noqa: E402
+from subscriptions import (  # noqa: E402
+    EntityFilter,
+    Subscription,
+    feed_url,
+    filter_endpoints,
+    multiplex,
+    parse_subscription,
+    split_endpoint,
+)
+
+FEEDS = "wss://api.wss.prod.power.trade/v1/feeds"
+DEFAULTS = [f"{FEEDS}?type[]=top_of_book", f"{FEEDS}?type[]=reference_price", f"{FEEDS}?type[]=last_trade_price"]
+
+
+def test_split_endpoint_and_feed_url_round_trip():
+    endpoint = f"{FEEDS}?type[]=top_of_book&type[]=reference_price&depth=1"
+    base, types, params = split_endpoint(endpoint)
+    assert base == FEEDS
+    assert types == ["top_of_book", "reference_price"] and params == [("depth", "1")]
+    assert feed_url(base, types, params) == endpoint
+
+
+def test_multiplex_combines_types_per_host():
+    assert multiplex(DEFAULTS) == [f"{FEEDS}?type[]=top_of_book&type[]=reference_price&type[]=last_trade_price"]
+    other = "ws://127.0.0.1:8765/v1/feeds?type[]=top_of_book"
+    assert multiplex(DEFAULTS[:1] + [other] + DEFAULTS[:1]) == [DEFAULTS[0], other]
+
+
+def test_multiplex_splits_heavy_types_onto_their_own_connection():
+    assert multiplex(DEFAULTS, split_types=["top_of_book"]) == [
+        f"{FEEDS}?type[]=reference_price&type[]=last_trade_price",
+        f"{FEEDS}?type[]=top_of_book",
+    ]
+    assert multiplex(DEFAULTS, split_types=["top_of_book", "reference_price", "last_trade_price"]) == DEFAULTS
+
+
+def test_multiplex_keeps_unfiltered_endpoints():
+    assert multiplex([FEEDS, DEFAULTS[0]]) == [DEFAULTS[0], FEEDS]
+
+
+def index():
+    return InstrumentIndex([
+        Instrument("1", "BTC-20241227-60000C"),
+        Instrument("2", "BTC-20241227-90000P"),
+        Instrument("3", "BTC-20250328-60000C"),
+        Instrument("4", "ETH-20241227-3000C"),
+        Instrument("5", "BTC-USD-PERPETUAL"),
+    ])
+
+
+def test_subscription_resolves_attributes_against_index():
+    today = date(2024, 12, 23)
+    assert parse_subscription("underlying=BTC;kind=option;expiry=..+7d", today).resolve(index()) == {"1", "2"}
+    assert parse_subscription("underlying=BTC;strike=50000..70000").resolve(index()) == {"1", "3"}
+    assert parse_subscription("symbol=*-20241227-*;id=5").resolve(index()) == {"1", "2", "4", "5"}
+    assert parse_subscription("expiry=2025-01-01..").resolve(index()) == {"3"}
+    assert parse_subscription("id=5,42").resolve(index()) == {"5", "42"}
+    assert parse_subscription("  ") is None
+    with pytest.raises(ValueError):
+        parse_subscription("colour=red")
+
+
+def test_entity_filter_drops_frames_before_decode_and_follows_index_swaps():
+    registry = InstrumentRegistry(index())
+    entity_filter = EntityFilter(Subscription(underlyings=("ETH",)), registry)
+    assert entity_filter(b'{"top_of_book": {"tradeable_entity_id": "4", "market_id": "0"}}')
+    assert not entity_filter(b'{"top_of_book": {"tradeable_entity_id": "1", "market_id": "0"}}')
+    # unknown ids pass until the reference data resolves them, frames without an id always pass
+    assert entity_filter('{"top_of_book": {"tradeable_entity_id": "6"}}')
+    assert entity_filter('{"heartbeat": {}}')
+    registry.swap(index().merge([{"id": 6, "symbol": "BTC-USD"}]))
+    assert not entity_filter('{"top_of_book": {"tradeable_entity_id": "6"}}')
+    assert entity_filter.dropped == 2
+    registry.swap(InstrumentIndex([Instrument("7", "ETH-USD")]))
+    assert entity_filter.entity_ids == {"7"}
+    assert not EntityFilter(Subscription(entity_ids=frozenset({"1"})), registry, keep_unknown=False)(
+        '{"top_of_book": {"tradeable_entity_id": "6"}}')
+
+
+def test_filter_endpoints_adds_entity_params():
+    assert filter_endpoints(DEFAULTS[:1], {"12", "3"}) == [
+        f"{FEEDS}?type[]=top_of_book&tradeable_entity_id[]=3&tradeable_entity_id[]=12"]
+    assert filter_endpoints(DEFAULTS[:1], set()) == DEFAULTS[:1]
+    assert filter_endpoints(DEFAULTS[:1], {"1", "2"}, max_ids=1) == DEFAULTS[:1]
@@ -0,0 +1,167 @@
+import asyncio
+import socket
+import sys
+import time
+from pathlib import Path
+
+from websockets.asyncio.server import serve
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from simulator import ExchangeSimulator, SimulatorConfig  # noqa: E402
+from supervisor import Backoff, ConnectionStats, ConnectionSupervisor, FrameDeduplicator  # noqa: E402
+
+FAST = Backoff(initial=0.001, maximum=0.004)
+
+
+def test_backoff_is_immediate_then_exponential_with_cap():
+    backoff = Backoff(initial=1.0, maximum=10.0, jitter=0.0)
+    assert [backoff.delay(n) for n in range(6)] == [0.0, 1.0, 2.0, 4.0, 8.0, 10.0]
+    jittered = Backoff(initial=1.0, maximum=10.0, jitter=0.5)
+    assert all(1.0 <= jittered.delay(2) <= 2.0 for _ in range(100))
+
+
+def test_connection_stats_count_gaps_only_when_all_connections_are_down():
+    stats = ConnectionStats("ws://feed")
+    assert stats.connected() is None
+    assert stats.connected() is None  # standby
+    stats.disconnected()
+    assert stats.live == 1 and stats.as_dict()["disconnected_ms"] == 0
+    stats.messages = 1000
+    stats.disconnected()
+    gap = stats.connected()
+    assert gap is not None and gap > 0
+    assert stats.reconnects == 2 and stats.disconnected_ns == gap
+    assert stats.missed_estimate > 0
+
+
+def test_deduplicator_window():
+    dedup = FrameDeduplicator(window=2)
+    assert dedup.first(b"a") and dedup.first(b"b")
+    assert not dedup.first(b"a")
+    assert dedup.first(b"c")  # evicts a
+    assert dedup.first(b"a")
+
+
+def test_supervisor_reconnects_after_forced_disconnects():
+    received = []
+
+    async def session(websocket, supervisor):
+        async for message in websocket:
+            if supervisor.accept(message):
+                received.append(message)
+
+    async def run():
+        async with ExchangeSimulator(SimulatorConfig(rate=0, disconnect_after=20)) as simulator:
+            supervisor = ConnectionSupervisor(simulator.endpoint(), session, backoff=FAST)
+            task = asyncio.create_task(supervisor.run())
+            while supervisor.stats.connects < 4:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return supervisor.stats
+
+    stats = asyncio.run(run())
+    assert stats.reconnects >= 3
+    assert len(received) >= 60 and stats.messages == len(received)
+    assert stats.as_dict()["disconnected_ms"] > 0
+
+
+def test_supervisor_reconnects_after_clean_close():
+    received = []
+
+    async def session(websocket, supervisor):
+        while True:
+            message = await websocket.recv()
+            if supervisor.accept(message):
+                received.append(message)
+
+    async def run():
+        async with ExchangeSimulator(SimulatorConfig(rate=0, total_messages=5)) as simulator:
+            supervisor = ConnectionSupervisor(simulator.endpoint(), session, backoff=FAST, max_retries=1)
+            task = asyncio.create_task(supervisor.run())
+            while supervisor.stats.connects < 3 and not task.done():
+                await asyncio.sleep(0.005)
+            running = not task.done()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return running, supervisor.stats
+
+    running, stats = asyncio.run(run())
+    assert running
+    assert stats.reconnects >= 2 and len(received) >= 10
+
+
+def test_supervisor_backs_off_when_the_server_closes_at_once():
+    connected_at = []
+
+    async def close_at_once(connection):
+        await connection.close()
+
+    async def session(websocket, supervisor):
+        connected_at.append(time.monotonic())
+        async for message in websocket:
+            pass
+
+    async def run():
+        async with serve(close_at_once, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            backoff = Backoff(initial=0.02, maximum=1.0, jitter=0.0)
+            supervisor = ConnectionSupervisor(f"ws://127.0.0.1:{port}/v1/feeds", session, backoff=backoff, max_retries=1)
+            task = asyncio.create_task(supervisor.run())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    gaps = [b - a for a, b in zip(connected_at, connected_at[1:])]
+    # immediate, then 0.02, 0.04, 0.08, 0.16s: a handful of connects rather than a tight loop
+    assert 4 <= len(connected_at) <= 8
+    assert gaps[1] >= 0.015 and gaps[2] >= 0.035 and gaps[3] >= 0.075
+
+
+def test_supervisor_gives_up_after_max_retries():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    async def session(websocket, supervisor):
+        raise AssertionError("should not connect")
+
+    supervisor = ConnectionSupervisor(f"ws://127.0.0.1:{port}/v1/feeds", session, backoff=FAST, max_retries=3)
+    asyncio.run(asyncio.wait_for(supervisor.run(), 5))
+    assert supervisor.stats.connects == 0
+
+
+def test_hot_standby_processes_first_arrival_only():
+    frames = [f'{{"top_of_book": {{"tradeable_entity_id": "{i}"}}}}' for i in range(50)]
+    processed = []
+
+    async def feed(connection):
+        for frame in frames:
+            await connection.send(frame)
+            await asyncio.sleep(0)
+        await connection.close()
+
+    async def session(websocket, supervisor):
+        async for message in websocket:
+            if supervisor.accept(message):
+                processed.append(message)
+
+    async def run():
+        async with serve(feed, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            supervisor = ConnectionSupervisor(f"ws://127.0.0.1:{port}/v1/feeds", session, standby=1, backoff=FAST)
+            task = asyncio.create_task(supervisor.run())
+            # the server closes cleanly after each pass, the connections reconnect and repeats are all duplicates
+            while supervisor.stats.duplicates < 50:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return supervisor.stats
+
+    stats = asyncio.run(run())
+    assert processed == frames
+    assert stats.connects >= 2 and stats.duplicates >= 50
@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from model import TopOfBook  # noqa: E402
+from ticks import (  # noqa: E402
+    PriceBatch,
+    TopOfBookBatch,
+    decode_last_trade_price,
+    decode_reference_price,
+    decode_top_of_book,
+    exchange_time,
+)
+
+TOB_PAYLOAD = {
+    "timestamp": "1728314722542871",
+    "tradeable_entity_id": "7",
+    "market_id": "3",
+    "buy_price": "6543210",
+    "buy_quantity": "12345678",
+    "sell_price": "6543300",
+    "sell_quantity": "50000000",
+}
+
+
+def test_decode_top_of_book():
+    tick = decode_top_of_book(TOB_PAYLOAD)
+    assert not hasattr(tick, "__dict__")
+    assert (tick.buy_price, tick.sell_quantity) == (6543210, 50000000)
+    tick.price_decimals, tick.quantity_decimals = 2, 8
+    assert tick.buy_price_conv == 65432.1
+    assert tick.sell_quantity_conv == 0.5
+
+
+def test_decode_top_of_book_missing_field():
+    with pytest.raises(KeyError):
+        decode_top_of_book({"timestamp": "1", "market_id": "m"})
+
+
+def test_tick_to_model_matches_from_dict():
+    tick = decode_top_of_book(TOB_PAYLOAD)
+    tick.product, tick.price_decimals, tick.quantity_decimals = "BTC-USD", 2, 8
+    model = TopOfBook.from_dict(TOB_PAYLOAD)
+    assert tick.to_model().buy_price == model.buy_price
+    assert tick.to_model().buy_price_conv == 65432.1
+    assert tick.to_model().product == "BTC-USD"
+
+
+def test_decode_price_ticks():
+    payload = {"timestamp": "1", "tradeable_entity_id": "7", "market_id": "3", "price": "6543210", "price_type": "mark"}
+    ref_price = decode_reference_price(payload)
+    last_trade = decode_last_trade_price(payload)
+    ref_price.price_decimals = last_trade.price_decimals = 2
+    assert ref_price.price_conv == last_trade.price_conv == 65432.1
+    assert repr(ref_price).startswith("ReferencePriceTick(")
+    assert ref_price.to_model().price == "6543210"
+
+
+def test_top_of_book_batch():
+    batch = TopOfBookBatch()
+    for i in range(3):
+        tick = decode_top_of_book(dict(TOB_PAYLOAD, buy_price=str(100 + i)))
+        tick.price_decimals, tick.quantity_decimals = 2, 8
+        batch.append(tick)
+    assert len(batch) == 3
+    assert batch.nbytes == 3 * (6 * 8 + 2)
+    assert batch.bid_prices() == [1.0, 1.01, 1.02]
+    assert list(batch.column("entity_id")) == [7, 7, 7]
+    assert batch[2].buy_price == 102
+    assert batch[2].timestamp == "1728314722542871"
+    batch.clear()
+    assert len(batch) == 0
+
+
+def test_price_batch():
+    batch = PriceBatch()
+    tick = decode_reference_price({"timestamp": "ts", "tradeable_entity_id": "9", "market_id": "m",
+                                   "price": "25", "price_type": "t"})
+    tick.price_decimals = 1
+    batch.append(tick)
+    assert batch.prices() == [2.5]
+    assert list(batch.column("timestamp")) == [0]
+
+
+@pytest.mark.parametrize("timestamp", [
+    "1728314722542871",
+    "1728314722.542871",
+    "2024-10-07T15:25:22.542871Z",
+    "2024-10-07T17:25:22.542871+02:00",
+    "2024-10-07 15:25:22.542871",
+])
+def test_exchange_time_formats(timestamp):
+    assert exchange_time(timestamp) == 1728314722542871
+
+
+@pytest.mark.parametrize("timestamp", ["", "ts", "-1", "2024-13-07T00:00:00"])
+def test_exchange_time_unparseable_is_zero(timestamp):
+    assert exchange_time(timestamp) == 0
+
+
+def test_tick_parses_exchange_time_once_and_ignores_receive_time_in_equality():
+    tick = decode_top_of_book(TOB_PAYLOAD)
+    assert tick.exchange_us == 1728314722542871 and tick.received_ns == 0
+    other = decode_top_of_book(TOB_PAYLOAD)
+    other.received_ns = 123
+    assert tick == other
+    price = decode_last_trade_price({"timestamp": "2024-10-07T15:25:22Z", "tradeable_entity_id": "7", "market_id": "3",
+                                     "price": "1", "price_type": "mark"})
+    assert price.exchange_us == 1728314722000000
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from websockets.asyncio.client import connect
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import client  # noqa: E402
+import transport  # noqa: E402
+from simulator import ExchangeSimulator, SimulatorConfig  # noqa: E402
+from transport import PROFILES, TransportProfile, get_profile  # noqa: E402
+
+
+def test_get_profile_applies_overrides():
+    assert get_profile() == TransportProfile()
+    profile = get_profile("performance", max_queue=64, compression=None, uvloop=False)
+    assert profile.max_queue == 64 and profile.compression is False and profile.uvloop is False
+    assert profile.rcvbuf == PROFILES["performance"].rcvbuf
+    with pytest.raises(ValueError):
+        get_profile("turbo")
+
+
+def test_transport_from_env(monkeypatch):
+    monkeypatch.setenv("WS_PROFILE", "performance")
+    monkeypatch.setenv("WS_MAX_SIZE", "1000")
+    monkeypatch.setenv("WS_COMPRESSION", "1")
+    monkeypatch.delenv("WS_UVLOOP", raising=False)
+    profile = client.transport_from_env()
+    assert profile.max_size == 1000 and profile.compression is True and profile.max_queue == 1024
+
+
+@pytest.mark.parametrize("compression", [True, False])
+def test_connection_applies_socket_options_and_compression(compression):
+    profile = TransportProfile(compression=compression, rcvbuf=2 ** 20, max_queue=128)
+
+    async def run():
+        async with ExchangeSimulator(SimulatorConfig(rate=0, total_messages=10)) as simulator:
+            async with connect(simulator.endpoint("top_of_book"), **profile.connect_kwargs()) as websocket:
+                sock = websocket.transport.get_extra_info("socket")
+                assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY) == 1
+                # Linux reports double the requested size to account for bookkeeping
+                assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) >= 2 ** 20
+                assert bool(websocket.protocol.extensions) is compression
+                return [message async for message in websocket]
+
+    assert len(asyncio.run(run())) == 10
+
+
+def test_listen_to_endpoint_uses_transport_profile(monkeypatch):
+    received = []
+    monkeypatch.setattr(client, "tick_consumers", [received.append])
+    monkeypatch.setattr(client, "transport_profile", TransportProfile(max_size=100))
+
+    async def run():
+        async with ExchangeSimulator(SimulatorConfig(rate=0, total_messages=5)) as simulator:
+            # gives up after the first failure, a clean close reconnects so stop once the frames arrived
+            task = asyncio.create_task(client.listen_to_endpoint(simulator.endpoint("top_of_book"), max_retries=1))
+            deadline = time.monotonic() + 5
+            while len(received) < 5 and not task.done() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    # every top_of_book frame is larger than max_size, so the connection fails with 1009
+    assert received == []
+    monkeypatch.setattr(client, "transport_profile", TransportProfile(compression=False))
+    asyncio.run(run())
+    assert len(received) >= 5
+
+
+def test_run_falls_back_without_uvloop(monkeypatch, caplog):
+    monkeypatch.setattr(transport, "uvloop", None)
+
+    async def loop_module():
+        return type(asyncio.get_running_loop()).__module__
+
+    with caplog.at_level(logging.WARNING):
+        assert transport.run(loop_module(), use_uvloop=True).startswith("asyncio")
+    assert "uvloop is not installed" in caplog.text
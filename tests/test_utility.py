@@ -1,18 +1,34 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from utility import lookup_conversion_number_by_id, CONVERSION_FACTORS  # noqa: E402
+import utility  # noqa: E402
+from registry import InstrumentIndex  # noqa: E402
+from utility import load_conversion_factors, lookup_conversion_number_by_id  # noqa: E402
 
 def test_lookup_conversion_number_by_id(tmp_path):
     csv_file = tmp_path / "c.csv"
     csv_file.write_text("1,,1,2\n2,,2,3\n")
-    CONVERSION_FACTORS.clear()
-    res1 = lookup_conversion_number_by_id(str(csv_file), "1")
+    utility.registry.swap(InstrumentIndex())
+    with pytest.warns(DeprecationWarning):
+        res1 = lookup_conversion_number_by_id(str(csv_file), "1")
     assert res1 == (10, 100)
     # second call should use cached data
-    res2 = lookup_conversion_number_by_id(str(csv_file), "2")
+    csv_file.write_text("")
+    with pytest.warns(DeprecationWarning):
+        res2 = lookup_conversion_number_by_id(str(csv_file), "2")
     assert res2 == (100, 1000)
+    with pytest.warns(DeprecationWarning):
+        assert lookup_conversion_number_by_id(str(csv_file), "missing") == (1, 1)
+
+def test_load_conversion_factors_reloads_the_registry(tmp_path):
+    csv_file = tmp_path / "c.csv"
+    csv_file.write_text("1,,1,2\n")
+    with pytest.warns(DeprecationWarning):
+        load_conversion_factors(str(csv_file))
+    assert utility.registry.lookup("1").price_factor == 10
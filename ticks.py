@@ -0,0 +1,293 @@
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from fixedpoint import convert_batch, parse_mantissa, to_float
+from model import LastTradePrice, ReferencePrice, TopOfBook
+
+#
+# compact tick records used on the message path
+#
+# prices and quantities are kept as integer mantissas in the feed's internal units,
+# the decimals from the instrument registry are attached when a tick is normalized and
+# the *_conv values are only computed when read
+#
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def exchange_time(timestamp: str) -> int:
+    """
+    Exchange timestamp as integer epoch microseconds, 0 if it cannot be parsed.
+
+    Feed timestamps are integer epoch microsecond strings and take the fast path, a single int();
+    decimal epoch seconds and ISO-8601 (naive is UTC) are converted without datetime.strptime.
+    """
+    if timestamp.isdigit():
+        return int(timestamp)
+    seconds, dot, fraction = timestamp.partition(".")
+    if dot and seconds.isdigit() and fraction.isdigit():
+        return int(seconds) * 1_000_000 + int(fraction[:6].ljust(6, "0"))
+    try:
+        parsed = datetime.fromisoformat(timestamp[:-1] + "+00:00" if timestamp.endswith("Z") else timestamp)
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    delta = parsed - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+@dataclass(slots=True, repr=False)
+class TopOfBookTick:
+    timestamp: str
+    tradeable_entity_id: str
+    market_id: str
+    buy_price: int
+    buy_quantity: int
+    sell_price: int
+    sell_quantity: int
+    product: str = ""
+    price_decimals: int = 0
+    quantity_decimals: int = 0
+    # local time.monotonic_ns() when the frame was received, 0 if not recorded
+    received_ns: int = field(default=0, compare=False)
+    # timestamp parsed once on construction, see exchange_time
+    exchange_us: int = field(default=0, init=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.exchange_us = exchange_time(self.timestamp)
+
+    @property
+    def buy_price_conv(self) -> float:
+        return to_float(self.buy_price, self.price_decimals)
+
+    @property
+    def buy_quantity_conv(self) -> float:
+        return to_float(self.buy_quantity, self.quantity_decimals)
+
+    @property
+    def sell_price_conv(self) -> float:
+        return to_float(self.sell_price, self.price_decimals)
+
+    @property
+    def sell_quantity_conv(self) -> float:
+        return to_float(self.sell_quantity, self.quantity_decimals)
+
+    def __repr__(self) -> str:
+        return (
+            f"TopOfBookTick(timestamp='{self.timestamp}', tradeable_entity_id='{self.tradeable_entity_id}', "
+            f"market_id='{self.market_id}', product='{self.product}', "
+            f"buy_price_conv={self.buy_price_conv}, buy_quantity_conv={self.buy_quantity_conv}, "
+            f"sell_price_conv={self.sell_price_conv}, sell_quantity_conv={self.sell_quantity_conv})"
+        )
+
+    def to_model(self) -> TopOfBook:
+        return TopOfBook(
+            timestamp=self.timestamp,
+            tradeable_entity_id=self.tradeable_entity_id,
+            market_id=self.market_id,
+            buy_price=str(self.buy_price),
+            buy_quantity=str(self.buy_quantity),
+            sell_price=str(self.sell_price),
+            sell_quantity=str(self.sell_quantity),
+            product=self.product,
+            buy_price_conv=self.buy_price_conv,
+            buy_quantity_conv=self.buy_quantity_conv,
+            sell_price_conv=self.sell_price_conv,
+            sell_quantity_conv=self.sell_quantity_conv,
+        )
+
+
+@dataclass(slots=True, repr=False)
+class PriceTick:
+    timestamp: str
+    tradeable_entity_id: str
+    market_id: str
+    price: int
+    price_type: str
+    product: str = ""
+    price_decimals: int = 0
+    # local time.monotonic_ns() when the frame was received, 0 if not recorded
+    received_ns: int = field(default=0, compare=False)
+    # timestamp parsed once on construction, see exchange_time
+    exchange_us: int = field(default=0, init=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.exchange_us = exchange_time(self.timestamp)
+
+    @property
+    def price_conv(self) -> float:
+        return to_float(self.price, self.price_decimals)
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(timestamp='{self.timestamp}', tradeable_entity_id='{self.tradeable_entity_id}', "
+            f"market_id='{self.market_id}', product='{self.product}', price_type='{self.price_type}', "
+            f"price_conv={self.price_conv})"
+        )
+
+
+@dataclass(slots=True, repr=False)
+class ReferencePriceTick(PriceTick):
+
+    def to_model(self) -> ReferencePrice:
+        return ReferencePrice(
+            timestamp=self.timestamp,
+            tradeable_entity_id=self.tradeable_entity_id,
+            market_id=self.market_id,
+            price=str(self.price),
+            price_type=self.price_type,
+            product=self.product,
+            price_conv=self.price_conv,
+        )
+
+
+@dataclass(slots=True, repr=False)
+class LastTradePriceTick(PriceTick):
+
+    def to_model(self) -> LastTradePrice:
+        return LastTradePrice(
+            timestamp=self.timestamp,
+            tradeable_entity_id=self.tradeable_entity_id,
+            market_id=self.market_id,
+            price=str(self.price),
+            price_type=self.price_type,
+            product=self.product,
+            price_conv=self.price_conv,
+        )
+
+
+Tick = Union[TopOfBookTick, ReferencePriceTick, LastTradePriceTick]
+
+
+#
+# hand-written decoders from the json payload of each message type,
+# a missing field raises KeyError in the same way as Model.from_dict
+#
+def decode_top_of_book(payload: Dict[str, Any]) -> TopOfBookTick:
+    return TopOfBookTick(
+        payload["timestamp"],
+        payload["tradeable_entity_id"],
+        payload["market_id"],
+        parse_mantissa(payload["buy_price"]),
+        parse_mantissa(payload["buy_quantity"]),
+        parse_mantissa(payload["sell_price"]),
+        parse_mantissa(payload["sell_quantity"]),
+    )
+
+
+def decode_reference_price(payload: Dict[str, Any]) -> ReferencePriceTick:
+    return ReferencePriceTick(
+        payload["timestamp"],
+        payload["tradeable_entity_id"],
+        payload["market_id"],
+        parse_mantissa(payload["price"]),
+        payload["price_type"],
+    )
+
+
+def decode_last_trade_price(payload: Dict[str, Any]) -> LastTradePriceTick:
+    return LastTradePriceTick(
+        payload["timestamp"],
+        payload["tradeable_entity_id"],
+        payload["market_id"],
+        parse_mantissa(payload["price"]),
+        payload["price_type"],
+    )
+
+
+class ColumnBatch:
+    """
+    Columnar buffer of ticks held in parallel typed arrays.
+
+    Each row costs a few machine words instead of a Python object per tick,
+    subclasses declare their columns as (name, array typecode) pairs.
+    """
+
+    COLUMNS: Tuple[Tuple[str, str], ...] = ()
+
+    def __init__(self) -> None:
+        self._columns: Dict[str, array] = {name: array(typecode) for name, typecode in self.COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self._columns[self.COLUMNS[0][0]])
+
+    def column(self, name: str) -> array:
+        return self._columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.itemsize * len(c) for c in self._columns.values())
+
+    def clear(self) -> None:
+        for name, typecode in self.COLUMNS:
+            self._columns[name] = array(typecode)
+
+
+class TopOfBookBatch(ColumnBatch):
+    COLUMNS = (
+        ("timestamp", "q"),
+        ("entity_id", "q"),
+        ("bid", "q"),
+        ("bid_size", "q"),
+        ("ask", "q"),
+        ("ask_size", "q"),
+        ("price_decimals", "b"),
+        ("quantity_decimals", "b"),
+    )
+
+    def append(self, tick: TopOfBookTick) -> None:
+        c = self._columns
+        c["timestamp"].append(tick.exchange_us)
+        c["entity_id"].append(int(tick.tradeable_entity_id))
+        c["bid"].append(tick.buy_price)
+        c["bid_size"].append(tick.buy_quantity)
+        c["ask"].append(tick.sell_price)
+        c["ask_size"].append(tick.sell_quantity)
+        c["price_decimals"].append(tick.price_decimals)
+        c["quantity_decimals"].append(tick.quantity_decimals)
+
+    def __getitem__(self, i: int) -> TopOfBookTick:
+        c = self._columns
+        return TopOfBookTick(
+            str(c["timestamp"][i]),
+            str(c["entity_id"][i]),
+            "",
+            c["bid"][i],
+            c["bid_size"][i],
+            c["ask"][i],
+            c["ask_size"][i],
+            price_decimals=c["price_decimals"][i],
+            quantity_decimals=c["quantity_decimals"][i],
+        )
+
+    def __iter__(self) -> Iterator[TopOfBookTick]:
+        return (self[i] for i in range(len(self)))
+
+    def bid_prices(self) -> List[float]:
+        return convert_batch(self._columns["bid"], self._columns["price_decimals"])
+
+    def ask_prices(self) -> List[float]:
+        return convert_batch(self._columns["ask"], self._columns["price_decimals"])
+
+
+class PriceBatch(ColumnBatch):
+    COLUMNS = (
+        ("timestamp", "q"),
+        ("entity_id", "q"),
+        ("price", "q"),
+        ("price_decimals", "b"),
+    )
+
+    def append(self, tick: PriceTick) -> None:
+        c = self._columns
+        c["timestamp"].append(tick.exchange_us)
+        c["entity_id"].append(int(tick.tradeable_entity_id))
+        c["price"].append(tick.price)
+        c["price_decimals"].append(tick.price_decimals)
+
+    def prices(self) -> List[float]:
+        return convert_batch(self._columns["price"], self._columns["price_decimals"])
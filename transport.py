@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import socket
+from dataclasses import dataclass, replace
+from typing import Any, Coroutine, Dict, Optional, Type
+
+from websockets.asyncio.client import ClientConnection
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional dependency
+    uvloop = None
+
+#
+# websocket transport settings
+#
+# max_size is the largest frame accepted, max_queue the number of received frames buffered ahead
+# of recv() before reading pauses (a high watermark, reading resumes at a quarter of it) and
+# write_limit the send buffer high watermark; compression negotiates permessage-deflate
+#
+# socket options are applied when the connection is made, on Linux a larger SO_RCVBUF set after
+# connect still takes effect because the window scale was already offered from the system maximum
+#
+
+
+@dataclass(frozen=True)
+class TransportProfile:
+    max_size: Optional[int] = 2 ** 20
+    max_queue: Optional[int] = 16
+    write_limit: int = 2 ** 15
+    compression: bool = True
+    tcp_nodelay: bool = True
+    # socket receive buffer in bytes, None keeps the system default
+    rcvbuf: Optional[int] = None
+    uvloop: bool = False
+    ping_interval: Optional[float] = 10
+    ping_timeout: Optional[float] = 20
+
+    def connect_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for websockets.asyncio.client.connect."""
+        return {
+            "max_size": self.max_size,
+            "max_queue": self.max_queue,
+            "write_limit": self.write_limit,
+            "compression": "deflate" if self.compression else None,
+            "ping_interval": self.ping_interval,
+            "ping_timeout": self.ping_timeout,
+            "create_connection": tuned_connection(self),
+        }
+
+
+PROFILES: Dict[str, TransportProfile] = {
+    # the websockets defaults, with the client's keepalive
+    "default": TransportProfile(),
+    # larger frames and read-ahead so bursts do not pause reading, no inflate cost per frame,
+    # a 4 MiB socket buffer and uvloop when it is installed
+    "performance": TransportProfile(max_size=2 ** 22, max_queue=1024, compression=False, rcvbuf=2 ** 22, uvloop=True),
+}
+
+
+def get_profile(name: Optional[str] = None, **overrides: Any) -> TransportProfile:
+    """Named profile (default 'default') with any fields that are not None in `overrides` replaced."""
+    try:
+        profile = PROFILES[name or "default"]
+    except KeyError:
+        raise ValueError(f"Unknown transport profile '{name}', expected one of {', '.join(PROFILES)}") from None
+    return replace(profile, **{key: value for key, value in overrides.items() if value is not None})
+
+
+def tune_socket(sock: Any, profile: TransportProfile) -> None:
+    if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return
+    try:
+        if profile.tcp_nodelay:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if profile.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, profile.rcvbuf)
+    except OSError as e:
+        logging.warning(f"Could not set socket options: {e}")
+
+
+def tuned_connection(profile: TransportProfile) -> Type[ClientConnection]:
+    """ClientConnection class applying the profile's socket options as soon as the transport exists."""
+
+    class TunedClientConnection(ClientConnection):
+        def connection_made(self, transport: asyncio.BaseTransport) -> None:
+            super().connection_made(transport)
+            tune_socket(transport.get_extra_info("socket"), profile)
+
+    return TunedClientConnection
+
+
+def run(main: Coroutine[Any, Any, Any], use_uvloop: bool = False) -> Any:
+    """asyncio.run, on a uvloop event loop when requested and installed."""
+    if use_uvloop and uvloop is not None:
+        return uvloop.run(main)
+    if use_uvloop:
+        logging.warning("uvloop is not installed, using the asyncio event loop")
+    return asyncio.run(main)
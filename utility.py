@@ -1,21 +1,29 @@
-import csv
-from typing import Dict, Tuple
+import warnings
+from typing import Tuple
 
+from registry import InstrumentIndex, InstrumentRegistry
 
-CONVERSION_FACTORS: Dict[str, Tuple[int, int]] = {}
+#
+# deprecated conversion factor helpers, kept for existing callers
+#
+# the client resolves entity ids through registry.InstrumentRegistry, whose
+# lookup(entity_id).price_factor and .quantity_factor replace these functions
+#
+
+registry = InstrumentRegistry()
 
 
 def load_conversion_factors(csv_file_path: str) -> None:
-    """Load conversion factors from CSV into memory."""
-    global CONVERSION_FACTORS
-    with open(csv_file_path, mode="r") as file:
-        csv_reader = csv.reader(file)
-        for row in csv_reader:
-            if row:
-                CONVERSION_FACTORS[row[0]] = (10 ** int(row[-2]), 10 ** int(row[-1]))
+    """Deprecated, load the csv into an InstrumentRegistry with reload() instead."""
+    warnings.warn("load_conversion_factors is deprecated, use registry.InstrumentRegistry", DeprecationWarning, stacklevel=2)
+    registry.swap(InstrumentIndex.from_csv(csv_file_path))
 
 
 def lookup_conversion_number_by_id(csv_file_path: str, entity_id: str) -> Tuple[int, int]:
-    if not CONVERSION_FACTORS:
-        load_conversion_factors(csv_file_path)
-    return CONVERSION_FACTORS.get(entity_id, (1, 1))
+    """Deprecated, use InstrumentRegistry.lookup(entity_id).price_factor and .quantity_factor."""
+    warnings.warn("lookup_conversion_number_by_id is deprecated, use registry.InstrumentRegistry",
+                  DeprecationWarning, stacklevel=2)
+    if not len(registry):
+        registry.swap(InstrumentIndex.from_csv(csv_file_path))
+    instrument = registry.lookup(entity_id)
+    return instrument.price_factor, instrument.quantity_factor